@@ -0,0 +1,61 @@
+"""
+Peças comuns dos stubs de yt-dlp / rclone: latência por chamada e cópia com
+banda limitada, imprimindo progresso no formato da ferramenta real.
+"""
+import os, sys, time
+
+BLOCO = 1024 * 1024
+
+
+def env_float(nome: str, padrao: float = 0.0) -> float:
+    try:
+        return float(os.environ.get(nome) or padrao)
+    except ValueError:
+        return padrao
+
+
+def simular_latencia(prefixo: str):
+    # extração / handshake / chamada de API: custo fixo por invocação
+    lat = env_float(f"BENCH_{prefixo}_LATENCIA_S")
+    if lat > 0:
+        time.sleep(lat)
+
+
+def copiar_limitado(src: str, dst: str, banda_bps: float, ao_progresso=None):
+    """Copia src -> dst (via .part) sem passar de banda_bps (0 = sem limite)."""
+    total = os.path.getsize(src)
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    part = dst + ".part"
+    t0 = time.time()
+    feito = 0
+    ultimo = 0.0
+    with open(src, "rb") as fi, open(part, "wb") as fo:
+        while True:
+            buf = fi.read(BLOCO)
+            if not buf:
+                break
+            fo.write(buf)
+            feito += len(buf)
+            if banda_bps > 0:
+                adiantado = feito / banda_bps - (time.time() - t0)
+                if adiantado > 0:
+                    time.sleep(adiantado)
+            if ao_progresso and (time.time() - ultimo >= 0.5 or feito == total):
+                ultimo = time.time()
+                ao_progresso(feito, total, time.time() - t0)
+    os.replace(part, dst)
+    return feito, time.time() - t0
+
+
+def mib(n: float) -> str:
+    return f"{n / 1024**2:.2f}MiB"
+
+
+def hms(seg: float) -> str:
+    seg = int(max(0, seg))
+    return f"{seg // 3600:02d}:{seg % 3600 // 60:02d}:{seg % 60:02d}"
+
+
+def escrever(linha: str):
+    sys.stdout.write(linha + "\n")
+    sys.stdout.flush()
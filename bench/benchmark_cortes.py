@@ -0,0 +1,315 @@
+"""
+Benchmark ponta a ponta offline do processar_cortes.py.
+
+Gera um vídeo sintético (ffmpeg testsrc2 + sine) e relatórios no formato
+"Cortes para Automação", troca yt-dlp/rclone pelos stubs locais (latência e
+banda configuráveis) e roda cada cenário num processo filho. Mede tempo de
+parede por etapa, bytes lidos/escritos e pico de RSS (processo + filhos).
+Os resultados vão em JSONL com o commit, para comparar entre versões.
+
+Uso:
+  python bench/benchmark_cortes.py --cortes 5 50 500 --tipos LOUVOR PREGACAO
+  python bench/benchmark_cortes.py --duracao 1800 --ytdlp-mbps 40 --ytdlp-latencia 3 --rclone-mbps 20
+  python bench/benchmark_cortes.py --http-mbps 40 --http-cair-apos-mb 100   # download direto + queda
+"""
+import argparse, glob, json, os, random, subprocess, sys, tempfile, threading, time
+from datetime import datetime
+
+import psutil
+
+import servidor_http
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+URL_FAKE = "https://www.youtube.com/watch?v=BENCHvideo0"
+
+# etapa -> funções do processar_cortes cujo tempo entra nela
+ETAPAS = {
+    "info": ["obter_info_video"],
+    "download": ["garantir_download_inteiro", "executar_plano", "tentar_baixar_trecho"],
+    "corte": ["cortar_local_em_lote", "cortar_local"],
+    "upload": ["upload_drive_em_lote", "upload_drive_arquivo_a_arquivo", "_upload_um_arquivo"],
+}
+
+
+# =========================
+# Insumos sintéticos
+# =========================
+def gerar_video(work: str, duracao: int, resolucao: str, fps: int) -> str:
+    # MP4 fragmentado com sidx, como os formatos DASH do YouTube (dá pra cortar durante o download)
+    path = os.path.join(work, f"fonte_{duracao}s_{resolucao}_{fps}fps_frag.mp4")
+    if os.path.exists(path):
+        return path
+    print(f"Gerando vídeo sintético {duracao}s {resolucao}@{fps} -> {path}", flush=True)
+    tmp = path + ".tmp.mp4"
+    cmd = ["ffmpeg", "-v", "error", "-y",
+           "-f", "lavfi", "-i", f"testsrc2=size={resolucao}:rate={fps}",
+           "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000",
+           "-t", str(duracao), "-c:v", "libx264", "-preset", "ultrafast", "-g", str(fps * 2),
+           "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "96k", "-movflags", "+frag_keyframe+empty_moov+default_base_moof+global_sidx", tmp]
+    subprocess.run(cmd, check=True)
+    os.replace(tmp, path)
+    return path
+
+
+def _hhmmss(s: int) -> str:
+    return f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}"
+
+
+def gerar_relatorio(tipo: str, n_cortes: int, duracao: int, seed: int = 0) -> str:
+    """Relatório no formato novo com n_cortes espalhados pelo vídeo."""
+    rnd = random.Random(f"{seed}:{tipo}:{n_cortes}:{duracao}")
+    linhas = ["Tipo de Conteúdo: CULTO", f"Foco da Solicitação: {tipo}", "", "Cortes para Automação"]
+    passo = max(1, (duracao - 60) // n_cortes)
+    for i in range(n_cortes):
+        ini = min(duracao - 40, 5 + i * passo + rnd.randint(0, max(0, passo // 3)))
+        if tipo == "LOUVOR":
+            if rnd.random() < 0.2:
+                dur, tag = rnd.randint(90, 300), "Título: Louvor INTEGRAL"
+            else:
+                alvo = rnd.choice((10, 15, 20, 30))
+                dur, tag = alvo + rnd.randint(0, 8), f"Título: OURO {alvo} Louvor"
+        else:
+            dur, tag = rnd.randint(30, 150), "Assunto: Trecho da mensagem"
+        fim = min(duracao - 1, ini + dur)
+        linhas += [f"[[{_hhmmss(ini)}]] [[{_hhmmss(fim)}]]", f"{tag} {i + 1}", ""]
+    return "\n".join(linhas) + "\n"
+
+
+def commit_atual() -> dict:
+    def git(*args):
+        p = subprocess.run(["git", *args], cwd=REPO_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return p.stdout.strip() if p.returncode == 0 else ""
+    return {"commit": git("rev-parse", "--short", "HEAD"), "sujo": bool(git("status", "--porcelain", "--", "processar_cortes.py"))}
+
+
+# =========================
+# Processo filho: roda um cenário
+# =========================
+def _intervalos_para_parede(intervalos: list) -> float:
+    total, fim_atual = 0.0, None
+    for ini, fim in sorted(intervalos):
+        if fim_atual is None or ini > fim_atual:
+            total += fim - ini
+            fim_atual = fim
+        elif fim > fim_atual:
+            total += fim - fim_atual
+            fim_atual = fim
+    return total
+
+
+def _instrumentar(pc, registro: dict):
+    lock = threading.Lock()
+
+    def embrulhar(etapa, fn):
+        def medido(*a, **kw):
+            t0 = time.perf_counter()
+            try:
+                return fn(*a, **kw)
+            finally:
+                with lock:
+                    registro.setdefault(etapa, []).append((t0, time.perf_counter()))
+        return medido
+
+    for etapa, nomes in ETAPAS.items():
+        for nome in nomes:
+            setattr(pc, nome, embrulhar(etapa, getattr(pc, nome)))
+    pc.UploaderEmFundo.finalizar = embrulhar("upload", pc.UploaderEmFundo.finalizar)
+
+
+def _tamanho_dir(path: str) -> int:
+    total = 0
+    for raiz, _, arquivos in os.walk(path):
+        for fn in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, fn))
+            except OSError:
+                pass
+    return total
+
+
+def executar_cenario(cenario: dict) -> dict:
+    sys.path.insert(0, REPO_DIR)
+    import processar_cortes as pc
+
+    w = cenario["work"]
+    pc.BASE_PATH = os.path.join(w, "saida")
+    pc.LOG_DIR = os.path.join(w, "logs")
+    pc.JOBS_DIR = os.path.join(pc.LOG_DIR, "_jobs")
+    pc.STATS_DB_PATH = os.path.join(pc.LOG_DIR, "historico.sqlite3")
+    pc.DOWNLOAD_CACHE_DIR = os.path.join(w, "cache")
+    pc.FAIXAS_DIR = os.path.join(pc.DOWNLOAD_CACHE_DIR, "_faixas")
+    pc.ENERGIA_CACHE_DIR = os.path.join(pc.DOWNLOAD_CACHE_DIR, "_energia")
+    pc.INFO_CACHE_DIR = os.path.join(pc.DOWNLOAD_CACHE_DIR, "_info")
+    pc.LOUDNESS_CACHE_DIR = os.path.join(pc.DOWNLOAD_CACHE_DIR, "_loudness")
+    pc._cache_videos = pc.IndiceCache(pc.DOWNLOAD_CACHE_DIR, pc.CACHE_MAX_BYTES)
+    pc._acervo = pc.IndiceCache(os.path.join(pc.DOWNLOAD_CACHE_DIR, "_cortes"), pc.ACERVO_MAX_BYTES)
+    pc.YTDLP_CMD = [sys.executable, os.path.join(BENCH_DIR, "stub_ytdlp.py")]
+    pc.RCLONE_CMD = [sys.executable, os.path.join(BENCH_DIR, "stub_rclone.py")]
+    for nome, valor in cenario.get("config", {}).items():
+        setattr(pc, nome, valor)
+
+    registro = {}
+    _instrumentar(pc, registro)
+    proc = psutil.Process()
+    io0 = proc.io_counters() if hasattr(proc, "io_counters") else None
+
+    t0 = time.perf_counter()
+    erro = ""
+    try:
+        pc.iniciar_processamento(cenario["evento"])
+    except Exception as e:
+        erro = str(e)[-2000:]
+    parede = time.perf_counter() - t0
+
+    io1 = proc.io_counters() if io0 else None
+    status = {}
+    for mp in glob.glob(os.path.join(pc.LOG_DIR, "*.metricas.jsonl")):
+        with open(mp, "r", encoding="utf-8") as f:
+            for linha in f:
+                r = json.loads(linha)
+                if "idx" in r:
+                    status[r["status"]] = status.get(r["status"], 0) + 1
+    etapas = {
+        etapa: {"parede_s": round(_intervalos_para_parede(iv), 3),
+                "soma_s": round(sum(f - i for i, f in iv), 3), "chamadas": len(iv)}
+        for etapa, iv in registro.items()
+    }
+    return {
+        "parede_s": round(parede, 3),
+        "etapas": etapas,
+        "erro": erro,
+        "status_cortes": status,
+        # no Linux o io do processo inclui os filhos já encerrados (ffmpeg, stubs); no Windows só o python
+        "io_processo": {"lidos": io1.read_bytes - io0.read_bytes, "escritos": io1.write_bytes - io0.write_bytes} if io1 else None,
+        "bytes_arquivos": {k: _tamanho_dir(os.path.join(w, k)) for k in ("cache", "saida", "remoto")},
+    }
+
+
+# =========================
+# Processo pai: cenários, amostragem de RSS, relatório
+# =========================
+def _pico_rss(pid: int, parar: threading.Event, resultado: dict):
+    try:
+        raiz = psutil.Process(pid)
+    except psutil.NoSuchProcess:
+        return
+    while not parar.is_set():
+        try:
+            procs = [raiz, *raiz.children(recursive=True)]
+            rss = {}
+            for p in procs:
+                try:
+                    rss[p.pid] = p.memory_info().rss
+                except psutil.Error:
+                    pass
+            resultado["python"] = max(resultado.get("python", 0), rss.get(pid, 0))
+            resultado["arvore"] = max(resultado.get("arvore", 0), sum(rss.values()))
+        except psutil.Error:
+            pass
+        parar.wait(0.1)
+
+
+def rodar(args, video: str, tipo: str, n: int) -> dict:
+    work = tempfile.mkdtemp(prefix=f"bench_{tipo.lower()}_{n}_", dir=args.work)
+    evento = os.path.join(work, "evento.json")
+    with open(evento, "w", encoding="utf-8") as f:
+        json.dump({"client_payload": {"url": URL_FAKE, "relatorio": gerar_relatorio(tipo, n, args.duracao, args.seed)}}, f)
+
+    cenario = {"work": work, "evento": evento, "config": json.loads(args.config or "{}")}
+    cenario_path = os.path.join(work, "cenario.json")
+    with open(cenario_path, "w", encoding="utf-8") as f:
+        json.dump(cenario, f)
+
+    env = {**os.environ,
+           "BENCH_VIDEO": video, "BENCH_DURACAO": str(args.duracao), "BENCH_REMOTO_DIR": os.path.join(work, "remoto"),
+           "BENCH_YTDLP_LATENCIA_S": str(args.ytdlp_latencia), "BENCH_YTDLP_BANDA_BPS": str(args.ytdlp_mbps * 1024**2 / 8),
+           "BENCH_RCLONE_LATENCIA_S": str(args.rclone_latencia), "BENCH_RCLONE_BANDA_BPS": str(args.rclone_mbps * 1024**2 / 8),
+           "PYTHONUTF8": "1"}
+    servidor = None
+    if not args.sem_http:
+        env["BENCH_HTTP_URL"], servidor = servidor_http.iniciar(video, 0, args.http_mbps * 1024**2 / 8,
+                                                                int(args.http_cair_apos_mb * 1024**2))
+    saida_path = os.path.join(work, "resultado.json")
+    console = open(os.path.join(work, "console.txt"), "w", encoding="utf-8")
+    p = subprocess.Popen([sys.executable, "-X", "utf8", os.path.abspath(__file__), "--_cenario", cenario_path, "--_saida", saida_path],
+                         env=env, stdout=console, stderr=subprocess.STDOUT)
+    pico = {}
+    parar = threading.Event()
+    amostrador = threading.Thread(target=_pico_rss, args=(p.pid, parar, pico), daemon=True)
+    amostrador.start()
+    rc = p.wait()
+    parar.set()
+    amostrador.join()
+    console.close()
+    if servidor:
+        servidor.shutdown()
+
+    try:
+        with open(saida_path, "r", encoding="utf-8") as f:
+            res = json.load(f)
+    except (OSError, ValueError):
+        res = {"erro": f"processo do cenário saiu com rc={rc} (ver {console.name})"}
+    return {"tipo": tipo, "cortes": n, "rc": rc, "pico_rss": pico, "work": work, **res}
+
+
+def imprimir(resultados: list):
+    print()
+    print(f"{'tipo':<9} {'cortes':>6} {'ok':>5} {'total':>8} {'info':>7} {'download':>9} {'corte':>8} {'upload':>8} {'RSS MB':>7} {'escrito MB':>10}  erro")
+    for r in resultados:
+        et = r.get("etapas", {})
+        col = lambda k: f"{et[k]['parede_s']:.1f}" if k in et else "-"  # noqa: E731
+        escritos = sum((r.get("bytes_arquivos") or {}).values()) / 1024**2
+        print(f"{r['tipo']:<9} {r['cortes']:>6} {(r.get('status_cortes') or {}).get('OK', 0):>5} {r.get('parede_s', 0):>8.1f} {col('info'):>7} {col('download'):>9} "
+              f"{col('corte'):>8} {col('upload'):>8} {r['pico_rss'].get('arvore', 0) / 1024**2:>7.0f} {escritos:>10.0f}  "
+              f"{(r.get('erro') or '')[:60]}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark offline do processar_cortes.py")
+    ap.add_argument("--cortes", type=int, nargs="+", default=[5, 50])
+    ap.add_argument("--tipos", nargs="+", default=["LOUVOR", "PREGACAO"], choices=["LOUVOR", "PREGACAO"])
+    ap.add_argument("--duracao", type=int, default=3600, help="duração do vídeo sintético (s)")
+    ap.add_argument("--resolucao", default="640x360")
+    ap.add_argument("--fps", type=int, default=25)
+    ap.add_argument("--ytdlp-mbps", type=float, default=0, help="banda simulada do YouTube (Mbit/s, 0 = sem limite)")
+    ap.add_argument("--ytdlp-latencia", type=float, default=0, help="custo fixo por chamada do yt-dlp (s)")
+    ap.add_argument("--http-mbps", type=float, default=0, help="banda do servidor HTTP local (Mbit/s, 0 = sem limite)")
+    ap.add_argument("--http-cair-apos-mb", type=float, default=0, help="derruba uma conexão HTTP depois de N MB")
+    ap.add_argument("--sem-http", action="store_true", help="sem servidor HTTP: info só com formatos HLS (download via yt-dlp)")
+    ap.add_argument("--rclone-mbps", type=float, default=0, help="banda simulada do Drive (Mbit/s, 0 = sem limite)")
+    ap.add_argument("--rclone-latencia", type=float, default=0, help="custo fixo por chamada do rclone (s)")
+    ap.add_argument("--config", help='constantes do processar_cortes a sobrescrever, JSON (ex. {"MAX_CORTES_PARALELOS": 1})')
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--work", default=os.path.join(BENCH_DIR, "_work"))
+    ap.add_argument("--saida", default=os.path.join(BENCH_DIR, "resultados.jsonl"))
+    ap.add_argument("--_cenario", help=argparse.SUPPRESS)
+    ap.add_argument("--_saida", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._cenario:
+        with open(args._cenario, "r", encoding="utf-8") as f:
+            res = executar_cenario(json.load(f))
+        with open(args._saida, "w", encoding="utf-8") as f:
+            json.dump(res, f)
+        return
+
+    os.makedirs(args.work, exist_ok=True)
+    video = gerar_video(args.work, args.duracao, args.resolucao, args.fps)
+    versao = commit_atual()
+    quando = datetime.now().isoformat(timespec="seconds")
+    resultados = []
+    for tipo in args.tipos:
+        for n in args.cortes:
+            print(f"Cenário {tipo} x {n} cortes...", flush=True)
+            r = rodar(args, video, tipo, n)
+            r.update(versao, quando=quando, parametros={k: v for k, v in vars(args).items() if not k.startswith("_")})
+            resultados.append(r)
+            with open(args.saida, "a", encoding="utf-8") as f:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    imprimir(resultados)
+    print(f"\nResultados: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Servidor HTTP local no lugar do googlevideo: serve um arquivo com suporte a
+Range (206 / Content-Range), banda total limitada e queda de conexão opcional,
+para exercitar o download direto em blocos e a retomada pelos .part.
+
+Uso avulso:
+  python bench/servidor_http.py video.mp4 --porta 8765 --mbps 40 --cair-apos-mb 50
+"""
+import argparse, os, re, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _stub_comum import env_float  # noqa: E402
+
+RE_RANGE = re.compile(r"bytes=(\d+)-(\d*)")
+LEITURA = 64 * 1024
+
+
+class _Estado:
+    """Banda compartilhada por todas as conexões e contador para a queda simulada."""
+
+    def __init__(self, arquivo: str, banda_bps: float, cair_apos_bytes: int):
+        self.arquivo = arquivo
+        self.banda_bps = banda_bps
+        self.cair_apos_bytes = cair_apos_bytes
+        self.servidos = 0
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+
+    def enviar(self, n: int) -> bool:
+        """Conta n bytes; False quando a queda simulada deve acontecer."""
+        with self._lock:
+            self.servidos += n
+            if self.cair_apos_bytes and self.servidos >= self.cair_apos_bytes:
+                self.cair_apos_bytes = 0
+                return False
+            adiantado = self.servidos / self.banda_bps - (time.monotonic() - self._t0) if self.banda_bps > 0 else 0
+        if adiantado > 0:
+            time.sleep(adiantado)
+        return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    estado: _Estado = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        st = self.estado
+        with st._lock:
+            st.requisicoes += 1
+        tamanho = os.path.getsize(st.arquivo)
+        ini, fim = 0, tamanho - 1
+        m = RE_RANGE.match(self.headers.get("Range") or "")
+        if m:
+            ini = int(m.group(1))
+            fim = min(int(m.group(2)) if m.group(2) else tamanho - 1, tamanho - 1)
+            if ini > fim:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{tamanho}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {ini}-{fim}/{tamanho}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(fim - ini + 1))
+        self.end_headers()
+
+        with open(st.arquivo, "rb") as f:
+            f.seek(ini)
+            falta = fim - ini + 1
+            while falta > 0:
+                buf = f.read(min(LEITURA, falta))
+                if not buf:
+                    break
+                if not st.enviar(len(buf)):
+                    self.close_connection = True
+                    return   # queda no meio da resposta
+                try:
+                    self.wfile.write(buf)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                falta -= len(buf)
+
+
+def iniciar(arquivo: str, porta: int = 0, banda_bps: float = 0, cair_apos_bytes: int = 0):
+    """Sobe o servidor numa thread. Retorna (url, servidor); servidor.shutdown() encerra."""
+    handler = type("Handler", (_Handler,), {"estado": _Estado(arquivo, banda_bps, cair_apos_bytes)})
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/{os.path.basename(arquivo)}"
+    return url, servidor
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor HTTP com Range para o benchmark")
+    ap.add_argument("arquivo")
+    ap.add_argument("--porta", type=int, default=8765)
+    ap.add_argument("--mbps", type=float, default=env_float("BENCH_HTTP_MBPS"), help="banda total (Mbit/s, 0 = sem limite)")
+    ap.add_argument("--cair-apos-mb", type=float, default=0, help="derruba uma conexão depois de N MB servidos")
+    args = ap.parse_args()
+    url, servidor = iniciar(args.arquivo, args.porta, args.mbps * 1024**2 / 8, int(args.cair_apos_mb * 1024**2))
+    print(url, flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Stub do rclone para o benchmark: o remoto "nome:/caminho" vira
+BENCH_REMOTO_DIR/caminho. Entende lsjson (--hash md5), copyto (local ou
+remoto -> remoto), copy (--files-from) e rcat (stdin). Demais opções são aceitas e ignoradas.
+
+Ambiente:
+  BENCH_REMOTO_DIR
+  BENCH_RCLONE_LATENCIA_S  custo fixo por chamada (API do Drive)
+  BENCH_RCLONE_BANDA_BPS   banda de upload simulada (0 = sem limite)
+"""
+import hashlib, json, os, shutil, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _stub_comum import copiar_limitado, env_float, escrever, mib, simular_latencia  # noqa: E402
+
+
+def _local(remoto: str) -> str:
+    raiz = os.environ.get("BENCH_REMOTO_DIR") or os.path.join(os.getcwd(), "_remoto")
+    caminho = remoto.split(":", 1)[1] if ":" in remoto else remoto
+    return os.path.join(raiz, caminho.lstrip("/\\"))
+
+
+def _md5(path: str) -> str:
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _enviar(src: str, dst: str):
+    banda = env_float("BENCH_RCLONE_BANDA_BPS")
+
+    def progresso(feito, total, gasto):
+        vel = feito / gasto if gasto > 0 else 0
+        eta = int((total - feito) / vel) if vel > 0 else 0
+        escrever(f"INFO  : {mib(feito)} / {mib(total)}, {int(feito * 100 / max(1, total))}%, {mib(vel)}/s, ETA {eta}s")
+
+    copiar_limitado(src, dst, banda, progresso)
+
+
+def main(args: list) -> int:
+    if not args:
+        return 1
+    cmd = args[0]
+    if cmd == "version":
+        escrever("rclone stub v0.0")
+        return 0
+    simular_latencia("RCLONE")
+
+    if cmd == "lsjson":
+        pasta = _local(args[1])
+        itens = []
+        if os.path.isdir(pasta):
+            for nome in sorted(os.listdir(pasta)):
+                fp = os.path.join(pasta, nome)
+                if os.path.isfile(fp) and not nome.endswith(".part"):
+                    item = {"Path": nome, "Name": nome, "Size": os.path.getsize(fp), "IsDir": False}
+                    if "--hash" in args:
+                        item["Hashes"] = {"md5": _md5(fp)}
+                    itens.append(item)
+        escrever(json.dumps(itens))
+        return 0
+
+    if cmd == "copyto":
+        if os.path.exists(args[1]):
+            _enviar(args[1], _local(args[2]))
+        else:
+            # remoto -> remoto: cópia no servidor, sem banda de upload
+            dst = _local(args[2])
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copyfile(_local(args[1]), dst)
+        return 0
+
+    if cmd == "rcat":
+        dst = _local(args[1])
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        banda = env_float("BENCH_RCLONE_BANDA_BPS")
+        t0 = time.time()
+        feito = 0
+        with open(dst + ".part", "wb") as f:
+            for buf in iter(lambda: sys.stdin.buffer.read(1024 * 1024), b""):
+                f.write(buf)
+                feito += len(buf)
+                adiantado = feito / banda - (time.time() - t0) if banda > 0 else 0
+                if adiantado > 0:
+                    time.sleep(adiantado)
+        os.replace(dst + ".part", dst)
+        return 0
+
+    if cmd == "copy":
+        src, dst = args[1], _local(args[2])
+        lista = args[args.index("--files-from") + 1] if "--files-from" in args else None
+        if lista:
+            with open(lista, "r", encoding="utf-8") as f:
+                nomes = [n.strip() for n in f if n.strip()]
+        else:
+            nomes = [n for n in os.listdir(src) if os.path.isfile(os.path.join(src, n))]
+        falhas = 0
+        for nome in nomes:
+            try:
+                _enviar(os.path.join(src, nome), os.path.join(dst, nome))
+            except OSError as e:
+                escrever(f"ERROR : {nome}: {e}")
+                falhas += 1
+        return 1 if falhas else 0
+
+    escrever(f"ERROR : comando não suportado pelo stub: {cmd}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,137 @@
+"""
+Stub do yt-dlp para o benchmark: serve o vídeo sintético (BENCH_VIDEO) como se
+fosse o YouTube. Entende --dump-json, --write-info-json/--skip-download,
+--load-info-json (pula a latência de extração), download inteiro e
+--download-sections (com -o, %(ext)s / %(id)s / %(section_start)d). Opções de
+rede, cookies e JS são aceitas e ignoradas.
+
+Ambiente:
+  BENCH_VIDEO, BENCH_TITULO, BENCH_DATA (YYYYMMDD)
+  BENCH_HTTP_URL          URL do servidor_http.py: o info passa a ter URL direta
+  BENCH_YTDLP_LATENCIA_S  custo fixo por chamada (extração)
+  BENCH_YTDLP_BANDA_BPS   banda simulada (0 = sem limite)
+"""
+import json, os, re, subprocess, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _stub_comum import copiar_limitado, env_float, escrever, hms, mib, simular_latencia  # noqa: E402
+
+RE_ID = re.compile(r"(?:youtu\.be/|[?&]v=|/live/|/shorts/)([A-Za-z0-9_-]{11})")
+
+
+def _valor(args: list, opcao: str):
+    return args[args.index(opcao) + 1] if opcao in args else None
+
+
+def _duracao(path: str) -> float:
+    p = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", path],
+                       stdout=subprocess.PIPE, text=True)
+    return float(p.stdout.strip() or 0)
+
+
+def _segundos(txt: str) -> float:
+    s = 0.0
+    for parte in txt.split(":"):
+        s = s * 60 + float(parte)
+    return s
+
+
+def _info(video: str, url: str) -> dict:
+    dur = env_float("BENCH_DURACAO") or _duracao(video)
+    tamanho = os.path.getsize(video)
+    tbr = tamanho * 8 / dur / 1000 if dur else 0
+    m = RE_ID.search(url)
+    vid = m.group(1) if m else "benchvideo0"
+    # URLs de formato com 'expire' como as do googlevideo (6 h)
+    expire = int(time.time()) + 6 * 3600
+    info = {
+        "id": vid,
+        "title": os.environ.get("BENCH_TITULO", "Celebracao Noite | 01.02.26"),
+        "upload_date": os.environ.get("BENCH_DATA", "20260201"),
+        "duration": dur,
+        "filesize_approx": tamanho,
+        "webpage_url": url,
+    }
+    http_url = os.environ.get("BENCH_HTTP_URL")
+    if http_url:
+        # servidor local (servidor_http.py): um formato progressivo com URL direta
+        info.update({"format_id": "18", "ext": "mp4", "protocol": "http", "tbr": tbr,
+                     "url": f"{http_url}?itag=18&expire={expire}"})
+    else:
+        # sem servidor: formatos HLS, o download fica com o próprio stub
+        info["requested_formats"] = [
+            {"format_id": "137", "tbr": tbr * 0.9, "protocol": "m3u8_native",
+             "url": f"https://stub.invalid/videoplayback?itag=137&expire={expire}"},
+            {"format_id": "140", "tbr": tbr * 0.1, "protocol": "m3u8_native",
+             "url": f"https://stub.invalid/videoplayback?itag=140&expire={expire}"},
+        ]
+    return info
+
+
+def _nome_saida(modelo: str, info: dict, section_start: float = 0) -> str:
+    return (modelo.replace("%(ext)s", "mp4").replace("%(id)s", info["id"])
+            .replace("%(section_start)d", str(int(section_start))))
+
+
+def _transferir(src: str, dst: str):
+    banda = env_float("BENCH_YTDLP_BANDA_BPS")
+
+    def progresso(feito, total, gasto):
+        vel = feito / gasto if gasto > 0 else 0
+        eta = (total - feito) / vel if vel > 0 else 0
+        escrever(f"[download] {feito * 100 / total:5.1f}% of {mib(total)} at {mib(vel)}/s ETA {hms(eta)}")
+
+    escrever(f"[download] Destination: {dst}")
+    copiar_limitado(src, dst, banda, progresso)
+
+
+def main(args: list) -> int:
+    if "--version" in args:
+        escrever("stub-ytdlp 0.0")
+        return 0
+    video = os.environ.get("BENCH_VIDEO")
+    if not video or not os.path.exists(video):
+        escrever("ERROR: BENCH_VIDEO não configurado")
+        return 2
+    info_json = _valor(args, "--load-info-json")
+    if info_json:
+        with open(info_json, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    else:
+        simular_latencia("YTDLP")
+        info = _info(video, args[-1])
+
+    if "--dump-json" in args:
+        escrever(json.dumps(info))
+        return 0
+
+    modelo = _valor(args, "-o") or "%(id)s.%(ext)s"
+    if "--write-info-json" in args:
+        destino = os.path.splitext(_nome_saida(modelo, info))[0] + ".info.json"
+        with open(destino, "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        escrever(f"[info] Writing video metadata as JSON to: {destino}")
+    if "--skip-download" in args:
+        return 0
+    secoes = [args[i + 1] for i, a in enumerate(args) if a == "--download-sections"]
+    if not secoes:
+        _transferir(video, _nome_saida(modelo, info))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="stub_ytdlp_") as tmp:
+        for sec in secoes:
+            ini, fim = sec.lstrip("*").split("-")
+            ini_s, fim_s = _segundos(ini), _segundos(fim)
+            trecho = os.path.join(tmp, f"sec_{int(ini_s)}.mp4")
+            # yt-dlp real reencoda as bordas com --force-keyframes-at-cuts; aqui basta um corte por cópia
+            p = subprocess.run(["ffmpeg", "-v", "error", "-y", "-ss", f"{ini_s}", "-to", f"{fim_s}", "-i", video,
+                                "-c", "copy", trecho])
+            if p.returncode != 0:
+                escrever(f"ERROR: ffmpeg falhou na seção {sec}")
+                return 1
+            _transferir(trecho, _nome_saida(modelo, info, ini_s))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,8 +1,27 @@
-import os, subprocess, re, time, json, argparse, hashlib, glob, sys, unicodedata
+import os, subprocess, re, time, json, argparse, hashlib, glob, sys, unicodedata, threading, queue, bisect, shutil
+import contextvars, functools, http.client, math, platform, random, sqlite3, struct, urllib.error, urllib.request
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
 import psutil
-import GPUtil
+
+try:
+    import GPUtil
+except ImportError:   # sem GPUtil: telemetria só de CPU/disco
+    GPUtil = None
+
+try:
+    import numpy as np
+except ImportError:   # sem NumPy: bordas ficam como vieram do relatório
+    np = None
 
 
 # =========================
@@ -25,11 +44,51 @@ force_utf8_stdio()
 BASE_PATH = "F:/Cortes_midia"
 LOG_DIR = "D:/Coding/HTML/midia_cutter_reels/logs"
 DRIVE_NAME = "meu_drive"
+JOBS_DIR = os.path.join(LOG_DIR, "_jobs")   # diário por job (retomada após queda)
+
+# Histórico em SQLite: jobs, cortes e transferências (consulta: --stats). As medições
+# recentes deste runner alimentam o planejador e a concorrência de rede do próximo job.
+STATS_ATIVO = True
+STATS_DB_PATH = os.path.join(LOG_DIR, "historico.sqlite3")
+STATS_JANELA_DIAS = 14        # medições mais velhas não entram nas estimativas
+STATS_MIN_AMOSTRAS = 3        # abaixo disso vale o padrão das constantes
+RUNNER_NOME = os.environ.get("RUNNER_NAME") or platform.node()
 
 MAX_GPU_TEMP = 80
-COOL_DOWN_TIME = 1
+
+# Telemetria em segundo plano + throttle adaptativo (no lugar dos sleeps fixos entre cortes)
+TELEMETRIA_INTERVALO_S = 2
+TELEMETRIA_GPU_INTERVALO_S = 10            # cada leitura do GPUtil dispara um nvidia-smi
+THROTTLE_CPU_ALTO = 90                     # % de CPU: acima disso tira um ffmpeg de circulação
+THROTTLE_CPU_BAIXO = 60                    # abaixo disso (e GPU fria) devolve um
+THROTTLE_DISCO_MIN_BYTES = 20 * 1024**3    # espaço livre mínimo: abaixo disso, um download por vez
 
 DOWNLOAD_CACHE_DIR = os.path.join(BASE_PATH, "_cache_downloads").replace("\\", "/")
+CACHE_MAX_BYTES = 300 * 1024**3     # orçamento do cache de vídeos inteiros (LRU)
+CACHE_TOLERANCIA_DURACAO = 0.01     # fração da duração aceita entre container e metadado (mín. 2s)
+
+# Download do vídeo inteiro direto por HTTP (URLs do info em cache), em blocos com Range;
+# formatos sem URL direta (HLS/DASH) ou falha aqui caem no yt-dlp
+DOWNLOAD_HTTP_DIRETO = True
+DOWNLOAD_CONEXOES = 4                # ranges simultâneos por arquivo
+DOWNLOAD_BLOCO_BYTES = 8 * 1024**2   # granularidade da retomada (.part.json)
+DOWNLOAD_LEITURA_BYTES = 256 * 1024
+DOWNLOAD_TIMEOUT_S = 30
+DOWNLOAD_TENTATIVAS_BLOCO = 3
+
+# Orçamento de banda compartilhado entre downloads e uploads (0 = sem limite)
+BANDA_TOTAL_BPS = 0
+BANDA_FRACAO_UPLOAD = 0.3            # parte do upload quando os dois estão ativos
+
+# Info JSON da extração (yt-dlp) por vídeo: os downloads seguintes usam --load-info-json
+INFO_CACHE_DIR = os.path.join(DOWNLOAD_CACHE_DIR, "_info").replace("\\", "/")
+INFO_TTL_PADRAO_S = 3 * 3600          # quando as URLs dos formatos não trazem 'expire'
+INFO_MARGEM_EXPIRACAO_S = 30 * 60     # descarta antes das URLs vencerem (download longo no meio)
+INFO_RETENCAO_S = 7 * 86400           # infos de outros vídeos mais velhos que isso são apagados
+
+# Executáveis externos (lista: o benchmark troca por stubs, ex. [sys.executable, "bench/stub_ytdlp.py"])
+YTDLP_CMD = ["yt-dlp"]
+RCLONE_CMD = ["rclone"]
 
 YTDLP_COOKIES_TXT_PATH = r"D:\secrets\yt_cookies.txt"
 YTDLP_NODE_EXE = r"C:\nvm4w\nodejs\node.exe"
@@ -37,8 +96,121 @@ YTDLP_NODE_EXE = r"C:\nvm4w\nodejs\node.exe"
 YTDLP_FORMAT_FULL = "bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4]/best"
 YTDLP_NET_ARGS = ["-4", "--retries", "10", "--fragment-retries", "10", "--retry-sleep", "exp=1:20:2"]
 
-UPLOAD_MAX_ATTEMPTS = 2
-UPLOAD_RETRY_SLEEP_SEC = 8
+# Concorrência dos cortes (1 = sequencial, como antes)
+MAX_CORTES_PARALELOS = 4
+MAX_PROCESSOS_REDE = 2     # yt-dlp simultâneos (trecho / vídeo inteiro)
+MAX_PROCESSOS_LOCAIS = 3   # ffmpeg simultâneos (corte local)
+
+# Saída dos subprocessos: só a cauda fica em memória (debug/erro); progresso vira métrica
+SAIDA_MAX_BYTES = 64 * 1024
+PROGRESSO_ECO_S = 5        # linhas de progresso no console no máximo a cada N s por processo
+
+# Vigia dos subprocessos: sem avanço (linha nova ou progresso que anda) por WATCHDOG_SEM_PROGRESSO_S
+# ou passado o prazo da etapa, a árvore do processo é morta e a falha segue como "rede"
+# (retentativas / fallback). Prazo = piso ou o estimado com a vazão/velocidade mínima aceitável.
+WATCHDOG_ATIVO = True
+WATCHDOG_SEM_PROGRESSO_S = 120
+WATCHDOG_PRAZO_MIN_S = 300
+WATCHDOG_VAZAO_MIN_BPS = 256 * 1024    # transferências: total informado no progresso / isto
+WATCHDOG_FFMPEG_SPEED_MIN = 0.2        # ffmpeg: mídia do comando (-t / -ss..-to) / isto
+
+# Rastreamento: spans aninhados por job -> historico_*.spans.jsonl + historico_*.trace.json (Perfetto/chrome://tracing)
+TRACE_ATIVO = True
+
+# Corte em lote: um único ffmpeg grava vários cortes do vídeo do cache numa só leitura da fonte
+CORTE_EM_LOTE = True
+LOTE_MAX_SAIDAS = 24       # saídas por processo (limite de linha de comando no Windows)
+
+# LOUVOR com download HTTP direto de MP4 fragmentado (sidx): cada corte sai assim que o
+# download cobre o seu fim, em ordem de fim, sem esperar o vídeo inteiro
+CORTE_PROGRESSIVO = True
+CORTE_PROGRESSIVO_MARGEM_S = 2     # folga além do fim (+ raio do ajuste de bordas)
+
+# Planejador de download (cortes fora do LOUVOR): faixas x multi-seção x vídeo inteiro
+PLANO_GAP_MESCLA_S = 30                      # janelas separadas por menos que isso viram uma faixa só
+PLANO_OVERHEAD_EXTRACAO_S = 25               # custo fixo de cada yt-dlp (extração, cookies, JS challenge)
+PLANO_THROUGHPUT_PADRAO_BPS = 8 * 1024**2    # estimativa de download quando não há medição
+PLANO_BITRATE_PADRAO_BPS = 4_000_000 / 8     # quando o info do vídeo não traz tbr/filesize
+PLANO_REENCODE_S_POR_S = 0.5                 # custo do --force-keyframes-at-cuts por segundo de faixa
+PLANO_COBERTURA_MAX = 0.7                    # faixas cobrindo mais que isso do vídeo: nem tenta seções
+FAIXAS_DIR = os.path.join(DOWNLOAD_CACHE_DIR, "_faixas").replace("\\", "/")
+
+# Smart cut: reencoda só o GOP parcial do início/fim e copia o miolo (bordas exatas)
+CORTE_SMART_KINDS = ("OURO",)      # tipos de corte que usam smart cut; () desliga
+SMART_X264_PRESET = "veryfast"
+SMART_X264_CRF = 18
+
+# Ajuste de bordas pelo áudio: ini/fim vão para o ponto de menor energia por perto e,
+# nos OURO, a duração fica em alvo ± tolerância. Só quando há vídeo inteiro local.
+AJUSTE_BORDAS = True
+AJUSTE_RAIO_S = 2.0                  # vizinhança analisada em volta de cada borda
+AJUSTE_ALVO_TOLERANCIA_S = 1.0
+AJUSTE_PESO_DESLOCAMENTO = 0.5       # penalidade por se afastar do relatório (por raio percorrido)
+AJUSTE_AMOSTRAGEM_HZ = 8000          # PCM mono s16le lido do ffmpeg
+AJUSTE_QUADRO_S = 0.02               # resolução do envelope RMS
+AJUSTE_SUAVIZACAO_QUADROS = 5
+AJUSTE_CHUNK_BYTES = 64 * 1024
+ENERGIA_CACHE_DIR = os.path.join(DOWNLOAD_CACHE_DIR, "_energia").replace("\\", "/")
+
+# Renderização Reels (opcional): cada corte é decodificado uma vez e um split alimenta
+# vertical 9:16, preview leve, capa JPEG e (LOUVOR) áudio m4a. Saídas em <pasta>/_reels, fora do upload.
+RENDER_REELS = False
+RENDER_SUBPASTA = "_reels"
+RENDER_VERTICAL_W, RENDER_VERTICAL_H = 1080, 1920
+RENDER_VERTICAL_MODO = "crop"         # "crop" (recorta o centro) ou "pad" (barras em cima/embaixo)
+RENDER_VERTICAL_CRF = 20
+RENDER_X264_PRESET = "veryfast"
+RENDER_PREVIEW_ALTURA = 360
+RENDER_PREVIEW_KBPS = 500
+RENDER_POSTER_FRACAO = 0.3            # capa: frame a 30% do corte
+RENDER_MAX_PARALELOS = max(1, (os.cpu_count() or 4) // 8)   # x264 rende bem até ~8 threads por encode
+
+# Loudness dos Reels: uma análise EBU R128 (ebur128) da fonte inteira vira série M/S/pico em
+# cache; cada corte tira dali os valores medidos e só faz o encode de correção (loudnorm linear)
+NORMALIZAR_AUDIO = True
+NORMALIZAR_ALVO_LUFS = -14.0
+NORMALIZAR_LRA = 11.0
+NORMALIZAR_TP = -1.5
+NORMALIZAR_AAC_KBPS = 160
+LOUDNESS_PASSO_S = 0.1                # uma amostra de M/S/pico a cada 100 ms (quadros fixos de áudio)
+LOUDNESS_CACHE_DIR = os.path.join(DOWNLOAD_CACHE_DIR, "_loudness").replace("\\", "/")
+
+# Acervo de cortes: cada corte produzido fica guardado por (vídeo, janela do relatório, parâmetros
+# de corte). Relatório reenviado com título/Foco corrigido ou um corte a mais reaproveita os iguais
+# (hardlink na pasta nova, sem download) e no Drive copia de onde já subiu, sem novo upload.
+ACERVO_ATIVO = True
+ACERVO_DIR = os.path.join(DOWNLOAD_CACHE_DIR, "_cortes").replace("\\", "/")
+ACERVO_MAX_BYTES = 50 * 1024**3     # LRU; arquivo ainda ligado a uma saída só libera espaço quando ela sai também
+
+# Modo fila (--spool-dir): vários eventos agendados no mesmo processo
+FILA_MAX_JOBS = 2
+FILA_POLL_S = 5
+
+# Retentativas (yt-dlp/rclone/HTTP): a falha é classificada pela saída e só repete a classe
+# que pode dar certo, com espera exponencial + jitter. Falhas seguidas da mesma classe abrem
+# o disjuntor da ferramenta: os próximos cortes falham na hora (ou vão pelo outro caminho).
+# "expirado" (403 de URL googlevideo vencida) repete com o info descartado; sem classe = permanente.
+RETRY_TENTATIVAS = {"rede": 4, "limite": 3, "expirado": 3, "auth": 1, "permanente": 1}
+RETRY_BASE_S = {"rede": 2.0, "limite": 30.0, "expirado": 2.0}   # espera da 1ª repetição; dobra a cada nova
+RETRY_MAX_ESPERA_S = 120
+DISJUNTOR_FALHAS = 3        # chamadas seguidas que desistiram com a mesma classe
+DISJUNTOR_ABERTO_S = 300    # depois disso uma única chamada de prova passa (meio-aberto)
+
+# Upload em lote: uma sessão rclone para a pasta toda + manifest local para pular o que já subiu
+UPLOAD_EM_LOTE = True
+UPLOAD_TRANSFERS = 4
+UPLOAD_MANIFEST_NOME = ".upload_manifest.json"
+
+# Pipeline corte -> upload: cada corte OK entra numa fila e sobe enquanto os próximos são cortados
+UPLOAD_DURANTE_CORTES = True
+UPLOAD_FILA_MAX = 8        # cortes prontos aguardando upload antes de segurar os workers de corte
+
+# Upload em streaming: o ffmpeg grava MP4 fragmentado no stdout e o mesmo fluxo vai para
+# `rclone rcat` (e para a cópia local, opcional), com tamanho/md5 calculados no caminho.
+# Só cortes -c copy do vídeo inteiro local com o upload em fundo ativo; falha volta para corte local + upload.
+UPLOAD_STREAMING = False
+STREAMING_COPIA_LOCAL = True       # False: o corte só existe no Drive (sem render Reels)
+STREAMING_LEITURA_BYTES = 1024 * 1024
 
 NOMES_CULTO_CONHECIDOS = [
     "quinta viva com cristo", "celebracao manha", "celebracao noite",
@@ -53,7 +225,8 @@ NOMES_CULTO_CONHECIDOS = [
 # =========================
 def log_step(msg: str):
     ts = datetime.now().strftime("%H:%M:%S")
-    print(f"[{ts}] {msg}", flush=True)
+    # uma única escrita por linha: várias threads/jobs logam ao mesmo tempo
+    print(f"[{ts}] {msg}\n", end="", flush=True)
 
 
 def fmt_td(seconds: float) -> str:
@@ -63,10 +236,155 @@ def fmt_td(seconds: float) -> str:
     return f"{h}h{m:02d}m{s:02d}s" if h else f"{m}m{s:02d}s"
 
 
-def obter_telemetria():
-    cpu = psutil.cpu_percent()
-    gpu = GPUtil.getGPUs()[0] if GPUtil.getGPUs() else None
-    return cpu, (gpu.temperature if gpu else 0)
+class LockArquivo:
+    """
+    Lock exclusivo entre processos via arquivo (msvcrt no Windows, flock no resto).
+    Vários runners podem apontar para o mesmo cache sem baixar/escrever em dobro.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def adquirir(self, bloquear: bool = True) -> bool:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                if os.name == "nt":
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._fd = fd
+                return True
+            except OSError:
+                if not bloquear:
+                    os.close(fd)
+                    return False
+                time.sleep(0.2)
+
+    def liberar(self):
+        if self._fd is None:
+            return
+        try:
+            if os.name == "nt":
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def vigente(self) -> bool:
+        """Travado e o arquivo no caminho ainda é o travado (quem liberou pode tê-lo apagado e outro recriado)."""
+        try:
+            return self._fd is not None and os.fstat(self._fd).st_ino == os.stat(self.path).st_ino
+        except OSError:
+            return False
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, *exc):
+        self.liberar()
+
+
+def _caminho_existente(path: str) -> str | None:
+    while path and not os.path.exists(path):
+        pai = os.path.dirname(path)
+        if pai == path:
+            return None
+        path = pai
+    return path or None
+
+
+class Telemetria:
+    """
+    Thread de fundo que amostra CPU, I/O de disco, espaço livre e (se houver
+    GPUtil + GPU) temperatura da GPU. leitura() devolve a última amostra sem
+    disparar nada; ao_amostrar recebe cada amostra nova.
+    """
+
+    def __init__(self, intervalo: float = TELEMETRIA_INTERVALO_S, ao_amostrar=None):
+        self.intervalo = intervalo
+        self.ao_amostrar = ao_amostrar
+        self._amostra = {"ts": 0.0, "cpu": 0.0, "gpu_temp": None}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._parar = threading.Event()
+        self._gpu_ok = GPUtil is not None
+        self._gpu_ts = 0.0
+        self._gpu_temp = None
+        self._io = None
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            psutil.cpu_percent(interval=None)   # primeira chamada só zera a referência
+            self._io = self._io_agora()
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="telemetria", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def leitura(self) -> dict:
+        with self._lock:
+            return dict(self._amostra)
+
+    def _io_agora(self):
+        try:
+            io = psutil.disk_io_counters()
+        except Exception:
+            io = None
+        return (time.time(), io.read_bytes, io.write_bytes) if io else None
+
+    def _temperatura_gpu(self):
+        if not self._gpu_ok or time.time() - self._gpu_ts < TELEMETRIA_GPU_INTERVALO_S:
+            return self._gpu_temp
+        self._gpu_ts = time.time()
+        try:
+            gpus = GPUtil.getGPUs()
+            self._gpu_temp = max(g.temperature for g in gpus) if gpus else None
+            if not gpus:
+                self._gpu_ok = False   # sem GPU NVIDIA: não adianta chamar nvidia-smi de novo
+        except Exception:
+            self._gpu_ok = False
+            self._gpu_temp = None
+        return self._gpu_temp
+
+    def _amostrar(self) -> dict:
+        amostra = {"ts": time.time(), "cpu": psutil.cpu_percent(interval=None), "gpu_temp": self._temperatura_gpu()}
+        io = self._io_agora()
+        if io and self._io and io[0] > self._io[0]:
+            dt = io[0] - self._io[0]
+            amostra["disco_leitura_bps"] = (io[1] - self._io[1]) / dt
+            amostra["disco_escrita_bps"] = (io[2] - self._io[2]) / dt
+        self._io = io
+        alvo = _caminho_existente(BASE_PATH)
+        if alvo:
+            amostra["livre_bytes"] = shutil.disk_usage(alvo).free
+        return amostra
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                amostra = self._amostrar()
+            except Exception as e:
+                log_step(f"Telemetria: falha na amostra ({e})")
+                continue
+            with self._lock:
+                self._amostra = amostra
+            if self.ao_amostrar:
+                try:
+                    self.ao_amostrar(amostra)
+                except Exception as e:
+                    log_step(f"Telemetria: falha no throttle ({e})")
 
 
 def _norm(s: str) -> str:
@@ -85,12 +403,18 @@ def slugify(text: str) -> str:
 
 def hhmmss_to_seconds(hhmmss: str) -> int:
     h, m, s = hhmmss.split(":")
-    return int(h) * 3600 + int(m) * 60 + int(s)
+    # "HH:MM:SS.mmm" só aparece em bordas ajustadas pelo áudio
+    return int(h) * 3600 + int(m) * 60 + (float(s) if "." in s else int(s))
 
 
 def seconds_to_hhmmss(sec: int) -> str:
     if sec < 0:
         sec = 0
+    if isinstance(sec, float):
+        if not sec.is_integer():
+            ms = round(sec * 1000)
+            return f"{seconds_to_hhmmss(ms // 1000)}.{ms % 1000:03d}"
+        sec = int(sec)
     h = sec // 3600
     sec %= 3600
     m = sec // 60
@@ -99,6 +423,7 @@ def seconds_to_hhmmss(sec: int) -> str:
 
 
 def mmss_from_seconds(sec: int) -> str:
+    sec = int(round(sec))
     if sec < 1:
         sec = 1
     return f"{sec//60:02d}:{sec%60:02d}"
@@ -149,23 +474,16 @@ ALLOWED_TAGS = ("Hook:", "Assunto:", "Motivo:", "Título:", "Titulo:")
 RE_TS_LINE = re.compile(r'^\s*\[\[(\d{2}:\d{2}:\d{2})\]\]\s+\[\[(\d{2}:\d{2}:\d{2})\]\]\s*$')
 
 
-def _parse_header_field(relatorio: str, field: str) -> str:
-    m = re.search(rf'^{re.escape(field)}\s*(.+?)\s*$', relatorio, re.MULTILINE)
-    return (m.group(1).strip() if m else "")
+RE_CAMPO_CABECALHO = re.compile(r"^(Foco da Solicitação|Tipo de Conteúdo):\s*(.*?)\s*$", re.IGNORECASE)
+RE_OURO_ALVO = re.compile(r"\bOURO\s*(10|15|20|30)\b")
+RE_LOUVOR_ANTIGO = re.compile(r'^Louvor\s*(\d+)\s*[—-]\s*(.+?)\s*$')
+RE_LOUVOR_ANTIGO_INTEGRAL = re.compile(r'^Integral:\s*\[\[(\d{2}:\d{2}:\d{2})\]\]\s+até\s+\[\[(\d{2}:\d{2}:\d{2})\]\]\s*\(Duração:\s*(\d{2}:\d{2})\)\s*$', re.IGNORECASE)
+RE_LOUVOR_ANTIGO_OURO = re.compile(r'^Ouro\s*([A-D]):\s*\[\[(\d{2}:\d{2}:\d{2})\]\]\s+até\s+\[\[(\d{2}:\d{2}:\d{2})\]\]\s*\([^)]*\)\s*[—-]\s*(.*)$', re.IGNORECASE)
+RE_CORTE_SIMPLES = re.compile(r'^\s*\[(\d{2}:\d{2}:\d{2})\]\s+até\s+\(Duração:\s*(\d{2}:\d{2})\)\s*(.*)$', re.IGNORECASE)
+SECAO_CORTES = "Cortes para Automação"
 
 
-def detectar_foco_estrito(relatorio: str) -> str:
-    foco = _parse_header_field(relatorio or "", "Foco da Solicitação:")
-    foco_n = _norm(foco).upper()
-    foco_n = foco_n.replace("Ç", "C")  # redundante, mas não dói
-    foco_n = foco_n.replace(" ", "")
-    foco_n = foco_n.replace("PREGACAO", "PREGACAO")
-    foco_n = foco_n.replace("TESTEMUNHO", "TESTEMUNHO")
-    foco_n = foco_n.replace("ORACAO", "ORACAO")
-    foco_n = foco_n.replace("LOUVOR", "LOUVOR")
-    foco_n = foco_n.replace("EBD", "EBD")
-
-    # normalização “manual” pra lidar com acento
+def _foco_estrito(foco: str) -> str:
     foco_raw = _norm(foco)
     if foco_raw in ("louvor",):
         return "LOUVOR"
@@ -180,24 +498,9 @@ def detectar_foco_estrito(relatorio: str) -> str:
     return ""
 
 
-def detectar_tipo_conteudo(relatorio: str) -> str:
-    tipo = _parse_header_field(relatorio or "", "Tipo de Conteúdo:")
-    tipo_n = _norm(tipo).upper()
-    if "EBD" == tipo_n:
-        return "EBD"
-    if "CULTO" == tipo_n:
-        return "CULTO"
-    return ""
-
-
-def detectar_tipo_corte(relatorio: str) -> str:
-    foco = detectar_foco_estrito(relatorio)
-    if foco in ALLOWED_FOCOS:
-        return foco
-
+def _foco_heuristico(foco: str) -> str:
     # fallback heurístico temporário (formatos antigos)
-    m = re.search(r"^Foco da Solicitação:\s*(.+)$", relatorio or "", re.MULTILINE | re.IGNORECASE)
-    v = (m.group(1) if m else "").lower()
+    v = (foco or "").lower()
     if "louvor" in v:
         return "LOUVOR"
     if ("pregador" in v) or ("pregação" in v) or ("pregacao" in v) or ("pastor" in v) or ("mensagem" in v):
@@ -211,8 +514,20 @@ def detectar_tipo_corte(relatorio: str) -> str:
     return "OUTROS"
 
 
+def detectar_foco_estrito(relatorio: str) -> str:
+    return parse_relatorio(relatorio).foco
+
+
+def detectar_tipo_conteudo(relatorio: str) -> str:
+    return parse_relatorio(relatorio).tipo_conteudo
+
+
+def detectar_tipo_corte(relatorio: str) -> str:
+    return parse_relatorio(relatorio).tipocorte
+
+
 def detectar_grupo_evento(relatorio: str) -> str:
-    return "EBD" if detectar_tipo_conteudo(relatorio) == "EBD" or detectar_tipo_corte(relatorio) == "EBD" else "CULTO"
+    return parse_relatorio(relatorio).grupo
 
 
 def extrair_tema_ebd(titulo_video: str) -> str:
@@ -260,39 +575,85 @@ def criar_caminho_hierarquico(data_video, titulo_video, relatorio):
     return os.path.join(ano, mes, grupo, pasta_execucao).replace("\\", "/")
 
 
+RE_TITULO_ROTULO = re.compile(r'^[A-Za-zÀ-ÿ\- ]{2,30}:\s*')
+RE_TITULO_PROIBIDOS = re.compile(r'[\\/:*?"<>|]')
+RE_ESPACOS = re.compile(r"\s+")
+
+
 def _sanitize_title(s: str) -> str:
     s = (s or "").strip()
-    s = re.sub(r'^[A-Za-zÀ-ÿ\- ]{2,30}:\s*', '', s).strip()
+    s = RE_TITULO_ROTULO.sub('', s).strip()
     s = s.strip('"').strip("'").strip()
-    s = re.sub(r'[\\/:*?"<>|]', '', s)
-    s = re.sub(r"\s+", " ", s)
+    s = RE_TITULO_PROIBIDOS.sub('', s)
+    s = RE_ESPACOS.sub(" ", s)
     return s
 
 
-def _find_cortes_section_lines(relatorio: str) -> list[str]:
-    lines = relatorio.splitlines()
-    idx = None
-    for i, raw in enumerate(lines):
-        if (raw or "").strip() == "Cortes para Automação":
-            idx = i
-            break
-    if idx is None:
-        return []
-    return lines[idx + 1 :]
-
+class Corte(Mapping):
+    """
+    Um corte do relatório, com tempos em segundos (ini_s, fim_s, dur_s).
+    Também se comporta como o dict de antes: corte["ini"] -> "HH:MM:SS",
+    corte.get("fim"), corte["dur_mmss"], {**corte, ...}.
+    origem: o corte do relatório quando as bordas foram ajustadas (nome do arquivo vem dele).
+    """
 
-def _validate_no_http_in_cortes_section(section_lines: list[str]):
-    joined = "\n".join(section_lines)
-    if "http" in joined.lower():
-        raise ValueError("Relatório inválido: existe 'http' dentro da seção 'Cortes para Automação'.")
+    __slots__ = ("ini_s", "fim_s", "dur_s", "desc", "kind", "alvo", "linha", "origem")
+    CAMPOS = ("ini", "fim", "dur_mmss", "desc", "kind", "alvo")
+
+    def __init__(self, ini_s: int, fim_s: int | None, dur_s: int, desc: str,
+                 kind: str = "CORTE", alvo: int | None = None, linha: int = 0, origem: "Corte | None" = None):
+        self.ini_s = ini_s
+        self.fim_s = fim_s
+        self.dur_s = dur_s
+        self.desc = desc
+        self.kind = kind
+        self.alvo = alvo
+        self.linha = linha
+        self.origem = origem
+
+    def __getitem__(self, campo: str):
+        if campo == "ini":
+            return seconds_to_hhmmss(self.ini_s)
+        if campo == "fim":
+            return seconds_to_hhmmss(self.fim_s) if self.fim_s is not None else None
+        if campo == "dur_mmss":
+            return mmss_from_seconds(self.dur_s)
+        if campo in ("desc", "kind", "alvo"):
+            return getattr(self, campo)
+        raise KeyError(campo)
+
+    def __iter__(self):
+        return iter(self.CAMPOS)
+
+    def __len__(self):
+        return len(self.CAMPOS)
+
+    def __repr__(self):
+        return f"Corte({self['ini']}->{self['fim'] or '+' + self['dur_mmss']}, {self.kind}, {self.desc!r})"
+
+
+class Relatorio:
+    """
+    Modelo do relatório montado numa única passada: campos do cabeçalho,
+    foco/tipo/grupo, formato reconhecido, cortes e todos os erros de validação.
+    """
 
+    __slots__ = ("sha1", "campos", "foco", "tipo_conteudo", "tipocorte", "grupo", "formato", "cortes", "erros")
 
-def _validate_no_triple_bracket(relatorio: str):
-    if "[[[" in relatorio:
-        raise ValueError("Relatório inválido: contém '[[[' (proibido).")
+    def __init__(self, sha1: str, campos: dict, formato: str, cortes: tuple, erros: tuple):
+        self.sha1 = sha1
+        self.campos = campos
+        self.foco = _foco_estrito(campos.get("foco da solicitação", ""))
+        tipo = _norm(campos.get("tipo de conteúdo", "")).upper()
+        self.tipo_conteudo = tipo if tipo in ALLOWED_TIPOS else ""
+        self.tipocorte = self.foco if self.foco in ALLOWED_FOCOS else _foco_heuristico(campos.get("foco da solicitação", ""))
+        self.grupo = "EBD" if self.tipo_conteudo == "EBD" or self.tipocorte == "EBD" else "CULTO"
+        self.formato = formato
+        self.cortes = cortes
+        self.erros = erros
 
 
-def extrair_cortes_formato_novo(relatorio: str, foco: str):
+def _tokenizar_relatorio(relatorio: str, sha1: str) -> Relatorio:
     """
     Formato novo:
       Cabeçalho com Foco da Solicitação
@@ -300,452 +661,4106 @@ def extrair_cortes_formato_novo(relatorio: str, foco: str):
       Blocos de 2 linhas:
         [[HH:MM:SS]] [[HH:MM:SS]]
         Hook:/Assunto:/Motivo:/Título: ... (para LOUVOR deve conter INTEGRAL ou OURO 10/15/20/30)
-    Retorna lista de dicts: {ini, fim, dur_mmss, titulo, kind, alvo}
+    Na mesma passada coleta os candidatos dos formatos antigos (louvor do
+    Gemini e "[HH:MM:SS] até (Duração: MM:SS)"), usados só se não houver seção.
     """
-    _validate_no_triple_bracket(relatorio)
+    campos = {}
+    erros = []
+    novos = []          # (ini_s, fim_s, linha2, nº da linha)
+    antigos = []
+    simples = []
+    na_secao = False
+    pendente = None     # timestamps aguardando a linha 2
+    louvor_atual = None
+    http_na_secao = False
+    colchete_triplo = False
+
+    for n, raw in enumerate(relatorio.splitlines(), 1):
+        line = raw.strip()
+        if not line:
+            continue
 
-    section = _find_cortes_section_lines(relatorio)
-    if not section:
-        return []
+        if not colchete_triplo and "[[[" in line:
+            colchete_triplo = True
+            erros.append(f"Relatório inválido: contém '[[[' (proibido) (linha {n}).")
 
-    _validate_no_http_in_cortes_section(section)
+        if line[0] in "FfTt" and ":" in line:
+            m = RE_CAMPO_CABECALHO.match(line)
+            if m and m.group(2):
+                campos.setdefault(m.group(1).lower(), m.group(2))
 
+        if not na_secao:
+            if line == SECAO_CORTES:
+                na_secao = True
+                continue
+        else:
+            if not http_na_secao and "http" in line.lower():
+                http_na_secao = True
+                erros.append(f"Relatório inválido: existe 'http' dentro da seção '{SECAO_CORTES}' (linha {n}).")
+            if pendente is None:
+                m = RE_TS_LINE.match(line)
+                if m:
+                    ini_s, fim_s = hhmmss_to_seconds(m.group(1)), hhmmss_to_seconds(m.group(2))
+                    if fim_s <= ini_s:
+                        erros.append(f"Relatório inválido: fim <= início no corte {m.group(1)} -> {m.group(2)} (linha {n})")
+                    pendente = (ini_s, fim_s, n, m.group(1), m.group(2))
+                else:
+                    erros.append(f"Relatório inválido na seção de cortes: linha de timestamp fora do padrão: '{line}' (linha {n})")
+            else:
+                ini_s, fim_s, n1, _, _ = pendente
+                pendente = None
+                if not line.startswith(ALLOWED_TAGS):
+                    erros.append(f"Relatório inválido: linha 2 deve começar com Hook:/Assunto:/Motivo:/Título:. Recebido: '{line}' (linha {n})")
+                elif fim_s > ini_s:
+                    novos.append((ini_s, fim_s, line, n1))
+
+        # candidatos dos formatos antigos (filtro barato pelo primeiro caractere)
+        c0 = line[0]
+        if c0 == "L":
+            m = RE_LOUVOR_ANTIGO.match(line)
+            if m:
+                louvor_atual = (int(m.group(1)), m.group(2).strip())
+                continue
+        if louvor_atual and c0 in "IiOo":
+            m = RE_LOUVOR_ANTIGO_INTEGRAL.match(line)
+            if m:
+                ini_s, fim_s = hhmmss_to_seconds(m.group(1)), hhmmss_to_seconds(m.group(2))
+                titulo = f"LOUVOR_{louvor_atual[0]:02d}_INTEGRAL__{_sanitize_title(louvor_atual[1])[:80].strip()}"
+                antigos.append(Corte(ini_s, fim_s, max(1, fim_s - ini_s), titulo, "INTEGRAL", None, n))
+                continue
+            m = RE_LOUVOR_ANTIGO_OURO.match(line)
+            if m:
+                ini_s, fim_s = hhmmss_to_seconds(m.group(2)), hhmmss_to_seconds(m.group(3))
+                titulo = (f"LOUVOR_{louvor_atual[0]:02d}_OURO_{m.group(1)}__{_sanitize_title(louvor_atual[1])[:60].strip()}"
+                          f"__{_sanitize_title(m.group(4))[:60].strip()}")
+                antigos.append(Corte(ini_s, fim_s, max(1, fim_s - ini_s), titulo, "OURO", None, n))
+                continue
+        if c0 == "[" and not line.startswith("[["):
+            m = RE_CORTE_SIMPLES.match(line)
+            if m:
+                mm, ss = m.group(2).split(":")
+                titulo = _sanitize_title(m.group(3)) or f"corte_{len(simples) + 1}"
+                simples.append(Corte(hhmmss_to_seconds(m.group(1)), None, int(mm) * 60 + int(ss), titulo, "CORTE", None, n))
+
+    if pendente is not None:
+        erros.append(f"Relatório inválido: faltou a linha 2 (descrição) após timestamps {pendente[3]} {pendente[4]} (linha {pendente[2]})")
+
+    rel = Relatorio(sha1, campos, "", (), ())
     cortes = []
-    i = 0
-    while i < len(section):
-        line1 = (section[i] or "").strip()
-        if not line1:
-            i += 1
-            continue
+    for ini_s, fim_s, line2, n in novos:
+        desc = _sanitize_title(line2)
+        kind, alvo = "CORTE", None
+        if rel.tipocorte == "LOUVOR":
+            up = _norm(desc).upper()
+            if "INTEGRAL" in up:
+                kind = "INTEGRAL"
+            else:
+                mo = RE_OURO_ALVO.search(up)
+                if not mo:
+                    erros.append(f"Relatório LOUVOR inválido: cada corte precisa indicar INTEGRAL ou OURO 10/15/20/30 na linha 2 (linha {n}).")
+                    continue
+                kind, alvo = "OURO", int(mo.group(1))
+        cortes.append(Corte(ini_s, fim_s, fim_s - ini_s, desc or f"corte_{len(cortes) + 1}", kind, alvo, n))
+
+    if cortes or erros:
+        rel.formato, rel.cortes = "novo", tuple(cortes)
+    elif antigos:
+        rel.formato, rel.cortes = "louvor_antigo", tuple(antigos)
+    elif simples:
+        rel.formato, rel.cortes = "simples", tuple(simples)
+    rel.erros = tuple(erros)
+    return rel
+
+
+_relatorios = {}                  # sha1 -> Relatorio (o mesmo relatório é consultado várias vezes por job)
+_relatorios_lock = threading.Lock()
+_RELATORIOS_MAX = 32
+
+
+def parse_relatorio(relatorio: str) -> Relatorio:
+    relatorio = relatorio or ""
+    chave = hashlib.sha1(relatorio.encode("utf-8", errors="replace")).hexdigest()
+    with _relatorios_lock:
+        rel = _relatorios.get(chave)
+    if rel is not None:
+        return rel
+    rel = _tokenizar_relatorio(relatorio, chave)
+    with _relatorios_lock:
+        if len(_relatorios) >= _RELATORIOS_MAX:
+            _relatorios.pop(next(iter(_relatorios)))
+        _relatorios[chave] = rel
+    return rel
+
 
-        m = RE_TS_LINE.match(line1)
-        if not m:
-            raise ValueError(f"Relatório inválido na seção de cortes: linha de timestamp fora do padrão: '{line1}'")
+def extrair_cortes(relatorio: str):
+    rel = parse_relatorio(relatorio)
+    if rel.erros:
+        # todos os problemas de uma vez, não só o primeiro
+        raise ValueError("\n".join(rel.erros))
+    if not rel.cortes:
+        raise ValueError("Não encontrei cortes. Use o formato novo com 'Cortes para Automação' e blocos [[HH:MM:SS]] [[HH:MM:SS]] + linha 2.")
+    tipocorte = "LOUVOR" if rel.formato == "louvor_antigo" else rel.tipocorte
+    return tipocorte, list(rel.cortes)
 
-        ini, fim = m.group(1), m.group(2)
-        if hhmmss_to_seconds(fim) <= hhmmss_to_seconds(ini):
-            raise ValueError(f"Relatório inválido: fim <= início no corte {ini} -> {fim}")
 
-        # linha2 obrigatória (próxima não vazia)
-        j = i + 1
-        while j < len(section) and not (section[j] or "").strip():
-            j += 1
-        if j >= len(section):
-            raise ValueError(f"Relatório inválido: faltou a linha 2 (descrição) após timestamps {ini} {fim}")
+# =========================
+# Rastreamento (spans)
+# =========================
+class Rastro:
+    """
+    Spans de um job. Cada span guarda pai, thread, início/duração e atributos;
+    exportar() grava JSONL e o formato de trace do Chrome ao lado do histórico.
+    """
 
-        line2 = (section[j] or "").strip()
-        if not line2.startswith(ALLOWED_TAGS):
-            raise ValueError(f"Relatório inválido: linha 2 deve começar com Hook:/Assunto:/Motivo:/Título:. Recebido: '{line2}'")
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.inicio = time.time()
+        self.destino = None          # base do historico_*.md (sem extensão)
+        self.spans = []
+        self._lock = threading.Lock()
+        self._ids = iter(range(1, 1 << 62))
+
+    def novo_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def registrar(self, registro: dict):
+        with self._lock:
+            self.spans.append(registro)
+
+    def exportar(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda r: r["ini_s"])
+        with open(self.destino + ".spans.jsonl", "w", encoding="utf-8") as f:
+            for r in spans:
+                f.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+
+        pid = os.getpid()
+        eventos = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": os.path.basename(self.destino)}}]
+        for tid, nome in {r["tid"]: r["thread"] for r in spans}.items():
+            eventos.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": nome}})
+        for r in spans:
+            eventos.append({"name": r["nome"], "cat": r["nome"].split(":")[0], "ph": "X", "pid": pid, "tid": r["tid"],
+                            "ts": round(r["ini_s"] * 1e6), "dur": round(r["dur_s"] * 1e6), "args": r["attrs"]})
+        with open(self.destino + ".trace.json", "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": eventos, "displayTimeUnit": "ms",
+                       "otherData": {"inicio": datetime.fromtimestamp(self.inicio).isoformat(timespec="seconds")}},
+                      f, ensure_ascii=False, default=str)
+
+
+_rastro_atual = contextvars.ContextVar("rastro_atual", default=None)
+_span_atual = contextvars.ContextVar("span_atual", default=None)
+
+
+class _SpanNulo:
+    # rastreamento desligado: um único objeto reaproveitado, sem relógio nem lock
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
 
-        desc = _sanitize_title(line2)
 
-        kind = "CORTE"
-        alvo = None
+_SPAN_NULO = _SpanNulo()
 
-        if foco == "LOUVOR":
-            up = _norm(desc).upper()
-            if "INTEGRAL" in up:
-                kind = "INTEGRAL"
-            else:
-                mo = re.search(r"\bOURO\s*(10|15|20|30)\b", up)
-                if not mo:
-                    raise ValueError("Relatório LOUVOR inválido: cada corte precisa indicar INTEGRAL ou OURO 10/15/20/30 na linha 2.")
-                kind = "OURO"
-                alvo = int(mo.group(1))
-
-        dur_sec = hhmmss_to_seconds(fim) - hhmmss_to_seconds(ini)
-        dur_mmss = mmss_from_seconds(dur_sec)
-
-        cortes.append({
-            "ini": ini,
-            "fim": fim,
-            "dur_mmss": dur_mmss,
-            "desc": desc or f"corte_{len(cortes)+1}",
-            "kind": kind,
-            "alvo": alvo,
-        })
 
-        i = j + 1
+class _Span:
+    __slots__ = ("rastro", "nome", "attrs", "id", "pai", "t0", "_token")
 
-    return cortes
+    def __init__(self, rastro: Rastro, nome: str, attrs: dict):
+        self.rastro = rastro
+        self.nome = nome
+        self.attrs = attrs
 
+    def set(self, **attrs):
+        self.attrs.update(attrs)
 
-# ========= fallbacks (antigos) =========
-def extrair_cortes_louvor_gemini_antigo(relatorio: str):
-    linhas = relatorio.splitlines()
-    cortes = []
+    def __enter__(self):
+        pai = _span_atual.get()
+        self.pai = pai.id if pai else None
+        self.id = self.rastro.novo_id()
+        self._token = _span_atual.set(self)
+        self.t0 = time.perf_counter()
+        return self
 
-    re_header = re.compile(r'^Louvor\s*(\d+)\s*[—-]\s*(.+?)\s*$')
-    re_integral = re.compile(r'^Integral:\s*\[\[(\d{2}:\d{2}:\d{2})\]\]\s+até\s+\[\[(\d{2}:\d{2}:\d{2})\]\]\s*\(Duração:\s*(\d{2}:\d{2})\)\s*$', re.IGNORECASE)
-    re_ouro = re.compile(r'^Ouro\s*([A-D]):\s*\[\[(\d{2}:\d{2}:\d{2})\]\]\s+até\s+\[\[(\d{2}:\d{2}:\d{2})\]\]\s*\([^)]*\)\s*[—-]\s*(.*)$', re.IGNORECASE)
+    def __exit__(self, tipo, exc, tb):
+        fim = time.perf_counter()
+        _span_atual.reset(self._token)
+        if exc is not None:
+            self.attrs["erro"] = str(exc)[-300:]
+        th = threading.current_thread()
+        self.rastro.registrar({
+            "id": self.id, "pai": self.pai, "nome": self.nome,
+            "ini_s": round(self.t0 - self.rastro.t0, 6), "dur_s": round(fim - self.t0, 6),
+            "thread": th.name, "tid": th.ident, "attrs": self.attrs,
+        })
+        return False
 
-    def sanitize(s: str, max_len: int = 80) -> str:
-        s = _sanitize_title(s)
-        return s[:max_len].strip()
 
-    cur = None
-    for raw in linhas:
-        line = (raw or "").strip()
-        if not line:
-            continue
-        mh = re_header.match(line)
-        if mh:
-            cur = {"idx": int(mh.group(1)), "nome": mh.group(2).strip()}
-            continue
-        if cur is None:
-            continue
+def span(nome: str, **attrs):
+    """with span("etapa", idx=3) as sp: ... ; sp.set(rc=0). Sem rastro ativo é no-op."""
+    rastro = _rastro_atual.get()
+    if rastro is None:
+        return _SPAN_NULO
+    return _Span(rastro, nome, attrs)
 
-        mi = re_integral.match(line)
-        if mi:
-            inicio, fim, dur = mi.group(1), mi.group(2), mi.group(3)
-            titulo = f"LOUVOR_{cur['idx']:02d}_INTEGRAL__{sanitize(cur['nome'], 80)}"
-            cortes.append({"ini": inicio, "fim": fim, "dur_mmss": dur, "desc": titulo, "kind": "INTEGRAL", "alvo": None})
-            continue
 
-        mo = re_ouro.match(line)
-        if mo:
-            letra, inicio, fim, trecho = mo.group(1), mo.group(2), mo.group(3), mo.group(4)
-            dur_sec = max(1, hhmmss_to_seconds(fim) - hhmmss_to_seconds(inicio))
-            dur = mmss_from_seconds(dur_sec)
-            titulo = f"LOUVOR_{cur['idx']:02d}_OURO_{letra}__{sanitize(cur['nome'], 60)}__{sanitize(trecho, 60)}"
-            cortes.append({"ini": inicio, "fim": fim, "dur_mmss": dur, "desc": titulo, "kind": "OURO", "alvo": None})
-            continue
+def anotar(**attrs):
+    """Acrescenta atributos ao span corrente (se houver)."""
+    sp = _span_atual.get()
+    if sp is not None:
+        sp.attrs.update(attrs)
 
-    return cortes
 
+def rastreado(nome: str, atributos=None):
+    """Decorador: cada chamada vira um span; atributos(resultado) -> dict extra."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def envolto(*a, **kw):
+            if _rastro_atual.get() is None:
+                return fn(*a, **kw)
+            with span(nome) as sp:
+                r = fn(*a, **kw)
+                if atributos:
+                    sp.set(**atributos(r))
+                return r
+        return envolto
+    return deco
 
-def extrair_cortes(relatorio: str):
-    foco = detectar_tipo_corte(relatorio)
-
-    # 1) formato novo (principal)
-    cortes = extrair_cortes_formato_novo(relatorio, foco)
-    if cortes:
-        return foco, cortes
-
-    # 2) fallback louvor antigo
-    cortes2 = extrair_cortes_louvor_gemini_antigo(relatorio)
-    if cortes2:
-        return "LOUVOR", cortes2
-
-    # 3) fallback "plain"
-    linhas = relatorio.splitlines()
-    cortes3 = []
-    re_plain = re.compile(r'^\s*\[(\d{2}:\d{2}:\d{2})\]\s+até\s+\(Duração:\s*(\d{2}:\d{2})\)\s*(.*)$', re.IGNORECASE)
-    for raw in linhas:
-        line = (raw or "").strip()
-        m = re_plain.match(line)
-        if not m:
-            continue
-        ini, dur, rest = m.group(1), m.group(2), _sanitize_title(m.group(3))
-        titulo = rest or f"corte_{len(cortes3)+1}"
-        cortes3.append({"ini": ini, "fim": None, "dur_mmss": dur, "desc": titulo, "kind": "CORTE", "alvo": None})
-    if cortes3:
-        return foco, cortes3
 
-    raise ValueError("Não encontrei cortes. Use o formato novo com 'Cortes para Automação' e blocos [[HH:MM:SS]] [[HH:MM:SS]] + linha 2.")
+def _tamanho(path) -> int | None:
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return None
 
 
 # =========================
 # Execução (yt-dlp/ffmpeg)
 # =========================
-def run_cmd_live(cmd, check=True):
-    log_step("CMD: " + " ".join(str(x) for x in cmd))
-    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace")
-    out_lines = []
-    for line in p.stdout:
-        print(line, end="", flush=True)
-        out_lines.append(line)
-    rc = p.wait()
-    out = "".join(out_lines)
-    if check and rc != 0:
-        raise RuntimeError(out)
-    return rc, out
+_UNIDADES = {"B": 1, "KB": 1000, "MB": 1000**2, "GB": 1000**3, "TB": 1000**4,
+             "KIB": 1024, "MIB": 1024**2, "GIB": 1024**3, "TIB": 1024**4}
 
+RE_PROG_YTDLP = re.compile(
+    r"^\[download\]\s+([\d.]+)%\s+of\s+~?\s*([\d.]+)\s*([KMGT]?i?B)"
+    r"(?:\s+in\s+[\d:]+)?(?:\s+at\s+([\d.]+)\s*([KMGT]?i?B)/s)?(?:\s+ETA\s+([\d:]+))?"
+)
+RE_PROG_FFMPEG = re.compile(r"(?:^|\s)time=\s*(-?\d+):(\d\d):(\d\d(?:\.\d+)?)")
+RE_FFMPEG_CAMPO = re.compile(r"(frame|fps|size|speed)=\s*([\d.]+)\s*([KMG]i?B|kB|x)?")
+RE_PROG_RCLONE = re.compile(
+    r"([\d.]+)\s*([KMGT]?i?B)\s*/\s*([\d.]+)\s*([KMGT]?i?B),\s*(\d+)%,\s*([\d.]+)\s*([KMGT]?i?B)/s(?:,\s*ETA\s*(\S+))?"
+)
 
-def cache_key_for_url(url: str) -> str:
-    return hashlib.sha1(url.encode("utf-8", errors="replace")).hexdigest()[:16]
 
+def _para_bytes(valor: str, unidade: str) -> float:
+    return float(valor) * _UNIDADES.get(unidade.upper(), 1)
 
-def ytdlp_base_cmd():
-    return [
-        "yt-dlp",
-        "--cookies", YTDLP_COOKIES_TXT_PATH,
-        "--remote-components", "ejs:github",
-        "--js-runtimes", f"node:{YTDLP_NODE_EXE}",
-        *YTDLP_NET_ARGS
-    ]
 
+def _hms_para_s(txt: str) -> float:
+    s = 0.0
+    for parte in txt.split(":"):
+        s = s * 60 + float(parte)
+    return s
 
-def garantir_download_inteiro(url_youtube: str) -> str:
-    os.makedirs(DOWNLOAD_CACHE_DIR, exist_ok=True)
-    key = cache_key_for_url(url_youtube)
-    outtmpl = os.path.join(DOWNLOAD_CACHE_DIR, f"{key}.%(ext)s")
-    mp4_path = os.path.join(DOWNLOAD_CACHE_DIR, f"{key}.mp4")
 
-    if os.path.exists(mp4_path) and os.path.getsize(mp4_path) > 0:
-        log_step(f"Cache hit (vídeo inteiro): {mp4_path}")
-        return mp4_path
+def _rclone_eta_s(txt: str) -> float | None:
+    # "1h2m3s", "45s", "-"
+    partes = re.findall(r"([\d.]+)([hms])", txt or "")
+    if not partes:
+        return None
+    return sum(float(v) * {"h": 3600, "m": 60, "s": 1}[u] for v, u in partes)
 
-    log_step("Baixando vídeo inteiro (cache) via yt-dlp...")
-    cmd = [*ytdlp_base_cmd(), "-f", YTDLP_FORMAT_FULL, "--merge-output-format", "mp4", "-o", outtmpl, url_youtube]
-    rc, out = run_cmd_live(cmd, check=False)
-    if rc != 0:
-        raise RuntimeError(out)
 
-    if os.path.exists(mp4_path) and os.path.getsize(mp4_path) > 0:
-        return mp4_path
+def parse_progresso(linha: str) -> dict | None:
+    """
+    Linha de progresso do yt-dlp / ffmpeg / rclone -> evento estruturado.
+    Retorna None para linhas comuns.
+    """
+    m = RE_PROG_YTDLP.match(linha.strip())
+    if m:
+        ev = {"ferramenta": "yt-dlp", "pct": float(m.group(1)), "total_bytes": _para_bytes(m.group(2), m.group(3))}
+        if m.group(4):
+            ev["velocidade_bps"] = _para_bytes(m.group(4), m.group(5))
+        if m.group(6):
+            ev["eta_s"] = _hms_para_s(m.group(6))
+        return ev
+
+    m = RE_PROG_FFMPEG.search(linha)
+    if m and "speed=" in linha:
+        ev = {"ferramenta": "ffmpeg", "out_time_s": max(0.0, int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3)))}
+        for campo, valor, unidade in RE_FFMPEG_CAMPO.findall(linha):
+            if campo == "size":
+                ev["size_bytes"] = _para_bytes(valor, unidade or "KiB")
+            elif campo == "speed":
+                ev["speed"] = float(valor)
+            else:
+                ev[campo] = float(valor)
+        return ev
+
+    m = RE_PROG_RCLONE.search(linha)
+    if m:
+        ev = {"ferramenta": "rclone", "bytes": _para_bytes(m.group(1), m.group(2)),
+              "total_bytes": _para_bytes(m.group(3), m.group(4)), "pct": float(m.group(5)),
+              "velocidade_bps": _para_bytes(m.group(6), m.group(7))}
+        eta = _rclone_eta_s(m.group(8))
+        if eta is not None:
+            ev["eta_s"] = eta
+        return ev
+    return None
+
+
+def _duracao_do_cmd(cmd) -> float | None:
+    # ffmpeg não informa o total no progresso; a duração sai do próprio comando (-t / -ss..-to)
+    args = [str(x) for x in cmd]
+    try:
+        if "-t" in args:
+            return float(args[args.index("-t") + 1])   # no lote, o primeiro -t é a janela de entrada
+        if "-to" in args and "-ss" in args:
+            return hhmmss_to_seconds(args[args.index("-to") + 1]) - hhmmss_to_seconds(args[args.index("-ss") + 1])
+    except (ValueError, IndexError):
+        pass
+    return None
 
-    for fn in os.listdir(DOWNLOAD_CACHE_DIR):
-        if fn.startswith(key + "."):
-            fp = os.path.join(DOWNLOAD_CACHE_DIR, fn)
-            if os.path.getsize(fp) > 0:
-                return fp
 
-    raise RuntimeError("Download inteiro finalizou, mas arquivo não encontrado no cache.")
+class MetricasCorte:
+    """
+    Acumula o progresso dos subprocessos de um corte (ou etapa): MB/s de download,
+    fator de velocidade do ffmpeg e a primeira estimativa de ETA.
+    """
 
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.download_bytes = 0.0
+        self.download_s = 0.0
+        self.ffmpeg_midia_s = 0.0
+        self.ffmpeg_s = 0.0
+        self.ffmpeg_fps = None
+        self.upload_bytes = 0.0
+        self.upload_s = 0.0
+        self.eta_inicial_s = None
+
+    def registrar_eta(self, eta_s: float):
+        with self._lock:
+            if self.eta_inicial_s is None and eta_s > 0:
+                self.eta_inicial_s = eta_s
+
+    def adicionar(self, resumo: dict):
+        with self._lock:
+            f = resumo["ferramenta"]
+            if f in ("yt-dlp", "http"):
+                self.download_bytes += resumo.get("bytes", 0)
+                self.download_s += resumo["segundos"]
+            elif f == "ffmpeg":
+                self.ffmpeg_midia_s += resumo.get("out_time_s", 0)
+                self.ffmpeg_s += resumo["segundos"]
+                if resumo.get("fps"):
+                    self.ffmpeg_fps = resumo["fps"]
+            elif f == "rclone":
+                self.upload_bytes += resumo.get("bytes", 0)
+                self.upload_s += resumo["segundos"]
+
+    def resumo(self) -> dict:
+        r = {}
+        with self._lock:
+            if self.download_bytes and self.download_s:
+                r["download_mb"] = round(self.download_bytes / 1024**2, 1)
+                r["download_mb_s"] = round(self.download_bytes / 1024**2 / self.download_s, 2)
+            if self.ffmpeg_midia_s and self.ffmpeg_s:
+                r["ffmpeg_speed"] = round(self.ffmpeg_midia_s / self.ffmpeg_s, 2)
+            if self.ffmpeg_fps:
+                r["ffmpeg_fps"] = self.ffmpeg_fps
+            if self.upload_bytes and self.upload_s:
+                r["upload_mb_s"] = round(self.upload_bytes / 1024**2 / self.upload_s, 2)
+            if self.eta_inicial_s is not None:
+                r["eta_inicial_s"] = round(self.eta_inicial_s, 1)
+        return r
+
+    def texto(self) -> str:
+        r = self.resumo()
+        partes = []
+        if "download_mb_s" in r:
+            partes.append(f"dl {r['download_mb_s']:.1f} MB/s")
+        if "ffmpeg_speed" in r:
+            partes.append(f"ffmpeg {r['ffmpeg_speed']:.1f}x")
+        if "eta_inicial_s" in r:
+            partes.append(f"ETA≈{fmt_td(r['eta_inicial_s'])}")
+        return "; ".join(partes) or "-"
+
+
+_metricas_atual = contextvars.ContextVar("metricas_atual", default=None)
+
+
+@contextmanager
+def coletar_metricas():
+    """Todo run_cmd_live dentro do bloco (nesta thread/contexto) soma nas métricas devolvidas."""
+    met = MetricasCorte()
+    token = _metricas_atual.set(met)
+    try:
+        yield met
+    finally:
+        _metricas_atual.reset(token)
+
+
+def _acumular_progresso(prog: dict, ev: dict):
+    f = prog.setdefault("ferramenta", ev["ferramenta"])
+    if f == "yt-dlp":
+        # vídeo e áudio (ou fragmentos de seção) são arquivos separados: o % volta a zero
+        if ev["pct"] + 1 < prog.get("_pct", 0):
+            prog["_concluidos"] = prog.get("_concluidos", 0) + prog.get("_total", 0)
+        prog["_pct"], prog["_total"] = ev["pct"], ev["total_bytes"]
+        prog["bytes"] = prog.get("_concluidos", 0) + ev["total_bytes"] * ev["pct"] / 100
+    else:
+        prog.update({k: v for k, v in ev.items() if k != "ferramenta"})
 
-def cortar_local_por_ini_fim(video_path: str, ini_hhmmss: str, fim_hhmmss: str, saida_path: str):
-    os.makedirs(os.path.dirname(saida_path), exist_ok=True)
-    # usa -to (fim absoluto) para casar com o relatório (snap já vem pronto)
-    cmd = ["ffmpeg", "-y", "-hide_banner", "-ss", ini_hhmmss, "-to", fim_hhmmss, "-i", video_path, "-c", "copy", saida_path]
-    rc, out = run_cmd_live(cmd, check=False)
-    if rc != 0:
-        raise RuntimeError(out)
 
+def matar_arvore(pid: int):
+    """Mata o processo e todos os descendentes (yt-dlp -> ffmpeg etc.), filhos primeiro."""
+    try:
+        raiz = psutil.Process(pid)
+        procs = [*raiz.children(recursive=True), raiz]
+    except psutil.NoSuchProcess:
+        return
+    for pr in procs:
+        try:
+            pr.kill()
+        except psutil.NoSuchProcess:
+            pass
+    psutil.wait_procs(procs, timeout=5)
 
-def cortar_local_por_dur(video_path: str, ini_hhmmss: str, dur_mmss: str, saida_path: str):
-    duracao = f"00:{dur_mmss}"
-    os.makedirs(os.path.dirname(saida_path), exist_ok=True)
-    cmd = ["ffmpeg", "-y", "-hide_banner", "-ss", ini_hhmmss, "-t", duracao, "-i", video_path, "-c", "copy", saida_path]
-    rc, out = run_cmd_live(cmd, check=False)
-    if rc != 0:
-        raise RuntimeError(out)
 
+class Vigia:
+    """
+    Watchdog de um subprocesso (ou de um encadeamento deles): uma thread confere a cada
+    segundo o último avanço e o prazo da etapa e, estourado um dos dois, mata as árvores.
+    O prazo parte da duração da mídia (quando conhecida) e cresce com o progresso: total
+    de bytes informado (yt-dlp/rclone) ou tempo de mídia do ffmpeg avançando.
+    """
 
-def tentar_baixar_trecho(url_youtube: str, inicio_hhmmss: str, duracao_mmss: str, saida_path: str):
-    end = seconds_to_hhmmss(hhmmss_to_seconds(inicio_hhmmss) + (int(duracao_mmss.split(":")[0]) * 60 + int(duracao_mmss.split(":")[1])))
-    section = f"*{inicio_hhmmss}-{end}"
-    cmd = [*ytdlp_base_cmd(), "-f", YTDLP_FORMAT_FULL,
-           "--download-sections", section, "--force-keyframes-at-cuts",
-           "--merge-output-format", "mp4", "-o", saida_path, url_youtube]
-    rc, out = run_cmd_live(cmd, check=False)
-    if rc == 0 and os.path.exists(saida_path) and os.path.getsize(saida_path) > 0:
-        return True, out, section
-    return False, out, section
+    def __init__(self, procs: list, nome: str, midia_s: float | None = None):
+        self.procs = procs
+        self.nome = nome
+        agora = time.time()
+        self.t0 = self.ultimo = agora
+        self.prazo = agora + max(WATCHDOG_PRAZO_MIN_S, (midia_s or 0) / WATCHDOG_FFMPEG_SPEED_MIN)
+        self.motivo = None
+        self._marca = None
+        self._fase_t0 = agora
+        self._fim = threading.Event()
+        if WATCHDOG_ATIVO:
+            threading.Thread(target=self._vigiar, name=f"vigia-{nome}", daemon=True).start()
+
+    def linha(self, ev: dict | None = None):
+        agora = time.time()
+        if ev:
+            marca = (ev.get("pct"), ev.get("bytes"), ev.get("out_time_s"))
+            if marca == self._marca:
+                return   # rclone repete a mesma linha de stats a cada 10s mesmo parado
+            # yt-dlp: o % volta a zero a cada arquivo (vídeo, áudio); o prazo conta do início de cada um
+            if ev.get("pct") is not None and self._marca and ev["pct"] + 1 < (self._marca[0] or 0):
+                self._fase_t0 = agora
+            elif ev.get("out_time_s") is not None and self._marca and ev["out_time_s"] + 1 < (self._marca[2] or 0):
+                self._fase_t0 = agora
+            self._marca = marca
+            if ev.get("total_bytes"):
+                self.prazo = max(self.prazo, self._fase_t0 + ev["total_bytes"] / WATCHDOG_VAZAO_MIN_BPS)
+            if ev.get("out_time_s"):
+                # enquanto o ffmpeg anda a pelo menos WATCHDOG_FFMPEG_SPEED_MIN, o prazo acompanha
+                # (render, ebur128, merge e trechos do yt-dlp não têm -t no comando)
+                self.prazo = max(self.prazo, self._fase_t0 + WATCHDOG_PRAZO_MIN_S + ev["out_time_s"] / WATCHDOG_FFMPEG_SPEED_MIN)
+        self.ultimo = agora
+
+    def _vigiar(self):
+        while not self._fim.wait(1.0):
+            agora = time.time()
+            if agora - self.ultimo > WATCHDOG_SEM_PROGRESSO_S:
+                self.motivo = f"sem progresso há {agora - self.ultimo:.0f}s"
+            elif agora > self.prazo:
+                self.motivo = f"fora do prazo da etapa ({fmt_td(agora - self.t0)})"
+            else:
+                continue
+            log_step(f"Vigia: {self.nome} {self.motivo}; encerrando a árvore do processo.")
+            for p in self.procs:
+                matar_arvore(p.pid)
+            return
+
+    def parar(self) -> str:
+        """Encerra a vigia. Com processo morto por ela, devolve a linha de erro para a saída (classe rede)."""
+        self._fim.set()
+        if not self.motivo:
+            return ""
+        anotar(vigia=self.motivo)
+        return f"ERROR: vigia: {self.nome} {self.motivo}; processo encerrado (timed out)\n"
+
+
+def run_cmd_live(cmd, check=True, eco=True, ao_linha=None, midia_s=None):
+    """
+    Roda o comando ecoando a saída e guardando só os últimos SAIDA_MAX_BYTES
+    (o que vai para debug/erro). Linhas de progresso viram eventos (ao_linha
+    recebe (linha, evento|None)) e são somadas nas métricas do contexto atual.
+    Travado ou fora do prazo, a Vigia mata o processo e a saída ganha o motivo.
+    `midia_s`: duração da mídia processada, quando o comando não a traz (-t / -to).
+    """
+    # [python, script.py, ...] (stubs do benchmark) -> nome do script
+    exe = cmd[1] if len(cmd) > 1 and os.path.basename(str(cmd[0])).lower().startswith("python") else cmd[0]
+    ferramenta = os.path.splitext(os.path.basename(str(exe)))[0]
+    with span(f"cmd:{ferramenta}", ferramenta=ferramenta) as sp:
+        log_step("CMD: " + " ".join(str(x) for x in cmd))
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace")
+        cauda = deque()
+        cauda_bytes = 0
+        prog = {}
+        met = _metricas_atual.get()
+        duracao = midia_s or _duracao_do_cmd(cmd)
+        vigia = Vigia([p], ferramenta, duracao if midia_s or ferramenta == "ffmpeg" else None)
+        t0 = time.time()
+        ultimo_eco = 0.0
+        for line in p.stdout:
+            ev = parse_progresso(line)
+            vigia.linha(ev)
+            if ev:
+                _acumular_progresso(prog, ev)
+                if ev["ferramenta"] == "ffmpeg" and duracao and ev.get("speed"):
+                    ev["eta_s"] = max(0.0, duracao - ev["out_time_s"]) / ev["speed"]
+                if met and ev.get("eta_s") is not None:
+                    met.registrar_eta(ev["eta_s"])
+            if ao_linha:
+                ao_linha(line, ev)
+            if eco and (not ev or time.time() - ultimo_eco >= PROGRESSO_ECO_S):
+                print(line, end="", flush=True)
+                if ev:
+                    ultimo_eco = time.time()
+            if ev:
+                continue  # progresso não ocupa a cauda
+            cauda.append(line)
+            cauda_bytes += len(line)
+            while cauda_bytes > SAIDA_MAX_BYTES and len(cauda) > 1:
+                cauda_bytes -= len(cauda.popleft())
+        rc = p.wait()
+        motivo = vigia.parar()
+        if motivo:
+            cauda.append(motivo)
+        if prog:
+            prog["segundos"] = time.time() - t0
+            if met:
+                met.adicionar(prog)
+            if prog["ferramenta"] in ("yt-dlp", "rclone"):
+                _historico.registrar_transferencia(prog["ferramenta"], prog.get("bytes") or 0, prog["segundos"], rc == 0)
+        out = "".join(cauda)
+        sp.set(rc=rc, segundos_midia=prog.get("out_time_s"), bytes=int(prog.get("bytes") or prog.get("size_bytes") or 0) or None)
+        if check and rc != 0:
+            raise RuntimeError("".join(cauda))
+        return rc, out
+
+
+# ordem importa: "403 ... rate limit exceeded" do Drive é limite, não auth
+RE_FALHAS = [
+    ("limite", re.compile(r"\b429\b|Too Many Requests|rate.?limit|quota ?exceeded|userRateLimit", re.I)),
+    ("auth", re.compile(r"Sign in to confirm|--cookies|cookies (?:are|have) (?:no longer valid|expired)|"
+                        r"\b401\b|Unauthorized|invalid_grant|token (?:has )?expired|insufficient ?permissions|"
+                        r"couldn't fetch token|login required|members.only|Private video", re.I)),
+    # 403 sem pista de login: URL assinada do googlevideo vencida (ou presa a outro IP)
+    ("expirado", re.compile(r"\b403\b|Forbidden", re.I)),
+    ("permanente", re.compile(r"Video unavailable|video (?:is|has been) (?:unavailable|removed)|\b(?:404|410)\b|"
+                              r"Not Found|Unsupported URL|Requested format is not available|"
+                              r"directory not found|is not a valid URL|Invalid data found|"
+                              r"No space left|Disk quota|Read-only file system|Permission denied", re.I)),
+    ("rede", re.compile(r"timed? ?out|Connection (?:reset|refused|aborted)|Temporary failure|unreachable|"
+                        r"Unable to download (?:webpage|API page|video data)|"
+                        r"Remote end closed|IncompleteRead|EOF occurred|unexpected EOF|Broken pipe|"
+                        r"Error 5\d\d|\b50[0-4]\b|SSL|getaddrinfo|Name or service not known", re.I)),
+]
 
 
-def realizar_corte(url_youtube, corte: dict, nome_saida: str, destino_local: str, tipocorte: str):
-    os.makedirs(destino_local, exist_ok=True)
-    saida_path = os.path.join(destino_local, f"{nome_saida}.mp4")
+class FalhaClassificada(RuntimeError):
+    """Erro de ferramenta externa já classificado (rede/limite/expirado/auth/permanente)."""
 
-    ini = corte["ini"]
-    fim = corte.get("fim")
-    dur = corte["dur_mmss"]
+    def __init__(self, classe: str, saida: str):
+        super().__init__(saida)
+        self.classe = classe
 
-    # Anti-HLS para LOUVOR: sempre vídeo inteiro + corte local
-    if tipocorte == "LOUVOR":
-        video_local = garantir_download_inteiro(url_youtube)
-        if fim:
-            cortar_local_por_ini_fim(video_local, ini, fim, saida_path)
-        else:
-            cortar_local_por_dur(video_local, ini, dur, saida_path)
-        return "A_LOCAL", "", saida_path, ""
 
-    ok, out_trecho, section = tentar_baixar_trecho(url_youtube, ini, dur, saida_path)
-    if ok:
-        return "B_TRECHO", out_trecho, saida_path, section
+def classificar_falha(saida: str) -> str:
+    """
+    Classe da falha pela saída capturada. Olha primeiro as linhas de erro (o resto
+    da saída cita cookies, formatos etc. em execuções normais). Sem pista = permanente:
+    repetir às cegas um erro desconhecido (disco cheio, bug) só gasta minutos.
+    """
+    linhas = [ln for ln in (saida or "").splitlines() if re.search(r"ERROR|Error|error|Failed|failed", ln)]
+    texto = "\n".join(linhas) or (saida or "")[-2000:]
+    for classe, rx in RE_FALHAS:
+        if rx.search(texto):
+            return classe
+    return "permanente"
 
-    video_local = garantir_download_inteiro(url_youtube)
-    if fim:
-        cortar_local_por_ini_fim(video_local, ini, fim, saida_path)
+
+def espera_backoff(classe: str, tentativa: int) -> float:
+    """Espera antes da tentativa+1: exponencial por classe, com jitter (evita repetir em sincronia)."""
+    base = RETRY_BASE_S.get(classe, RETRY_BASE_S["rede"])
+    return min(RETRY_MAX_ESPERA_S, base * 2 ** (tentativa - 1)) * random.uniform(0.5, 1.0)
+
+
+class Disjuntor:
+    """
+    Por ferramenta: DISJUNTOR_FALHAS chamadas seguidas desistindo com a mesma classe
+    abrem o disjuntor, e as próximas falham na hora em vez de gastar minutos cada.
+    Passado DISJUNTOR_ABERTO_S fica meio-aberto: uma única chamada de prova passa
+    (as demais seguem recusadas); sucesso fecha, falha reabre por mais um período.
+    "permanente" não conta: é do recurso (vídeo/arquivo), não da ferramenta.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seguidas = {}   # ferramenta -> (classe, n)
+        self._abertos = {}    # ferramenta -> (classe, aberto até)
+        self._provas = {}     # ferramenta -> classe que abriu (prova em andamento)
+
+    def admitir(self, ferramenta: str) -> tuple:
+        """(classe que mantém o disjuntor aberto | None, esta chamada é a prova)."""
+        with self._lock:
+            if ferramenta in self._provas:
+                return self._provas[ferramenta], False
+            classe, ate = self._abertos.get(ferramenta, (None, 0))
+            if classe is None:
+                return None, False
+            if time.time() < ate:
+                return classe, False
+            del self._abertos[ferramenta]
+            self._provas[ferramenta] = classe
+        log_step(f"Disjuntor {ferramenta}: meio-aberto; uma chamada de prova.")
+        return None, True
+
+    def sucesso(self, ferramenta: str):
+        with self._lock:
+            self._seguidas.pop(ferramenta, None)
+            fechou = self._provas.pop(ferramenta, None) is not None
+        if fechou:
+            log_step(f"Disjuntor {ferramenta}: prova OK; fechado.")
+
+    def falha(self, ferramenta: str, classe: str):
+        with self._lock:
+            prova = self._provas.pop(ferramenta, None)
+            if classe == "permanente":
+                # falha do recurso não diz nada da ferramenta: a próxima chamada prova de novo
+                if prova is not None:
+                    self._abertos[ferramenta] = (prova, 0)
+                return
+            anterior, n = self._seguidas.get(ferramenta, (None, 0))
+            n = n + 1 if anterior == classe else 1
+            self._seguidas[ferramenta] = (classe, n)
+            abriu = (prova is not None or n >= DISJUNTOR_FALHAS) and ferramenta not in self._abertos
+            if abriu:
+                self._abertos[ferramenta] = (classe, time.time() + DISJUNTOR_ABERTO_S)
+        if abriu:
+            motivo = "prova falhou" if prova is not None else f"{n} falhas seguidas"
+            log_step(f"Disjuntor {ferramenta}: {motivo} '{classe}'; "
+                     f"chamadas falham na hora pelos próximos {DISJUNTOR_ABERTO_S}s.")
+
+
+_disjuntor = Disjuntor()
+
+
+def com_retentativas(ferramenta: str, tentar, descricao: str) -> tuple:
+    """
+    tentar() -> (ok, saída). Repete conforme a classe da falha (RETRY_TENTATIVAS) e
+    alimenta o disjuntor; com ele aberto nem tenta, e a chamada de prova tenta uma vez só.
+    Retorna (ok, saída, classe | None).
+    """
+    aberto, prova = _disjuntor.admitir(ferramenta)
+    if aberto:
+        anotar(falha=aberto, disjuntor=True)
+        return False, f"ERROR: disjuntor aberto para {ferramenta} ({aberto}); {descricao} não tentado.", aberto
+    tentativa = 0
+    while True:
+        tentativa += 1
+        try:
+            ok, saida = tentar()
+        except BaseException:
+            if prova:
+                _disjuntor.falha(ferramenta, "permanente")   # prova sem veredito: a próxima chamada prova
+            raise
+        if ok:
+            _disjuntor.sucesso(ferramenta)
+            if tentativa > 1:
+                anotar(tentativas=tentativa)
+            return True, saida, None
+        classe = classificar_falha(saida)
+        maximo = 1 if prova else RETRY_TENTATIVAS.get(classe, 1)
+        if tentativa >= maximo:
+            _disjuntor.falha(ferramenta, classe)
+            anotar(falha=classe, tentativas=tentativa)
+            return False, saida, classe
+        espera = espera_backoff(classe, tentativa)
+        log_step(f"{descricao}: falha '{classe}' ({tentativa}/{maximo}); nova tentativa em {espera:.0f}s.")
+        time.sleep(espera)
+
+
+class LimiteAjustavel:
+    """
+    Semáforo cujo limite muda em tempo de execução (entre 1 e maximo).
+    Reduzir não interrompe quem já está dentro; só segura os próximos.
+    """
+
+    def __init__(self, nome: str, maximo: int):
+        self.nome = nome
+        self.maximo = max(1, maximo)
+        self.limite = self.maximo
+        self.em_uso = 0
+        self._cond = threading.Condition()
+
+    def ajustar(self, limite: int) -> bool:
+        limite = min(self.maximo, max(1, limite))
+        with self._cond:
+            if limite == self.limite:
+                return False
+            self.limite = limite
+            self._cond.notify_all()
+        return True
+
+    def __enter__(self):
+        with self._cond:
+            while self.em_uso >= self.limite:
+                self._cond.wait()
+            self.em_uso += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self.em_uso -= 1
+            self._cond.notify_all()
+
+
+# limites separados: rede (yt-dlp) x local (ffmpeg); o throttle mexe nos dois
+_SEM_REDE = LimiteAjustavel("rede", MAX_PROCESSOS_REDE)
+_SEM_LOCAL = LimiteAjustavel("local", MAX_PROCESSOS_LOCAIS)
+_SEM_RENDER = LimiteAjustavel("render", RENDER_MAX_PARALELOS)
+
+
+class OrcamentoBanda:
+    """
+    Banda compartilhada (BANDA_TOTAL_BPS; 0 = sem limite). Download e upload ativos
+    ao mesmo tempo: o upload fica com BANDA_FRACAO_UPLOAD e o download com o resto;
+    sozinho, cada lado usa tudo. O download HTTP direto consome daqui a cada leitura;
+    yt-dlp e rclone recebem sua parte na largada (--limit-rate / --bwlimit),
+    dividida pelos processos do mesmo lado já ativos.
+    """
+
+    def __init__(self, total_bps: float, fracao_upload: float):
+        self.total_bps = total_bps
+        self.fracao_upload = fracao_upload
+        self._ativos = {"download": 0, "upload": 0}
+        self._tokens = {"download": 0.0, "upload": 0.0}
+        self._t = {"download": time.monotonic(), "upload": time.monotonic()}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def ativo(self, lado: str):
+        with self._lock:
+            self._ativos[lado] += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._ativos[lado] -= 1
+
+    def taxa(self, lado: str) -> float:
+        if self.total_bps <= 0:
+            return 0.0
+        outro = "upload" if lado == "download" else "download"
+        if not self._ativos[outro]:
+            return self.total_bps
+        return self.total_bps * (self.fracao_upload if lado == "upload" else 1 - self.fracao_upload)
+
+    def consumir(self, lado: str, n: int):
+        """Balde de tokens (1 s de rajada) por lado; bloqueia o tempo que faltar para n bytes."""
+        with self._lock:
+            taxa = self.taxa(lado)
+            if taxa <= 0:
+                return
+            agora = time.monotonic()
+            self._tokens[lado] = min(taxa, self._tokens[lado] + (agora - self._t[lado]) * taxa) - n
+            self._t[lado] = agora
+            espera = -self._tokens[lado] / taxa if self._tokens[lado] < 0 else 0
+        if espera:
+            time.sleep(espera)
+
+    def _por_processo(self, lado: str) -> float:
+        return self.taxa(lado) / max(1, self._ativos[lado])
+
+    def args_ytdlp(self) -> list:
+        taxa = self._por_processo("download")
+        return ["--limit-rate", str(int(taxa))] if taxa else []
+
+    def args_rclone(self) -> list:
+        taxa = self._por_processo("upload")
+        return ["--bwlimit", f"{max(1, int(taxa / 1024))}k"] if taxa else []
+
+
+_banda = OrcamentoBanda(BANDA_TOTAL_BPS, BANDA_FRACAO_UPLOAD)
+
+
+def _ajustar_limites(amostra: dict):
+    """Throttle adaptativo: um passo por amostra, para cima ou para baixo."""
+    cpu = amostra.get("cpu") or 0
+    gpu = amostra.get("gpu_temp")
+    gpu_quente = gpu is not None and gpu > MAX_GPU_TEMP
+    if gpu_quente or cpu > THROTTLE_CPU_ALTO:
+        passo = -1
+    elif cpu < THROTTLE_CPU_BAIXO:
+        passo = 1
     else:
-        cortar_local_por_dur(video_local, ini, dur, saida_path)
-    return "A_LOCAL", out_trecho, saida_path, section
+        passo = 0
+    if _SEM_LOCAL.ajustar(_SEM_LOCAL.limite + passo):
+        log_step(f"Throttle: ffmpeg simultâneos={_SEM_LOCAL.limite} (cpu={cpu:.0f}% gpu={gpu if gpu is not None else '-'}°C)")
+    # render segue o mesmo passo; com menos renders simultâneos, cada um ganha mais threads
+    _SEM_RENDER.ajustar(_SEM_RENDER.limite + passo)
 
+    livre = amostra.get("livre_bytes")
+    alvo_rede = 1 if livre is not None and livre < THROTTLE_DISCO_MIN_BYTES else _SEM_REDE.limite + 1
+    if _SEM_REDE.ajustar(alvo_rede):
+        log_step(f"Throttle: downloads simultâneos={_SEM_REDE.limite} "
+                 f"(livre={f'{livre / 1024**3:.0f} GB' if livre is not None else '-'})")
 
-# =========================
-# Upload (rclone copyto)
-# =========================
-def listar_mp4(pasta_local_final: str):
-    return sorted(glob.glob(os.path.join(pasta_local_final, "*.mp4")))
 
+_telemetria = Telemetria(ao_amostrar=_ajustar_limites)
 
-def _rclone_copyto_with_progress(src_path: str, dst_path: str):
-    cmd = ["rclone", "copyto", src_path, dst_path, "--progress", "--stats", "1s"]
-    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace")
-    return p.returncode, (p.stdout or "")
 
+def obter_telemetria() -> dict:
+    """Última amostra da thread de telemetria (não dispara nvidia-smi)."""
+    return _telemetria.leitura()
 
-def upload_drive_arquivo_a_arquivo(pasta_local_final: str, pasta_drive_final: str):
-    files = listar_mp4(pasta_local_final)
-    total = len(files)
 
-    log_step(f"Upload: iniciando. Total={total}")
-    if total == 0:
-        log_step("Upload: nenhum .mp4 encontrado para enviar.")
-        return
+# um lock por chave de cache: dois cortes nunca baixam o mesmo vídeo inteiro ao mesmo tempo
+_download_locks = {}
+_download_locks_guard = threading.Lock()
 
-    failed = []
-    for i, fpath in enumerate(files, 1):
-        fname = os.path.basename(fpath)
-        dst = f"{pasta_drive_final}/{fname}"
-        log_step(f"Upload {i}/{total}: {fname}")
 
-        last_rc = None
-        last_out = ""
-        for attempt in range(1, UPLOAD_MAX_ATTEMPTS + 1):
-            rc, out = _rclone_copyto_with_progress(fpath, dst)
-            last_rc, last_out = rc, out
-            if out:
-                print(out, flush=True)
-            if rc == 0:
-                break
-            if attempt < UPLOAD_MAX_ATTEMPTS:
-                time.sleep(UPLOAD_RETRY_SLEEP_SEC)
+def _lock_download(key: str) -> threading.Lock:
+    with _download_locks_guard:
+        lk = _download_locks.get(key)
+        if lk is None:
+            lk = _download_locks[key] = threading.Lock()
+        return lk
 
-        if last_rc != 0:
-            failed.append((fname, last_out[-3000:] if last_out else ""))
 
-    if failed:
-        for name, tail in failed:
-            log_step(f"Falhou upload: {name}")
-            if tail:
-                print(tail, flush=True)
-        raise RuntimeError(f"Upload falhou para {len(failed)}/{total} arquivo(s).")
+RE_YT_ID = re.compile(r"(?:youtu\.be/|[?&]v=|/live/|/shorts/|/embed/|/v/)([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])")
 
 
-# =========================
-# Pipeline
-# =========================
-def _build_output_name(tipocorte: str, corte: dict, idx: int) -> str:
-    desc = corte.get("desc") or f"corte_{idx}"
-    ini = corte["ini"].replace(":", "-")
+def extrair_video_id(url: str) -> str:
+    m = RE_YT_ID.search(url or "")
+    return m.group(1) if m else ""
 
-    if tipocorte == "LOUVOR":
-        if corte["kind"] == "INTEGRAL":
-            base = f"LOUVOR_{idx:03d}_INTEGRAL__{desc}"
-        elif corte["kind"] == "OURO":
-            alvo = corte.get("alvo")
-            base = f"LOUVOR_{idx:03d}_OURO_{alvo:02d}__{desc}"
-        else:
-            base = f"LOUVOR_{idx:03d}__{desc}"
-    else:
-        base = f"{tipocorte}_{idx:03d}__{desc}"
 
-    base = re.sub(r"[^\w\s-]", "", base).replace(" ", "_")
-    base = re.sub(r"_+", "_", base).strip("_")[:120]
-    return f"{base}__{ini}"
+def cache_key_for_url(url: str) -> str:
+    # youtu.be/X, watch?v=X&t=..., /live/X -> mesma chave
+    vid = extrair_video_id(url)
+    if vid:
+        return f"yt_{vid}"
+    return hashlib.sha1(url.encode("utf-8", errors="replace")).hexdigest()[:16]
 
 
-def iniciar_processamento(event_path: str):
-    pipeline_start = datetime.now()
-    os.makedirs(LOG_DIR, exist_ok=True)
+class IndiceCache:
+    """
+    Índice em disco (JSON) de um diretório de cache: arquivo, bytes e último acesso
+    por chave, com remoção LRU para caber em max_bytes.
+    """
 
-    url_youtube, relatorio = ler_event_payload(event_path)
-    if not url_youtube:
-        raise ValueError("client_payload.url vazio")
-    if not (relatorio or "").strip():
-        raise ValueError("client_payload.relatorio vazio")
+    NOME = "_index.json"
 
-    # não logar relatório; só fingerprint
-    log_step(f"Evento OK. url={url_youtube} rel_len={len(relatorio)} rel_sha1_12={sha1_12(relatorio)}")
+    def __init__(self, diretorio: str, max_bytes: int):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self.path = os.path.join(diretorio, self.NOME)
+        self._lock = threading.Lock()
 
-    tipocorte, cortes = extrair_cortes(relatorio)
-    total = len(cortes)
-    log_step(f"Pipeline INICIO. tipocorte={tipocorte} cortes={total}")
+    @contextmanager
+    def _travar(self):
+        # thread lock para este processo + lock de arquivo para outros runners no mesmo cache
+        with self._lock, LockArquivo(self.path + ".lock"):
+            yield
 
-    # info do vídeo
-    log_step("yt-dlp --dump-json INICIO")
-    cmd_info = [*ytdlp_base_cmd(), "--dump-json", url_youtube]
-    rc, out = run_cmd_live(cmd_info, check=False)
-    if rc != 0:
-        raise RuntimeError(out)
-    video_info = json.loads(out)
-    log_step("yt-dlp --dump-json FIM")
+    def _ler(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _gravar(self, idx: dict):
+        os.makedirs(self.diretorio, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(idx, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def _apagar(self, arquivo: str) -> bool:
+        fp = os.path.join(self.diretorio, arquivo)
+        try:
+            os.remove(fp)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False
+        # índices auxiliares gravados ao lado (ex.: <video>.keyframes.json)
+        for extra in glob.glob(glob.escape(fp) + ".*"):
+            try:
+                os.remove(extra)
+            except OSError:
+                pass
+        return True
+
+    def _adotar_orfaos(self, idx: dict):
+        # arquivos antigos (chave sha1 da URL) entram no índice para poderem ser removidos
+        conhecidos = {e["arquivo"] for e in idx.values()}
+        for fn in os.listdir(self.diretorio):
+            fp = os.path.join(self.diretorio, fn)
+            if fn.startswith(("_", ".")) or fn in conhecidos or not os.path.isfile(fp):
+                continue
+            if fn.endswith((".part", ".ytdl", ".tmp", ".json", ".lock")):
+                continue
+            idx[f"orfao:{fn}"] = {"arquivo": fn, "bytes": os.path.getsize(fp), "ultimo_acesso": os.path.getmtime(fp)}
+
+    def obter(self, key: str) -> dict | None:
+        with self._travar():
+            ent = self._ler().get(key)
+        if not ent:
+            return None
+        fp = os.path.join(self.diretorio, ent["arquivo"])
+        if not os.path.exists(fp) or os.path.getsize(fp) != ent.get("bytes"):
+            self.remover(key)
+            return None
+        return {**ent, "path": fp}
+
+    def tocar(self, key: str):
+        with self._travar():
+            idx = self._ler()
+            if key in idx:
+                idx[key]["ultimo_acesso"] = time.time()
+                self._gravar(idx)
+
+    def entradas(self) -> dict:
+        with self._travar():
+            return self._ler()
+
+    def atualizar(self, key: str, **campos):
+        with self._travar():
+            idx = self._ler()
+            if key in idx:
+                idx[key].update(campos)
+                self._gravar(idx)
+
+    def remover(self, key: str):
+        with self._travar():
+            idx = self._ler()
+            ent = idx.pop(key, None)
+            if ent:
+                self._apagar(ent["arquivo"])
+                self._gravar(idx)
+
+    def registrar(self, key: str, arquivo: str, protegidos=(), **extra):
+        with self._travar():
+            idx = self._ler()
+            idx[key] = {**extra, "arquivo": arquivo,
+                        "bytes": os.path.getsize(os.path.join(self.diretorio, arquivo)),
+                        "ultimo_acesso": time.time()}
+            self._evictar(idx, manter={key, *protegidos})
+            self._gravar(idx)
+
+    def _evictar(self, idx: dict, manter: set):
+        self._adotar_orfaos(idx)
+        total = sum(e.get("bytes") or 0 for e in idx.values())
+        for key, ent in sorted(idx.items(), key=lambda kv: kv[1].get("ultimo_acesso") or 0):
+            if total <= self.max_bytes:
+                break
+            if key in manter:
+                continue
+            if not self._apagar(ent["arquivo"]):
+                continue
+            log_step(f"Cache: removendo {ent['arquivo']} ({ent.get('bytes', 0) / 1024**2:.0f} MB, LRU)")
+            total -= ent.get("bytes") or 0
+            del idx[key]
 
-    data_upload = datetime.strptime(video_info["upload_date"], "%Y%m%d")
-    titulo_video = video_info["title"]
 
-    rel_path = criar_caminho_hierarquico(data_upload, titulo_video, relatorio)
-    pasta_local_final = os.path.join(BASE_PATH, rel_path)
-    pasta_drive_final = f"{DRIVE_NAME}:/Cortes_Midia_Igreja/{rel_path}"
+_cache_videos = IndiceCache(DOWNLOAD_CACHE_DIR, CACHE_MAX_BYTES)
+_cache_em_uso = {}               # chave -> nº de jobs em andamento usando o vídeo: não sai por LRU
+_cache_em_uso_lock = threading.Lock()
+_cache_verificados = {}          # key -> (bytes, mtime) já conferidos com ffprobe
 
-    log_name = f"historico_{pipeline_start.strftime('%d_%m_%Y_%H_%M_%S')}.md"
-    log_path = os.path.join(LOG_DIR, log_name)
 
-    with open(log_path, "w", encoding="utf-8") as log:
-        log.write(f"# Relatório: {titulo_video}\n")
-        log.write(f"- Tipocorte: {tipocorte}\n")
-        log.write(f"- URL: {url_youtube}\n")
-        log.write(f"- Total de cortes: {total}\n")
-        log.write(f"- Saída local: {pasta_local_final}\n")
-        log.write(f"- Destino Drive: {pasta_drive_final}\n")
-        log.write(f"- Relatorio sha1_12: {sha1_12(relatorio)}\n\n")
-        log.write("| # | Corte | Modo | Status | Tempo |\n|---|---|---|---|---|\n")
+def _fixar_no_cache(key: str):
+    """Protege a chave da LRU enquanto o job atual roda; _soltar_do_cache libera no fim do job."""
+    job = _job_atual.get()
+    if job is None:
+        return
+    with _cache_em_uso_lock:
+        fixadas = job.setdefault("cache_fixado", set())
+        if key not in fixadas:
+            fixadas.add(key)
+            _cache_em_uso[key] = _cache_em_uso.get(key, 0) + 1
+
+
+def _soltar_do_cache(job: dict):
+    with _cache_em_uso_lock:
+        for key in job.pop("cache_fixado", ()):
+            n = _cache_em_uso.get(key, 0) - 1
+            if n > 0:
+                _cache_em_uso[key] = n
+            else:
+                _cache_em_uso.pop(key, None)
 
-    log_step(f"Vídeo: {titulo_video}")
-    log_step(f"Saída local: {pasta_local_final}")
-    log_step(f"Destino Drive: {pasta_drive_final}")
-    log_step(f"Log: {log_path}")
 
-    if tipocorte == "LOUVOR":
-        log_step("LOUVOR: pré-download do vídeo inteiro (cache)...")
-        garantir_download_inteiro(url_youtube)
-        log_step("LOUVOR: pré-download OK.")
+def _cache_protegidos() -> set:
+    with _cache_em_uso_lock:
+        return set(_cache_em_uso)
 
-    for idx, corte in enumerate(cortes, 1):
-        _, g_temp = obter_telemetria()
-        if g_temp > MAX_GPU_TEMP:
-            log_step(f"GPU quente ({g_temp}°C). Cooldown 30s...")
-            time.sleep(30)
 
-        nome_final = _build_output_name(tipocorte, corte, idx)
-        cut_start = datetime.now()
+def duracao_container(path: str) -> float:
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", path]
+    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="replace")
+    try:
+        return float((p.stdout or "").strip().splitlines()[0])
+    except (ValueError, IndexError):
+        return 0.0
 
-        titulo = corte.get("desc") or f"corte_{idx}"
-        ini = corte["ini"]
-        fim = corte.get("fim")
-        dur = corte["dur_mmss"]
-        janela = f"{ini} -> {fim}" if fim else f"{ini}+{dur}"
 
-        log_step(f"Corte {idx}/{total} INICIO: {titulo} [{janela}]")
+def _cache_integro(path: str, duracao_esperada: float | None) -> bool:
+    dur = duracao_container(path)
+    if dur <= 0:
+        return False
+    if not duracao_esperada:
+        return True
+    return abs(dur - float(duracao_esperada)) <= max(2.0, float(duracao_esperada) * CACHE_TOLERANCIA_DURACAO)
 
-        modo = "-"
-        status = "ERRO"
-        debug_tail = ""
 
-        try:
-            modo, out_trecho, saida_path, _section = realizar_corte(
-                url_youtube=url_youtube,
-                corte=corte,
-                nome_saida=nome_final,
-                destino_local=pasta_local_final,
-                tipocorte=tipocorte
-            )
-            status = "OK"
-            debug_tail = (out_trecho or "")[-1500:]
-        except Exception as e:
-            debug_tail = str(e)[-1500:]
-            log_step(f"Corte {idx}/{total} FALHOU: {e}")
+def ytdlp_base_cmd(extracao: bool = True):
+    # JS challenge só na extração; com --load-info-json as URLs já vêm resolvidas
+    return [
+        *YTDLP_CMD,
+        "--cookies", YTDLP_COOKIES_TXT_PATH,
+        *(["--remote-components", "ejs:github", "--js-runtimes", f"node:{YTDLP_NODE_EXE}"] if extracao else []),
+        *YTDLP_NET_ARGS
+    ]
 
-        elapsed = (datetime.now() - cut_start).total_seconds()
-        log_step(f"Corte {idx}/{total} FIM: {status} modo={modo} tempo={fmt_td(elapsed)}")
 
-        with open(log_path, "a", encoding="utf-8") as log:
-            log.write(f"| {idx} | {titulo} | {modo} | {status} | {fmt_td(elapsed)} |\n")
-            if debug_tail:
-                log.write(f"\n<details><summary>Debug corte #{idx}</summary>\n\n```\n{debug_tail}\n```\n</details>\n\n")
+RE_EXPIRE = re.compile(r"[?&/]expire[=/](\d{9,11})")
+_infos_mem = {}
+_infos_mem_lock = threading.Lock()
 
-        time.sleep(COOL_DOWN_TIME)
 
-    upload_drive_arquivo_a_arquivo(pasta_local_final, pasta_drive_final)
+def _info_path(url_youtube: str) -> str:
+    return os.path.join(INFO_CACHE_DIR, f"{cache_key_for_url(url_youtube)}.info.json")
 
-    total_s = (datetime.now() - pipeline_start).total_seconds()
-    log_step(f"Pipeline FIM. Tempo total: {fmt_td(total_s)}. Log: {log_name}")
+
+def _carregar_info(path: str) -> dict:
+    """Info JSON do disco, memoizado por mtime (são alguns MB de formatos)."""
+    mtime = os.path.getmtime(path)
+    with _infos_mem_lock:
+        ent = _infos_mem.get(path)
+        if ent and ent[0] == mtime:
+            return ent[1]
+    with open(path, "r", encoding="utf-8") as f:
+        info = json.load(f)
+    with _infos_mem_lock:
+        _infos_mem[path] = (mtime, info)
+    return info
+
+
+def _expiracao_info(info: dict, gravado_em: float) -> float:
+    """Menor 'expire' das URLs que o download vai usar; sem nenhum, TTL padrão a partir da gravação."""
+    formatos = info.get("requested_formats") or [info]
+    urls = [f.get("url") or "" for f in formatos] or [f.get("url") or "" for f in info.get("formats") or []]
+    expiras = [int(m.group(1)) for m in (RE_EXPIRE.search(u) for u in urls) if m]
+    return min(expiras) if expiras else gravado_em + INFO_TTL_PADRAO_S
+
+
+def info_em_cache(url_youtube: str) -> str | None:
+    """Caminho do info JSON do vídeo, se existir e as URLs ainda valerem (com margem)."""
+    path = _info_path(url_youtube)
+    try:
+        info = _carregar_info(path)
+        gravado_em = os.path.getmtime(path)
+    except (OSError, ValueError):
+        return None
+    if time.time() > _expiracao_info(info, gravado_em) - INFO_MARGEM_EXPIRACAO_S:
+        return None
+    return path
+
+
+def descartar_info(url_youtube: str):
+    path = _info_path(url_youtube)
+    with _infos_mem_lock:
+        _infos_mem.pop(path, None)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _limpar_infos_antigos():
+    limite = time.time() - INFO_RETENCAO_S
+    for path in glob.glob(os.path.join(INFO_CACHE_DIR, "*.info.json")):
+        try:
+            if os.path.getmtime(path) < limite:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+@rastreado("info_video", lambda r: {"duracao": r.get("duration")})
+def obter_info_video(url_youtube: str) -> dict:
+    """
+    Info do vídeo (título, data, duração, formatos) a partir do cache por ID;
+    extrai com yt-dlp (--write-info-json, direto para arquivo) só quando não há
+    info válido. Jobs do mesmo vídeo esperam a extração em andamento.
+    """
+    key = cache_key_for_url(url_youtube)
+    with _lock_download(f"info:{key}"):
+        path = info_em_cache(url_youtube)
+        anotar(cache_hit=bool(path))
+        if path:
+            log_step(f"Info do vídeo em cache: {path}")
+            return _carregar_info(path)
+
+        os.makedirs(INFO_CACHE_DIR, exist_ok=True)
+        log_step("yt-dlp: extraindo info do vídeo...")
+        # o info.json sai com o nome da saída trocando a extensão: <key>.tmp.info.json
+        # mesmo -f do download: requested_formats do info são os formatos que o download direto usa
+        cmd = [*ytdlp_base_cmd(), "-f", YTDLP_FORMAT_FULL, "--skip-download", "--write-info-json", "--no-write-playlist-metafiles",
+               "-o", os.path.join(INFO_CACHE_DIR, f"{key}.tmp.%(ext)s"), url_youtube]
+        tmp = os.path.join(INFO_CACHE_DIR, f"{key}.tmp.info.json")
+
+        def extrair():
+            rc, out = run_cmd_live(cmd, check=False)
+            return rc == 0 and os.path.exists(tmp), out
+
+        ok, out, classe = com_retentativas("yt-dlp", extrair, "yt-dlp (info)")
+        if not ok:
+            raise FalhaClassificada(classe, out)
+        path = _info_path(url_youtube)
+        os.replace(tmp, path)
+        _limpar_infos_antigos()
+        return _carregar_info(path)
+
+
+def _run_ytdlp_uma_vez(args: list, url_youtube: str, midia_s=None):
+    with _banda.ativo("download"):
+        path = info_em_cache(url_youtube)
+        if path:
+            cmd = [*ytdlp_base_cmd(extracao=False), *_banda.args_ytdlp(), *args, "--load-info-json", path]
+            rc, out = run_cmd_live(cmd, check=False, midia_s=midia_s)
+            if rc == 0:
+                return rc, out
+            log_step(f"yt-dlp com info em cache falhou (rc={rc}); descartando o info e extraindo de novo.")
+            descartar_info(url_youtube)
+        rc, out = run_cmd_live([*ytdlp_base_cmd(), *_banda.args_ytdlp(), *args, url_youtube], check=False, midia_s=midia_s)
+        if rc != 0 and classificar_falha(out) == "expirado":
+            descartar_info(url_youtube)   # 403 no meio: a repetição não pode voltar ao info com URLs vencidas
+        return rc, out
+
+
+def run_ytdlp(args: list, url_youtube: str, descricao: str = "yt-dlp", midia_s=None):
+    """
+    yt-dlp de download reaproveitando a extração: com info válido em cache vai de
+    --load-info-json (sem cookies de extração nem JS challenge). Se falhar (URL
+    vencida antes da hora, formato sumiu), descarta o info e roda com a URL.
+    Falhas de rede/limite/URL vencida repetem com backoff (com_retentativas); rc != 0 no fim.
+    `midia_s` (duração baixada) dá o prazo da Vigia.
+    """
+    rcs = [1]
+
+    def tentar():
+        rcs[0], out = _run_ytdlp_uma_vez(args, url_youtube, midia_s)
+        return rcs[0] == 0, out
+
+    ok, out, _ = com_retentativas("yt-dlp", tentar, descricao)
+    return (0 if ok else rcs[0] or 1), out
+
+
+def _cache_hit_confiavel(key: str, duracao_esperada: float | None) -> str | None:
+    ent = _cache_videos.obter(key)
+    if not ent:
+        return None
+    path = ent["path"]
+    assinatura = (ent["bytes"], os.path.getmtime(path))
+    if _cache_verificados.get(key) != assinatura:
+        if not _cache_integro(path, duracao_esperada or ent.get("duracao")):
+            log_step(f"Cache inválido (duração não confere): {path}. Descartando.")
+            _cache_videos.remover(key)
+            return None
+        _cache_verificados[key] = assinatura
+    _cache_videos.tocar(key)
+    return path
+
+
+def _tamanho_http(url: str, headers: dict) -> int:
+    """Tamanho pelo Content-Range de um GET bytes=0-0 (também confere que o servidor aceita Range)."""
+    req = urllib.request.Request(url, headers={**headers, "Range": "bytes=0-0"})
+    with urllib.request.urlopen(req, timeout=DOWNLOAD_TIMEOUT_S) as resp:
+        faixa = resp.headers.get("Content-Range") or ""
+        resp.read()
+    if resp.status != 206 or "/" not in faixa or faixa.endswith("/*"):
+        raise RuntimeError(f"servidor não aceita Range (HTTP {resp.status})")
+    return int(faixa.rsplit("/", 1)[1])
+
+
+class DownloadHttp:
+    """
+    Um arquivo em blocos de DOWNLOAD_BLOCO_BYTES, DOWNLOAD_CONEXOES ranges por vez.
+    Escreve em <destino>.part (pré-alocado) e marca os blocos prontos em
+    <destino>.part.json: uma execução seguinte (mesmo tamanho) só busca o que falta.
+    """
+
+    def __init__(self, url: str, destino: str, tamanho: int, headers: dict | None = None):
+        self.url = url
+        self.destino = destino
+        self.tamanho = tamanho
+        self.headers = headers or {}
+        self.part = destino + ".part"
+        self.mapa_path = destino + ".part.json"
+        self.n_blocos = max(1, -(-tamanho // DOWNLOAD_BLOCO_BYTES))
+        self.prontos = set()
+        self.feito_sessao = 0
+        self.prefixo = 0          # bytes contíguos desde o início já gravados no .part
+        self.concluido = False    # .part já renomeado para o destino
+        self.trava = None         # lock de quem lê o .part (corte progressivo) durante o rename
+        self.ao_bloco = None      # chamado a cada bloco pronto
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+
+    def _carregar_mapa(self):
+        try:
+            with open(self.mapa_path, "r", encoding="utf-8") as f:
+                mapa = json.load(f)
+            if mapa.get("tamanho") == self.tamanho and mapa.get("bloco") == DOWNLOAD_BLOCO_BYTES \
+                    and os.path.getsize(self.part) == self.tamanho:
+                self.prontos = set(mapa.get("prontos") or [])
+        except (OSError, ValueError):
+            self.prontos = set()
+        if not self.prontos:
+            with open(self.part, "wb") as f:
+                f.truncate(self.tamanho)
+        self._avancar_prefixo()
+
+    def _avancar_prefixo(self):
+        i = self.prefixo // DOWNLOAD_BLOCO_BYTES
+        while i in self.prontos:
+            i += 1
+        self.prefixo = min(self.tamanho, i * DOWNLOAD_BLOCO_BYTES)
+
+    def _salvar_mapa(self):
+        tmp = self.mapa_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"tamanho": self.tamanho, "bloco": DOWNLOAD_BLOCO_BYTES, "prontos": sorted(self.prontos)}, f)
+        os.replace(tmp, self.mapa_path)
+
+    def _somar(self, n: int):
+        with self._lock:
+            self.feito_sessao += n
+
+    def _baixar_bloco(self, i: int):
+        ini = i * DOWNLOAD_BLOCO_BYTES
+        fim = min(self.tamanho, ini + DOWNLOAD_BLOCO_BYTES) - 1
+        for tentativa in range(1, DOWNLOAD_TENTATIVAS_BLOCO + 1):
+            feito = 0
+            try:
+                req = urllib.request.Request(self.url, headers={**self.headers, "Range": f"bytes={ini}-{fim}"})
+                with urllib.request.urlopen(req, timeout=DOWNLOAD_TIMEOUT_S) as resp, open(self.part, "r+b") as f:
+                    if resp.status != 206:
+                        raise RuntimeError(f"HTTP {resp.status} sem Range")
+                    f.seek(ini)
+                    while not self._parar.is_set():
+                        buf = resp.read(DOWNLOAD_LEITURA_BYTES)
+                        if not buf:
+                            break
+                        _banda.consumir("download", len(buf))
+                        f.write(buf)
+                        feito += len(buf)
+                        self._somar(len(buf))
+                if self._parar.is_set():
+                    return
+                if feito != fim - ini + 1:
+                    raise RuntimeError(f"bloco {i} incompleto ({feito}/{fim - ini + 1} bytes)")
+                with self._lock:
+                    self.prontos.add(i)
+                    self._salvar_mapa()
+                    self._avancar_prefixo()
+                if self.ao_bloco:
+                    self.ao_bloco()
+                return
+            except (OSError, RuntimeError, http.client.HTTPException) as e:
+                self._somar(-feito)
+                classe = classificar_falha(f"Error {e.code}") if isinstance(e, urllib.error.HTTPError) else "rede"
+                # 403/404: URL vencida ou formato sumiu, não adianta insistir nesta URL
+                if classe in ("expirado", "auth", "permanente") or tentativa == DOWNLOAD_TENTATIVAS_BLOCO:
+                    raise
+                log_step(f"Download HTTP: bloco {i} falhou ({e}); tentativa {tentativa + 1}/{DOWNLOAD_TENTATIVAS_BLOCO}.")
+                time.sleep(espera_backoff(classe, tentativa))
+
+    @rastreado("download_http", lambda r: {"bytes": _tamanho(r)})
+    def executar(self) -> str:
+        self._carregar_mapa()
+        faltam = [i for i in range(self.n_blocos) if i not in self.prontos]
+        ja = sum(min(self.tamanho, (i + 1) * DOWNLOAD_BLOCO_BYTES) - i * DOWNLOAD_BLOCO_BYTES for i in self.prontos)
+        nome = os.path.basename(self.destino)
+        if self.prontos:
+            log_step(f"Download HTTP {nome}: retomando com {ja / 1024**2:.0f}/{self.tamanho / 1024**2:.0f} MB já baixados.")
+        anotar(retomado_bytes=ja, blocos=len(faltam))
+
+        met = _metricas_atual.get()
+        t0 = time.time()
+        with _banda.ativo("download"), ThreadPoolExecutor(max_workers=DOWNLOAD_CONEXOES, thread_name_prefix="http") as pool:
+            futures = [pool.submit(self._baixar_bloco, i) for i in faltam]
+            pendentes = set(futures)
+            while pendentes:
+                feitos, pendentes = wait(pendentes, timeout=PROGRESSO_ECO_S, return_when=FIRST_EXCEPTION)
+                erro = next((f.exception() for f in feitos if f.exception()), None)
+                if erro:
+                    self._parar.set()
+                    for f in pendentes:
+                        f.cancel()
+                    raise erro
+                gasto = max(1e-6, time.time() - t0)
+                vel = self.feito_sessao / gasto
+                total_feito = ja + self.feito_sessao
+                eta = (self.tamanho - total_feito) / vel if vel > 0 else None
+                if met and eta is not None:
+                    met.registrar_eta(eta)
+                if pendentes:
+                    log_step(f"Download HTTP {nome}: {total_feito * 100 / self.tamanho:.1f}% de "
+                             f"{self.tamanho / 1024**2:.0f} MB a {vel / 1024**2:.1f} MB/s"
+                             f"{f' ETA {fmt_td(eta)}' if eta is not None else ''}")
+
+        if self._parar.is_set() or len(self.prontos) < self.n_blocos:
+            raise RuntimeError(f"download de {nome} interrompido ({len(self.prontos)}/{self.n_blocos} blocos)")
+        gasto = time.time() - t0
+        if met and self.feito_sessao:
+            met.adicionar({"ferramenta": "http", "bytes": self.feito_sessao, "segundos": gasto})
+        _historico.registrar_transferencia("http", self.feito_sessao, gasto, True)
+        with self.trava or nullcontext():
+            os.replace(self.part, self.destino)
+            self.concluido = True
+        try:
+            os.remove(self.mapa_path)
+        except OSError:
+            pass
+        log_step(f"Download HTTP {nome}: OK {self.feito_sessao / 1024**2:.0f} MB em {fmt_td(gasto)} "
+                 f"({self.feito_sessao / 1024**2 / max(gasto, 1e-6):.1f} MB/s)")
+        return self.destino
+
+
+def _ler_sidx(path: str, limite: int) -> list | None:
+    """
+    Índices sidx do começo de um MP4 (antes do primeiro moof/mdat):
+    [(offset do 1º fragmento, timescale, [(bytes, duração), ...])].
+    [] quando o arquivo não é fragmentado; None se os primeiros `limite` bytes
+    ainda não chegam ao primeiro fragmento.
+    """
+    if limite < 16:
+        return None
+    indices = []
+    with open(path, "rb") as f:
+        pos = 0
+        while True:
+            if pos + 16 > limite:
+                return None
+            f.seek(pos)
+            cab = f.read(16)
+            tam, tipo = struct.unpack(">I4s", cab[:8])
+            if tam == 1:
+                tam = struct.unpack(">Q", cab[8:16])[0]
+            if tipo in (b"moof", b"mdat") or tam < 8:
+                return indices
+            if tipo == b"sidx":
+                if pos + tam > limite:
+                    return None
+                f.seek(pos)
+                box = f.read(tam)
+                versao = box[8]
+                timescale = struct.unpack(">I", box[16:20])[0]
+                if versao == 0:
+                    primeiro = struct.unpack(">I", box[24:28])[0]
+                    p = 28
+                else:
+                    primeiro = struct.unpack(">Q", box[28:36])[0]
+                    p = 36
+                n = struct.unpack(">H", box[p + 2:p + 4])[0]
+                refs = []
+                for k in range(n):
+                    tipo_tam, dur = struct.unpack(">II", box[p + 4 + 12 * k:p + 12 + 12 * k])
+                    if tipo_tam >> 31:
+                        return []   # sidx hierárquico: não vale o trabalho, corta com o arquivo inteiro
+                    refs.append((tipo_tam & 0x7FFFFFFF, dur))
+                indices.append((pos + tam + primeiro, timescale, refs))
+            pos += tam
+
+
+def _segundos_no_prefixo(indice: tuple, prefixo: int) -> float:
+    inicio, timescale, refs = indice
+    pos, t = inicio, 0
+    for tam, dur in refs:
+        if pos + tam > prefixo:
+            break
+        pos += tam
+        t += dur
+    return t / max(1, timescale)
+
+
+class UsoPartes:
+    """
+    Partes do download em uso. Cada corte reserva os caminhos como leitor (o lock só
+    cobre a resolução; vários ffmpeg leem ao mesmo tempo); `with uso:` (renomear/apagar
+    as partes) espera até não haver leitores.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._leitores = 0
+
+    @contextmanager
+    def leitura(self, resolver):
+        with self._cond:
+            valor = resolver()
+            if valor is not None:
+                self._leitores += 1
+        try:
+            yield valor
+        finally:
+            if valor is not None:
+                with self._cond:
+                    self._leitores -= 1
+                    self._cond.notify_all()
+
+    def __enter__(self):
+        self._cond.acquire()
+        self._cond.wait_for(lambda: self._leitores == 0)
+        return self
+
+    def __exit__(self, *exc):
+        self._cond.release()
+
+
+class FonteProgressiva:
+    """
+    Download direto em andamento visto como fonte de corte. Num MP4 fragmentado
+    (formatos DASH do YouTube: sidx logo depois do moov) o prefixo contíguo de
+    cada .part vira "segundos já disponíveis"; o corte espera só o seu fim.
+    """
+
+    def __init__(self):
+        self.downloads = []               # [(DownloadHttp, tem_audio)]
+        self.uso = UsoPartes()            # cortes lendo as partes x download renomeando/apagando
+        self.terminado = False
+        self._cond = threading.Condition()
+        self._indices = {}
+
+    def registrar(self, downloads: list):
+        # todas as partes de uma vez: o corte nunca vê o vídeo sem o áudio
+        for d, _ in downloads:
+            d.trava = self.uso
+            d.ao_bloco = self.notificar
+        with self._cond:
+            self.downloads = list(downloads)
+            self._cond.notify_all()
+
+    def notificar(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def terminar(self):
+        """Download acabou (ou caiu): quem ainda espera vai para o corte normal."""
+        with self._cond:
+            self.terminado = True
+            self._cond.notify_all()
+
+    def _coberto_parte(self, d: DownloadHttp) -> float | None:
+        if d.concluido or d.prefixo >= d.tamanho:
+            return float("inf")
+        indices = self._indices.get(d.destino)
+        if indices is None:
+            try:
+                indices = _ler_sidx(d.part, d.prefixo)
+            except FileNotFoundError:
+                indices = None   # .part ainda não criado ou já renomeado (concluido vem no próximo aviso)
+            if indices is None:
+                return 0.0
+            self._indices[d.destino] = indices
+        if not indices:
+            return None
+        return min(_segundos_no_prefixo(i, d.prefixo) for i in indices)
+
+    def coberto_s(self) -> float | None:
+        """Segundos contíguos disponíveis em todas as partes; None se alguma não é fragmentada."""
+        if not self.downloads:
+            return 0.0
+        cobertos = [self._coberto_parte(d) for d, _ in self.downloads]
+        return None if None in cobertos else min(cobertos)
+
+    def esperar(self, fim_s: float) -> bool:
+        """Bloqueia até [0, fim_s] estar baixado. False: download terminou antes ou não é progressivo."""
+        with self._cond:
+            while not self.terminado:
+                coberto = self.coberto_s()
+                if coberto is None:
+                    return False
+                if coberto >= fim_s:
+                    return True
+                self._cond.wait(timeout=PROGRESSO_ECO_S)
+            return False
+
+    def _caminho(self, d: DownloadHttp) -> str:
+        return d.destino if d.concluido else d.part
+
+    def caminhos(self) -> list:
+        return [self._caminho(d) for d, _ in self.downloads]
+
+    def caminho_audio(self) -> str | None:
+        return next((self._caminho(d) for d, audio in self.downloads if audio), None)
+
+    def _reserva(self) -> tuple | None:
+        # chamado sob o lock do uso: depois de terminar() as partes somem (corte vai pelo fluxo normal)
+        return None if self.terminado else (self.caminhos(), self.caminho_audio())
+
+    def reservar(self):
+        """with fonte.reservar() as r: r = (partes, áudio) garantidos até o fim do bloco, ou None."""
+        return self.uso.leitura(self._reserva)
+
+
+@rastreado("download_inteiro_http", lambda r: {"bytes": _tamanho(r)})
+def baixar_inteiro_http(url_youtube: str, tmp_dir: str, key: str, progressiva: FonteProgressiva | None = None) -> str | None:
+    """
+    Baixa os formatos escolhidos na extração (vídeo + áudio, em paralelo) direto
+    das URLs do info em cache e junta com ffmpeg (-c copy). None quando algum
+    formato não tem URL HTTP direta (HLS/DASH): aí o yt-dlp cuida.
+    Com `progressiva`, as partes ficam visíveis para o corte durante o download.
+    """
+    info = obter_info_video(url_youtube)
+    formatos = info.get("requested_formats") or [info]
+    if not all(f.get("url") and (f.get("protocol") or "https") in ("http", "https") for f in formatos):
+        return None
+
+    downloads = []
+    try:
+        for f in formatos:
+            destino = os.path.join(tmp_dir, f"{key}.f{f.get('format_id') or len(downloads)}.{f.get('ext') or 'mp4'}")
+            headers = f.get("http_headers") or info.get("http_headers") or {}
+            tem_audio = f.get("acodec") != "none"
+            if os.path.exists(destino):
+                d = DownloadHttp(f["url"], destino, os.path.getsize(destino), headers)
+                d.concluido = True
+            else:
+                d = DownloadHttp(f["url"], destino, _tamanho_http(f["url"], headers), headers)
+            downloads.append((d, tem_audio))
+        if progressiva:
+            progressiva.registrar(downloads)
+
+        faltam = [d for d, _ in downloads if not d.concluido]
+        if faltam:
+            with ThreadPoolExecutor(max_workers=len(faltam), thread_name_prefix="formato") as pool:
+                futures = [pool.submit(contextvars.copy_context().run, d.executar) for d in faltam]
+                feitos, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                erro = next((f.exception() for f in feitos if f.exception()), None)
+                if erro:
+                    for d in faltam:
+                        d._parar.set()
+                    raise erro
+    except urllib.error.HTTPError as e:
+        if e.code in (403, 410):
+            descartar_info(url_youtube)   # URL vencida: a próxima tentativa extrai de novo
+        raise
+    partes = [d.destino for d, _ in downloads]
+
+    final = os.path.join(tmp_dir, f"{key}.mp4")
+    cmd = ["ffmpeg", "-y", "-hide_banner"]
+    for pth in partes:
+        cmd += ["-i", pth]
+    for n in range(len(partes)):
+        cmd += ["-map", str(n)]
+    cmd += ["-c", "copy", "-movflags", "+faststart", final]
+    with _SEM_LOCAL:
+        rc, out = run_cmd_live(cmd, check=False, midia_s=info.get("duration"))
+    if rc != 0:
+        raise RuntimeError(out)
+    with progressiva.uso if progressiva else nullcontext():
+        if progressiva:
+            progressiva.terminar()   # daqui em diante os cortes usam o arquivo final
+        for pth in partes:
+            os.remove(pth)
+    return final
+
+
+@rastreado("download_inteiro", lambda r: {"bytes": _tamanho(r)})
+def garantir_download_inteiro(url_youtube: str, duracao_esperada: float | None = None,
+                              progressiva: FonteProgressiva | None = None) -> str:
+    os.makedirs(DOWNLOAD_CACHE_DIR, exist_ok=True)
+    key = cache_key_for_url(url_youtube)
+    _fixar_no_cache(key)
+
+    # thread lock (cortes/jobs deste processo) + lock de arquivo (outros runners):
+    # quem chega depois espera o download em andamento e sai com cache hit
+    with _lock_download(key), LockArquivo(os.path.join(DOWNLOAD_CACHE_DIR, f"_{key}.lock")):
+        path = _cache_hit_confiavel(key, duracao_esperada)
+        anotar(cache_hit=bool(path))
+        if path:
+            log_step(f"Cache hit (vídeo inteiro): {path}")
+            return path
+
+        # baixa numa pasta temporária da chave e só move para o cache depois de conferido
+        tmp_dir = os.path.join(DOWNLOAD_CACHE_DIR, "_tmp", key)
+        os.makedirs(tmp_dir, exist_ok=True)
+        outtmpl = os.path.join(tmp_dir, f"{key}.%(ext)s")
+
+        baixado = None
+        tentativas_http = RETRY_TENTATIVAS["expirado"] if DOWNLOAD_HTTP_DIRETO else 0
+        for tentativa in range(1, tentativas_http + 1):
+            try:
+                with _SEM_REDE:
+                    baixado = baixar_inteiro_http(url_youtube, tmp_dir, key, progressiva)
+                break
+            except urllib.error.HTTPError as e:
+                # 403: URL assinada vencida; o info já foi descartado, a próxima volta extrai
+                # URLs novas e retoma as partes do ponto onde pararam
+                if classificar_falha(f"Error {e.code}") != "expirado" or tentativa == tentativas_http:
+                    log_step(f"Download HTTP direto falhou ({e}); seguindo com yt-dlp.")
+                    break
+                log_step(f"Download HTTP: URL vencida ({e.code}); extraindo de novo e retomando "
+                         f"({tentativa}/{tentativas_http}).")
+                time.sleep(espera_backoff("expirado", tentativa))
+            except Exception as e:
+                log_step(f"Download HTTP direto falhou ({str(e)[-300:]}); seguindo com yt-dlp.")
+                break
+
+        if not baixado:
+            if progressiva:
+                progressiva.terminar()
+            log_step("Baixando vídeo inteiro (cache) via yt-dlp...")
+            with _SEM_REDE:
+                rc, out = run_ytdlp(["-f", YTDLP_FORMAT_FULL, "--merge-output-format", "mp4", "-o", outtmpl],
+                                    url_youtube, "yt-dlp (vídeo inteiro)", duracao_esperada)
+            if rc != 0:
+                raise FalhaClassificada(classificar_falha(out), out)
+            baixado = os.path.join(tmp_dir, f"{key}.mp4")
+
+        if not os.path.exists(baixado):
+            candidatos = [
+                os.path.join(tmp_dir, fn) for fn in os.listdir(tmp_dir)
+                if fn.startswith(key + ".") and not fn.endswith((".part", ".ytdl", ".temp"))
+                and not re.search(r"\.f\d+\.", fn)
+            ]
+            if not candidatos:
+                raise RuntimeError("Download inteiro finalizou, mas arquivo não encontrado no cache.")
+            baixado = max(candidatos, key=os.path.getsize)
+
+        if not _cache_integro(baixado, duracao_esperada):
+            raise RuntimeError(f"Download inteiro incompleto: duração do arquivo não confere ({baixado}).")
+
+        final = os.path.join(DOWNLOAD_CACHE_DIR, os.path.basename(baixado))
+        os.replace(baixado, final)
+        try:
+            os.rmdir(tmp_dir)
+        except OSError:
+            pass
+        _cache_videos.registrar(key, os.path.basename(final), protegidos=_cache_protegidos(),
+                                url=url_youtube, duracao=duracao_esperada)
+        _cache_verificados[key] = (os.path.getsize(final), os.path.getmtime(final))
+        return final
+
+
+_keyframes_mem = {}
+
+
+def indice_keyframes(video_path: str) -> dict:
+    """
+    Índice de keyframes do vídeo (ffprobe, só pacotes: não decodifica nada).
+    Gravado uma vez em <video>.keyframes.json ao lado do download e reaproveitado
+    enquanto tamanho/mtime do vídeo não mudarem.
+    Retorna {"codec", "profile", "level", "pix_fmt", "width", "height", "fps",
+             "keyframes": [pts seg, ...], "dts": [dts seg de cada keyframe, ...]}.
+    """
+    st = os.stat(video_path)
+    assinatura = [st.st_size, int(st.st_mtime)]
+    sidecar = video_path + ".keyframes.json"
+
+    with _lock_download("keyframes:" + video_path), LockArquivo(sidecar + ".lock"):
+        mem = _keyframes_mem.get(video_path)
+        if mem and mem["assinatura"] == assinatura:
+            return mem
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                idx = json.load(f)
+            if idx.get("assinatura") == assinatura and "dts" in idx:
+                _keyframes_mem[video_path] = idx
+                return idx
+        except (OSError, ValueError):
+            pass
+
+        log_step(f"Índice de keyframes: construindo ({os.path.basename(video_path)})...")
+        cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+               "-show_entries", "stream=codec_name,profile,level,pix_fmt,width,height,r_frame_rate", "-of", "json", video_path]
+        p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="replace")
+        streams = (json.loads(p.stdout or "{}").get("streams") or [{}]) if p.returncode == 0 else [{}]
+        stream = streams[0]
+
+        cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+               "-show_entries", "packet=pts_time,dts_time,flags", "-of", "csv=p=0", video_path]
+        # guardamos também o dts de cada keyframe: o -to do -c copy corta por dts, e é o dts
+        # do keyframe seguinte que separa o último GOP copiado (com B-frames, pts > dts)
+        keyframes, dts = [], []
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding="utf-8", errors="replace")
+        for line in proc.stdout:
+            campos = line.strip().split(",")
+            if len(campos) >= 3 and "K" in campos[2] and "N/A" not in campos[:2] and all(campos[:2]):
+                keyframes.append(float(campos[0]))
+                dts.append(float(campos[1]))
+        if proc.wait() != 0 or not keyframes:
+            raise RuntimeError(f"ffprobe não conseguiu listar keyframes de {video_path}")
+
+        num, _, den = (stream.get("r_frame_rate") or "30/1").partition("/")
+        idx = {
+            "assinatura": assinatura,
+            "codec": stream.get("codec_name", ""),
+            "profile": stream.get("profile", ""),
+            "level": stream.get("level"),
+            "pix_fmt": stream.get("pix_fmt", "yuv420p"),
+            "width": stream.get("width"),
+            "height": stream.get("height"),
+            "fps": (float(num) / float(den or 1)) if float(den or 1) else 30.0,
+            "keyframes": keyframes,
+            "dts": dts,
+        }
+        tmp = sidecar + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(idx, f)
+        os.replace(tmp, sidecar)
+        _keyframes_mem[video_path] = idx
+        log_step(f"Índice de keyframes: {len(keyframes)} keyframes.")
+        return idx
+
+
+def _x264_args(idx: dict) -> list:
+    # mesmos parâmetros da fonte (perfil e nível inclusive) para o trecho reencodado concatenar
+    # com o miolo copiado: SPS/PPS de cada parte vão em banda (TS) e o decoder troca sem reiniciar
+    args = ["-c:v", "libx264", "-preset", SMART_X264_PRESET, "-crf", str(SMART_X264_CRF),
+            "-pix_fmt", idx.get("pix_fmt") or "yuv420p", "-r", f"{idx.get('fps') or 30:.6f}",
+            "-x264-params", "repeat-headers=1"]
+    profile = (idx.get("profile") or "").lower()
+    if profile in ("baseline", "main", "high"):
+        args += ["-profile:v", profile]
+    if isinstance(idx.get("level"), int) and idx["level"] > 0:
+        args += ["-level:v", f"{idx['level'] / 10:.1f}"]
+    if idx.get("width") and idx.get("height"):
+        args += ["-s", f"{idx['width']}x{idx['height']}"]
+    return args
+
+
+def _cmd_copia_gops(video_path: str, idx: dict, i1: int, i2: int, saida_path: str) -> list:
+    """ffmpeg -c copy dos GOPs inteiros de keyframes[i1] até o pacote antes de keyframes[i2]."""
+    # seek meio quadro depois de k1: o -ss do copy cai no keyframe <= ss, e um ss arredondado
+    # para baixo voltaria um GOP. O -to do copy corta por dts (contado do ss): pouco antes do dts de k2
+    quadro = 1.0 / (idx.get("fps") or 30.0)
+    ss = idx["keyframes"][i1] + quadro / 2
+    return ["ffmpeg", "-y", "-hide_banner", "-noaccurate_seek", "-ss", f"{ss:.6f}", "-i", video_path,
+            "-to", f"{idx['dts'][i2] - quadro / 4 - ss:.6f}", "-an", "-c:v", "copy", saida_path]
+
+
+def cortar_local_smart(video_path: str, ini_s: float, fim_s: float, saida_path: str):
+    """
+    Corte com bordas exatas quase na velocidade do -c copy:
+      [ini, k1) reencodado | [k1, k2) copiado | [k2, fim) reencodado
+    onde k1 é o primeiro keyframe >= ini e k2 o último <= fim. O áudio é
+    copiado direto da fonte na janela inteira.
+    """
+    os.makedirs(os.path.dirname(saida_path), exist_ok=True)
+    idx = indice_keyframes(video_path)
+    kfs = idx["keyframes"]
+    # bordas no grid de quadros da fonte: no meio de um quadro, o reencode (-r) ganha um quadro
+    # a mais e a concatenação abre um buraco antes do miolo
+    fps = idx.get("fps") or 30.0
+    ini_s = kfs[0] + math.ceil(round((ini_s - kfs[0]) * fps, 3)) / fps
+    fim_s = kfs[0] + math.ceil(round((fim_s - kfs[0]) * fps, 3)) / fps
+    i1 = bisect.bisect_left(kfs, ini_s - 0.0005)
+    i2 = bisect.bisect_right(kfs, fim_s + 0.0005) - 1
+    k1 = kfs[i1] if i1 < len(kfs) else None
+    k2 = kfs[i2] if i2 >= 0 else None
+    dur = fim_s - ini_s
+
+    if idx.get("codec") != "h264" or k1 is None or k2 is None or k2 <= k1:
+        # sem GOP inteiro dentro da janela (ou codec sem smart cut): reencoda a janela toda
+        cmd = ["ffmpeg", "-y", "-hide_banner", "-ss", f"{ini_s:.3f}", "-i", video_path, "-t", f"{dur:.3f}",
+               *_x264_args(idx), "-c:a", "copy", saida_path]
+        with _SEM_LOCAL:
+            rc, out = run_cmd_live(cmd, check=False)
+        if rc != 0:
+            raise RuntimeError(out)
+        return
+
+    tmp_dir = saida_path + ".smart"
+    os.makedirs(tmp_dir, exist_ok=True)
+    partes = []
+    cmds = []
+    if k1 - ini_s > 0.001:
+        partes.append(os.path.join(tmp_dir, "0_inicio.ts"))
+        cmds.append(["ffmpeg", "-y", "-hide_banner", "-ss", f"{ini_s:.6f}", "-i", video_path, "-t", f"{k1 - ini_s:.6f}",
+                     "-an", *_x264_args(idx), partes[-1]])
+    partes.append(os.path.join(tmp_dir, "1_miolo.ts"))
+    cmds.append(_cmd_copia_gops(video_path, idx, i1, i2, partes[-1]))
+    if fim_s - k2 > 0.001:
+        partes.append(os.path.join(tmp_dir, "2_fim.ts"))
+        cmds.append(["ffmpeg", "-y", "-hide_banner", "-ss", f"{k2:.6f}", "-i", video_path, "-t", f"{fim_s - k2:.6f}",
+                     "-an", *_x264_args(idx), partes[-1]])
+
+    lista = os.path.join(tmp_dir, "lista.txt")
+    with open(lista, "w", encoding="utf-8") as f:
+        for pth in partes:
+            f.write("file '" + pth.replace("\\", "/").replace("'", "'\\''") + "'\n")
+    video_ts = os.path.join(tmp_dir, "video.ts")
+    cmds.append(["ffmpeg", "-y", "-hide_banner", "-f", "concat", "-safe", "0", "-i", lista, "-c", "copy", video_ts])
+    cmds.append(["ffmpeg", "-y", "-hide_banner", "-i", video_ts, "-ss", f"{ini_s:.6f}", "-t", f"{dur:.6f}", "-i", video_path,
+                 "-map", "0:v:0", "-map", "1:a:0?", "-c", "copy", "-movflags", "+faststart", saida_path])
+
+    log_step(f"Smart cut: reencode {max(0.0, k1 - ini_s):.2f}s + copia {k2 - k1:.2f}s + reencode {max(0.0, fim_s - k2):.2f}s")
+    try:
+        with _SEM_LOCAL:
+            for cmd in cmds:
+                rc, out = run_cmd_live(cmd, check=False)
+                if rc != 0:
+                    raise RuntimeError(out)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def cortar_local_por_ini_fim(video_path: str, ini_hhmmss: str, fim_hhmmss: str, saida_path: str):
+    os.makedirs(os.path.dirname(saida_path), exist_ok=True)
+    # usa -to (fim absoluto) para casar com o relatório (snap já vem pronto)
+    cmd = ["ffmpeg", "-y", "-hide_banner", *_janela_entrada({"ini": ini_hhmmss, "fim": fim_hhmmss}), "-i", video_path,
+           "-c", "copy", saida_path]
+    with _SEM_LOCAL:
+        rc, out = run_cmd_live(cmd, check=False)
+    if rc != 0:
+        raise RuntimeError(out)
+
+
+def cortar_local_por_dur(video_path: str, ini_hhmmss: str, dur_mmss: str, saida_path: str):
+    os.makedirs(os.path.dirname(saida_path), exist_ok=True)
+    cmd = ["ffmpeg", "-y", "-hide_banner", *_janela_entrada({"ini": ini_hhmmss, "dur_mmss": dur_mmss}), "-i", video_path,
+           "-c", "copy", saida_path]
+    with _SEM_LOCAL:
+        rc, out = run_cmd_live(cmd, check=False)
+    if rc != 0:
+        raise RuntimeError(out)
+
+
+def _ini_em_segundos(corte) -> int:
+    if isinstance(corte, Corte):
+        return corte.ini_s
+    return hhmmss_to_seconds(corte["ini"])
+
+
+def _fim_em_segundos(corte) -> int:
+    if isinstance(corte, Corte):
+        return corte.fim_s if corte.fim_s is not None else corte.ini_s + corte.dur_s
+    if corte.get("fim"):
+        return hhmmss_to_seconds(corte["fim"])
+    mm, ss = corte["dur_mmss"].split(":")
+    return hhmmss_to_seconds(corte["ini"]) + int(mm) * 60 + int(ss)
+
+
+def _janela_entrada(corte) -> list:
+    """Seek de entrada do corte -c copy: -ss/-to ou -ss/-t antes do -i."""
+    if corte.get("fim"):
+        return ["-ss", corte["ini"], "-to", corte["fim"]]
+    return ["-ss", corte["ini"], "-t", f"00:{corte['dur_mmss']}"]
+
+
+@rastreado("corte_em_lote", lambda r: {"cortes_ok": len(r)})
+def cortar_local_em_lote(video_path: str, jobs: list) -> dict:
+    """
+    Corta vários trechos do mesmo vídeo numa só leitura sequencial da fonte.
+    jobs: lista de (idx, corte, saida_path).
+    Um processo ffmpeg com uma entrada (seek até o primeiro keyframe do bloco) e
+    uma saída por corte. Cada saída começa no dts do keyframe <= ini, o mesmo que o
+    seek de entrada do corte individual escolheria, e desloca os timestamps para o
+    ini cair no zero: o que vem antes fica negativo e o mp4 descarta pela edit list,
+    então vídeo e áudio começam juntos no ini, igual ao cortar_local.
+    Retorna {idx: segundos gastos} só dos cortes que saíram OK; os demais ficam
+    para o corte individual (fallback).
+    """
+    try:
+        idx_kf = indice_keyframes(video_path)
+    except Exception as e:
+        log_step(f"Corte em lote: sem índice de keyframes ({e}); cortes seguem individuais.")
+        return {}
+    kfs, dts = idx_kf["keyframes"], idx_kf["dts"]
+    # meio quadro abaixo do dts: arredondamento do ffprobe não pode deixar o keyframe de fora
+    margem = 0.5 / (idx_kf.get("fps") or 30.0)
+
+    ok = {}
+    ordenados = sorted(jobs, key=lambda j: _ini_em_segundos(j[1]))
+    for n in range(0, len(ordenados), max(1, LOTE_MAX_SAIDAS)):
+        bloco = ordenados[n:n + max(1, LOTE_MAX_SAIDAS)]
+        janelas = []
+        for _, corte, _ in bloco:
+            ini, fim = _ini_em_segundos(corte), _fim_em_segundos(corte)
+            k = max(0, bisect.bisect_right(kfs, ini + 0.0005) - 1)
+            janelas.append((max(0.0, dts[k] - margem), ini, fim))
+        base = min(j[0] for j in janelas)
+        fim_max = max(j[2] for j in janelas)
+
+        cmd = ["ffmpeg", "-y", "-hide_banner", "-ss", f"{base:.6f}", "-i", video_path]
+        for (copia, ini, fim), (_, _, saida_path) in zip(janelas, bloco):
+            os.makedirs(os.path.dirname(saida_path), exist_ok=True)
+            cmd += ["-map", "0:v:0", "-map", "0:a:0?", "-c", "copy",
+                    "-ss", f"{copia - base:.6f}", "-to", f"{fim - base:.6f}",
+                    "-output_ts_offset", f"{copia - ini:.6f}", saida_path]
+
+        log_step(f"Corte em lote: {len(bloco)} saída(s) numa leitura [{seconds_to_hhmmss(int(base))} -> {seconds_to_hhmmss(int(fim_max))}]")
+        t0 = time.time()
+        with _SEM_LOCAL:
+            rc, _out = run_cmd_live(cmd, check=False, midia_s=fim_max - base)
+        gasto = (time.time() - t0) / len(bloco)
+
+        if rc != 0:
+            # não dá pra saber qual saída quebrou: o bloco inteiro volta pro corte individual
+            log_step(f"Corte em lote: ffmpeg rc={rc}; {len(bloco)} corte(s) vão para o fallback individual.")
+            continue
+        for idx, _, saida_path in bloco:
+            if os.path.exists(saida_path) and os.path.getsize(saida_path) > 0:
+                ok[idx] = gasto
+    return ok
+
+
+@rastreado("download_trecho", lambda r: {"ok": r[0], "section": r[2]})
+def tentar_baixar_trecho(url_youtube: str, inicio_hhmmss: str, duracao_mmss: str, saida_path: str):
+    dur_s = int(duracao_mmss.split(":")[0]) * 60 + int(duracao_mmss.split(":")[1])
+    end = seconds_to_hhmmss(hhmmss_to_seconds(inicio_hhmmss) + dur_s)
+    section = f"*{inicio_hhmmss}-{end}"
+    args = ["-f", YTDLP_FORMAT_FULL,
+            "--download-sections", section, "--force-keyframes-at-cuts",
+            "--merge-output-format", "mp4", "-o", saida_path]
+    with _SEM_REDE:
+        rc, out = run_ytdlp(args, url_youtube, f"yt-dlp (trecho {section})", dur_s)
+    if rc == 0 and os.path.exists(saida_path) and os.path.getsize(saida_path) > 0:
+        return True, out, section
+    return False, out, section
+
+
+@rastreado("corte_progressivo")
+def cortar_progressivo(partes: list, corte: dict, saida_path: str):
+    """Corte -c copy direto das partes do download (vídeo + áudio separados), sem esperar o merge."""
+    ini, fim = seconds_to_hhmmss(_ini_em_segundos(corte)), seconds_to_hhmmss(_fim_em_segundos(corte))
+    cmd = ["ffmpeg", "-y", "-hide_banner"]
+    for pth in partes:
+        cmd += ["-ss", ini, "-to", fim, "-i", pth]
+    for n in range(len(partes)):
+        cmd += ["-map", str(n)]
+    cmd += ["-c", "copy", "-movflags", "+faststart", saida_path]
+    with _SEM_LOCAL:
+        run_cmd_live(cmd)
+
+
+def _usa_smart_cut(corte: dict) -> bool:
+    return corte.get("kind") in CORTE_SMART_KINDS
+
+
+@rastreado("corte_local")
+def cortar_local(video_path: str, corte: dict, saida_path: str):
+    if _usa_smart_cut(corte):
+        cortar_local_smart(video_path, _ini_em_segundos(corte), _fim_em_segundos(corte), saida_path)
+    elif corte.get("fim"):
+        cortar_local_por_ini_fim(video_path, corte["ini"], corte["fim"], saida_path)
+    else:
+        cortar_local_por_dur(video_path, corte["ini"], corte["dur_mmss"], saida_path)
+
+
+@rastreado("realizar_corte", lambda r: {"modo": r[0], "bytes": _tamanho(r[2])})
+def realizar_corte(url_youtube, corte: dict, nome_saida: str, destino_local: str, tipocorte: str,
+                   duracao_video=None, fonte: dict | None = None):
+    os.makedirs(destino_local, exist_ok=True)
+    saida_path = os.path.join(destino_local, f"{nome_saida}.mp4")
+
+    ini = corte["ini"]
+    dur = corte["dur_mmss"]
+    fonte = fonte or {}
+
+    # download do vídeo inteiro ainda em andamento, mas já cobrindo este corte
+    if fonte.get("tipo") == "progressivo":
+        # quem chama segura a reserva das partes (FonteProgressiva.reservar) durante o corte
+        cortar_progressivo(fonte["partes"], corte, saida_path)
+        return "A_PROGRESSIVO", "", saida_path, ""
+
+    # Anti-HLS para LOUVOR: sempre vídeo inteiro + corte local
+    if tipocorte == "LOUVOR" or fonte.get("tipo") == "inteiro":
+        video_local = garantir_download_inteiro(url_youtube, duracao_video)
+        cortar_local(video_local, corte, saida_path)
+        return "A_LOCAL", "", saida_path, ""
+
+    # faixa já baixada pelo planejador: corte local com offset
+    if fonte.get("tipo") == "faixa":
+        try:
+            off = fonte["offset"]
+            local = {**corte, "ini": seconds_to_hhmmss(hhmmss_to_seconds(ini) - off),
+                     "fim": seconds_to_hhmmss(_fim_em_segundos(corte) - off)}
+            cortar_local(fonte["path"], local, saida_path)
+            return "B_FAIXA", "", saida_path, fonte.get("section", "")
+        except Exception as e:
+            log_step(f"Corte a partir da faixa falhou ({e}); caindo para vídeo inteiro.")
+            video_local = garantir_download_inteiro(url_youtube, duracao_video)
+            cortar_local(video_local, corte, saida_path)
+            return "A_LOCAL", str(e), saida_path, fonte.get("section", "")
+
+    ok, out_trecho, section = tentar_baixar_trecho(url_youtube, ini, dur, saida_path)
+    if ok:
+        return "B_TRECHO", out_trecho, saida_path, section
+
+    video_local = garantir_download_inteiro(url_youtube, duracao_video)
+    cortar_local(video_local, corte, saida_path)
+    return "A_LOCAL", out_trecho, saida_path, section
+
+
+# =========================
+# Ajuste de bordas (áudio)
+# =========================
+class MapaEnergia:
+    """
+    Envelope RMS do áudio de um vídeo, só nos trechos já analisados
+    (vizinhanças das bordas), persistido em ENERGIA_CACHE_DIR/<chave>.npz.
+    """
+
+    def __init__(self, chave: str):
+        self.path = os.path.join(ENERGIA_CACHE_DIR, f"{chave}.npz")
+        self.janelas = {}   # ini em ms -> envelope (um valor por AJUSTE_QUADRO_S)
+        try:
+            with np.load(self.path) as dados:
+                if float(dados["quadro_s"]) == AJUSTE_QUADRO_S:
+                    self.janelas = {int(k[2:]): dados[k] for k in dados.files if k.startswith("j_")}
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def cobre(self, ini_s: float, fim_s: float) -> bool:
+        q = AJUSTE_QUADRO_S
+        return any(ini_ms / 1000 <= ini_s + q and fim_s <= ini_ms / 1000 + (len(e) + 1) * q
+                   for ini_ms, e in self.janelas.items())
+
+    def trecho(self, ini_s: float, fim_s: float):
+        """(tempos, envelope) de [ini_s, fim_s] a partir da janela que mais cobre o intervalo."""
+        q = AJUSTE_QUADRO_S
+        melhor = (np.empty(0), np.empty(0))
+        for ini_ms, e in self.janelas.items():
+            base = ini_ms / 1000
+            if base > ini_s + q:
+                continue
+            a = max(0, int((ini_s - base) / q))
+            b = min(len(e), int(np.ceil((fim_s - base) / q)))
+            if b - a > len(melhor[1]):
+                melhor = (base + (np.arange(a, b) + 0.5) * q, e[a:b])
+        return melhor
+
+    def adicionar(self, ini_s: float, envelope):
+        self.janelas[int(round(ini_s * 1000))] = envelope
+
+    def salvar(self):
+        os.makedirs(ENERGIA_CACHE_DIR, exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, quadro_s=AJUSTE_QUADRO_S, **{f"j_{k}": v for k, v in self.janelas.items()})
+        os.replace(tmp, self.path)
+
+
+@rastreado("energia_audio", lambda r: {"quadros": len(r)})
+def envelope_rms(video_path: str, ini_s: float, fim_s: float):
+    """
+    RMS por quadro do áudio em [ini_s, fim_s): PCM mono do ffmpeg lido do pipe em
+    blocos de AJUSTE_CHUNK_BYTES, sem carregar a janela inteira de uma vez.
+    """
+    amostras_quadro = int(AJUSTE_AMOSTRAGEM_HZ * AJUSTE_QUADRO_S)
+    bytes_quadro = amostras_quadro * 2
+    chunk = max(bytes_quadro, AJUSTE_CHUNK_BYTES // bytes_quadro * bytes_quadro)
+    cmd = ["ffmpeg", "-v", "error", "-nostdin", "-ss", f"{ini_s:.3f}", "-t", f"{fim_s - ini_s:.3f}", "-i", video_path,
+           "-vn", "-ac", "1", "-ar", str(AJUSTE_AMOSTRAGEM_HZ), "-f", "s16le", "-"]
+    partes = []
+    resto = b""
+    with _SEM_LOCAL:
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            while True:
+                bloco = p.stdout.read(chunk)
+                if not bloco:
+                    break
+                bloco = resto + bloco
+                n = len(bloco) // bytes_quadro * bytes_quadro
+                resto = bloco[n:]
+                if n:
+                    x = np.frombuffer(bloco[:n], dtype="<i2").astype(np.float32).reshape(-1, amostras_quadro)
+                    partes.append(np.sqrt(np.mean(x * x, axis=1)))
+            erro = p.stderr.read().decode("utf-8", errors="replace")
+        finally:
+            p.stdout.close()
+            p.stderr.close()
+            rc = p.wait()
+    if rc != 0:
+        raise RuntimeError(f"ffmpeg (PCM) rc={rc}: {erro[-500:]}")
+    return np.concatenate(partes) if partes else np.zeros(0, dtype=np.float32)
+
+
+def _candidatos(e):
+    """Índices dos mínimos locais do envelope suavizado (e as pontas)."""
+    k = max(1, AJUSTE_SUAVIZACAO_QUADROS)
+    suave = np.convolve(e, np.ones(k) / k, mode="same") if len(e) > k else e
+    meio = np.flatnonzero((suave[1:-1] <= suave[:-2]) & (suave[1:-1] <= suave[2:])) + 1
+    return np.unique(np.concatenate([meio, [0, len(e) - 1]])), suave
+
+
+def _custos(t, e, referencia: float):
+    """Candidatos de uma borda e o custo de cada um: energia relativa + deslocamento."""
+    idx, suave = _candidatos(e)
+    nivel = np.median(suave) + 1e-6
+    custo = suave[idx] / nivel + AJUSTE_PESO_DESLOCAMENTO * np.abs(t[idx] - referencia) / AJUSTE_RAIO_S
+    return t[idx], custo
+
+
+def _centro_fim(ini_s: float, fim_s: float, alvo) -> float:
+    # com alvo: se o fim do relatório está longe demais da duração pedida, procura em volta de ini + alvo
+    if alvo and abs((fim_s - ini_s) - alvo) > AJUSTE_RAIO_S:
+        return ini_s + alvo
+    return fim_s
+
+
+def _ajustar_um(mapa: MapaEnergia, corte) -> tuple:
+    ini0, fim0 = _ini_em_segundos(corte), _fim_em_segundos(corte)
+    alvo = corte.get("alvo")
+    centro = _centro_fim(ini0, fim0, alvo)
+    ti, ei = mapa.trecho(max(0.0, ini0 - AJUSTE_RAIO_S), ini0 + AJUSTE_RAIO_S)
+    tf, ef = mapa.trecho(max(0.0, centro - AJUSTE_RAIO_S), centro + AJUSTE_RAIO_S)
+    if len(ei) < 3 or len(ef) < 3:
+        return ini0, fim0, "sem áudio"
+
+    ci, custo_i = _custos(ti, ei, ini0)
+    cf, custo_f = _custos(tf, ef, centro)
+    total = custo_i[:, None] + custo_f[None, :]
+    dur = cf[None, :] - ci[:, None]
+    total = np.where(dur > 1, total, np.inf)
+    if alvo:
+        com_alvo = np.where(np.abs(dur - alvo) <= AJUSTE_ALVO_TOLERANCIA_S, total, np.inf)
+        if np.isfinite(com_alvo).any():
+            total = com_alvo
+        else:
+            alvo = None
+    if not np.isfinite(total).any():
+        return ini0, fim0, "sem candidato"
+    i, j = np.unravel_index(np.argmin(total), total.shape)
+    return round(float(ci[i]), 3), round(float(cf[j]), 3), f"alvo {corte.get('alvo')}s" if alvo else ""
+
+
+@rastreado("ajuste_bordas", lambda r: {"cortes": len(r)})
+def ajustar_bordas(video_path: str, url_youtube: str, pendentes: list) -> list:
+    """
+    pendentes: [(idx, corte)] -> mesma lista com as bordas ajustadas pelo áudio.
+    Cada vizinhança é analisada uma vez (as que se sobrepõem viram uma janela só)
+    e o envelope fica em cache por vídeo para as próximas execuções.
+    """
+    if not (AJUSTE_BORDAS and pendentes):
+        return pendentes
+    if np is None:
+        log_step("Ajuste de bordas: NumPy indisponível; bordas do relatório mantidas.")
+        return pendentes
+
+    chave = cache_key_for_url(url_youtube)
+    with _lock_download(f"energia:{chave}"):
+        mapa = MapaEnergia(chave)
+        vizinhancas = []
+        for idx, corte in pendentes:
+            ini0, fim0 = _ini_em_segundos(corte), _fim_em_segundos(corte)
+            for b in (ini0, _centro_fim(ini0, fim0, corte.get("alvo"))):
+                a, z = max(0.0, b - AJUSTE_RAIO_S), b + AJUSTE_RAIO_S
+                if not mapa.cobre(a, z):
+                    vizinhancas.append((idx, a, z))
+        janelas = mesclar_janelas(vizinhancas, gap=0)
+        for j in janelas:
+            mapa.adicionar(j["ini"], envelope_rms(video_path, j["ini"], j["fim"]))
+        if janelas:
+            mapa.salvar()
+    log_step(f"Ajuste de bordas: {len(janelas)} janela(s) de áudio analisada(s) "
+             f"({len(pendentes) * 2 - len(vizinhancas)} borda(s) do cache).")
+
+    ajustados = []
+    for idx, corte in pendentes:
+        ini0, fim0 = _ini_em_segundos(corte), _fim_em_segundos(corte)
+        try:
+            ini, fim, nota = _ajustar_um(mapa, corte)
+        except Exception as e:
+            ini, fim, nota = ini0, fim0, f"erro: {e}"
+        if (ini, fim) == (ini0, fim0):
+            ajustados.append((idx, corte))
+            continue
+        log_step(f"Ajuste de bordas: corte {idx} ini {ini - ini0:+.2f}s fim {fim - fim0:+.2f}s "
+                 f"-> {fim - ini:.2f}s{f' ({nota})' if nota else ''}")
+        ajustados.append((idx, Corte(ini, fim, fim - ini, corte.get("desc"), corte.get("kind", "CORTE"),
+                                     corte.get("alvo"), getattr(corte, "linha", 0), origem=corte)))
+    return ajustados
+
+
+# =========================
+# Loudness (EBU R128)
+# =========================
+# FTPK: um valor por canal, "-inf" nos quadros em silêncio
+RE_EBUR128 = re.compile(r"\bt:\s*([\d.]+)\s.*?\bM:\s*(\S+)\s+S:\s*(\S+).*?FTPK:\s*(.+?)\s*dBFS")
+LOUDNESS_AMOSTRAGEM_HZ = 48000
+
+
+def _db(txt: str) -> float:
+    try:
+        return max(-120.0, float(txt))
+    except ValueError:
+        return -120.0   # -inf / nan do ebur128 (silêncio)
+
+
+def _energia_media_db(v) -> float:
+    return float(10 * np.log10(np.mean(10 ** (v / 10))))
+
+
+def _amostra_ebur128(linha: str) -> tuple | None:
+    """Linha do framelog do ebur128 -> (t, M, S, pico do quadro); None para as demais."""
+    mt = RE_EBUR128.search(linha)
+    if not mt:
+        return None
+    picos = [_db(x) for x in mt.group(4).split()]
+    return float(mt.group(1)), _db(mt.group(2)), _db(mt.group(3)), max(picos) if picos else -120.0
+
+
+class SerieLoudness:
+    """
+    Loudness de um arquivo inteiro, uma amostra por LOUDNESS_PASSO_S: M (bloco de
+    400 ms), S (3 s) e true peak do quadro, cada uma com o instante em que o quadro
+    fecha (t). Em cache como int16 em décimos de dB + t em float32
+    (LOUDNESS_CACHE_DIR/<chave>.npz); cada corte mede a sua janela daqui.
+    """
+
+    def __init__(self, t, m, s, p):
+        self.t, self.m, self.s, self.p = t, m, s, p
+
+    @classmethod
+    def de_amostras(cls, amostras: list) -> "SerieLoudness":
+        t, m, s, p = (np.array(col, dtype=np.float32) for col in zip(*amostras))
+        return cls(t, m, s, p)
+
+    @classmethod
+    def carregar(cls, chave: str) -> "SerieLoudness | None":
+        try:
+            with np.load(os.path.join(LOUDNESS_CACHE_DIR, f"{chave}.npz")) as dados:
+                if float(dados["passo_s"]) != LOUDNESS_PASSO_S:
+                    return None
+                # cache sem "t" (antes dos instantes por amostra) dá KeyError: refaz a análise
+                return cls(dados["t"].astype(np.float32), *(dados[k].astype(np.float32) / 10 for k in ("m", "s", "p")))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def salvar(self, chave: str):
+        os.makedirs(LOUDNESS_CACHE_DIR, exist_ok=True)
+        path = os.path.join(LOUDNESS_CACHE_DIR, f"{chave}.npz")
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, passo_s=LOUDNESS_PASSO_S, t=self.t.astype(np.float32),
+                            **{k: np.round(getattr(self, k) * 10).astype(np.int16) for k in ("m", "s", "p")})
+        os.replace(tmp, path)
+
+    def _janela(self, ini_s: float, fim_s: float, bloco_s: float):
+        # cada amostra cobre o bloco que termina no seu t (o ebur128 imprime t um pouco antes do múltiplo do passo)
+        tol = 1e-3
+        return (self.t - bloco_s >= ini_s - tol) & (self.t <= fim_s + tol)
+
+    def medir(self, ini_s: float, fim_s: float) -> dict | None:
+        """measured_I/LRA/TP/thresh do loudnorm para [ini_s, fim_s] (gating BS.1770); None se for silêncio."""
+        m = self.m[self._janela(ini_s, fim_s, 0.4)]
+        m = m[m > -70]
+        if not m.size:
+            return None
+        limiar = _energia_media_db(m) - 10
+        integrada = _energia_media_db(m[m > limiar])
+        if integrada < -60:
+            return None
+        st = self.s[self._janela(ini_s, fim_s, 3.0)]
+        st = st[st > -70]
+        lra = 0.0
+        if st.size > 1:
+            st = st[st > _energia_media_db(st) - 20]
+            lra = float(np.percentile(st, 95) - np.percentile(st, 10))
+        pico = self.p[self._janela(ini_s, fim_s, 0.0)]
+        return {"I": integrada, "LRA": lra, "TP": float(pico.max()) if pico.size else -120.0, "thresh": limiar}
+
+
+@rastreado("analise_loudness")
+def analisar_loudness(path: str) -> SerieLoudness:
+    """Uma passada ebur128 só no áudio (quadros fixos de LOUDNESS_PASSO_S): série M/S/pico do arquivo."""
+    amostras = []
+
+    def ao_linha(linha, _ev):
+        amostra = _amostra_ebur128(linha)
+        if amostra:
+            amostras.append(amostra)
+
+    n = int(LOUDNESS_AMOSTRAGEM_HZ * LOUDNESS_PASSO_S)
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-i", path, "-vn", "-map", "0:a:0",
+           "-af", f"aresample={LOUDNESS_AMOSTRAGEM_HZ},asetnsamples=n={n}:p=0,ebur128=framelog=info:peak=true",
+           "-f", "null", "-"]
+    with _SEM_LOCAL:
+        run_cmd_live(cmd, eco=False, ao_linha=ao_linha, midia_s=duracao_container(path) or None)
+    if not amostras:
+        raise RuntimeError(f"ebur128 não produziu medições para {path}")
+    return SerieLoudness.de_amostras(amostras)
+
+
+_series_loudness = {}
+
+
+def serie_loudness(video_path: str, url_youtube: str) -> SerieLoudness:
+    """Série da fonte inteira: memória -> cache em disco -> uma análise (os demais cortes esperam no lock)."""
+    chave = cache_key_for_url(url_youtube)
+    with _lock_download(f"loudness:{chave}"):
+        serie = _series_loudness.get(chave) or SerieLoudness.carregar(chave)
+        if serie is None:
+            t0 = time.time()
+            serie = analisar_loudness(video_path)
+            serie.salvar(chave)
+            log_step(f"Loudness: fonte analisada em {fmt_td(time.time() - t0)} ({len(serie.m)} amostras)")
+        _series_loudness[chave] = serie
+    return serie
+
+
+def filtro_loudnorm(medida: dict) -> str:
+    # segunda passada do loudnorm: com os valores medidos vira ganho linear (sem compressão dinâmica)
+    return (f"loudnorm=I={NORMALIZAR_ALVO_LUFS}:LRA={NORMALIZAR_LRA}:TP={NORMALIZAR_TP}"
+            f":measured_I={medida['I']:.2f}:measured_LRA={medida['LRA']:.2f}:measured_TP={medida['TP']:.2f}"
+            f":measured_thresh={medida['thresh']:.2f}:offset=0:linear=true,aresample={LOUDNESS_AMOSTRAGEM_HZ}")
+
+
+# =========================
+# Renderização Reels
+# =========================
+def _filtro_vertical() -> str:
+    w, h = RENDER_VERTICAL_W, RENDER_VERTICAL_H
+    if RENDER_VERTICAL_MODO == "pad":
+        return (f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+                f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1")
+    return f"crop='min(iw,ih*{w}/{h})':'min(ih,iw*{h}/{w})',scale={w}:{h},setsar=1"
+
+
+def saidas_render(clip_path: str, tipocorte: str) -> dict:
+    pasta = os.path.join(os.path.dirname(clip_path), RENDER_SUBPASTA)
+    base = os.path.splitext(os.path.basename(clip_path))[0]
+    saidas = {
+        "vertical": os.path.join(pasta, f"{base}__vertical.mp4"),
+        "preview": os.path.join(pasta, f"{base}__preview.mp4"),
+        "poster": os.path.join(pasta, f"{base}__poster.jpg"),
+    }
+    if tipocorte == "LOUVOR":
+        saidas["audio"] = os.path.join(pasta, f"{base}.m4a")
+    return saidas
+
+
+def _tmp_render(path: str) -> str:
+    raiz, ext = os.path.splitext(path)
+    return f"{raiz}.tmp{ext}"
+
+
+@rastreado("render", lambda r: {"saidas": len(r)})
+def renderizar_reels(clip_path: str, tipocorte: str, dur_s: float, loudnorm: str | None = None) -> dict:
+    """
+    Uma decodificação do corte, várias saídas no mesmo ffmpeg:
+      [0:v] split -> vertical (x264) | preview (x264 leve) | capa (1 frame JPEG)
+      [0:a] copiado para as saídas de vídeo e para o m4a (LOUVOR), sem reencode;
+            com `loudnorm` (filtro já com os valores medidos), normalizado uma vez e dividido (AAC).
+    Saídas já existentes são mantidas (retomada). Retorna {tipo: caminho}.
+    """
+    saidas = saidas_render(clip_path, tipocorte)
+    if all(os.path.exists(pth) and os.path.getsize(pth) > 0 for pth in saidas.values()):
+        return saidas
+    os.makedirs(os.path.dirname(saidas["vertical"]), exist_ok=True)
+
+    t_capa = max(0.0, dur_s * RENDER_POSTER_FRACAO)
+    grafo = ";".join([
+        "[0:v]split=3[v_vert][v_prev][v_capa]",
+        f"[v_vert]{_filtro_vertical()}[vert]",
+        f"[v_prev]scale=-2:{RENDER_PREVIEW_ALTURA}[prev]",
+        f"[v_capa]trim=start={t_capa:.3f},setpts=PTS-STARTPTS[capa]",
+    ])
+    n_audio = 3 if "audio" in saidas else 2
+    if loudnorm:
+        grafo += f";[0:a:0]{loudnorm},asplit={n_audio}" + "".join(f"[a{i}]" for i in range(n_audio))
+        audio = [["-map", f"[a{i}]"] for i in range(n_audio)]
+        codec_audio = ["-c:a", "aac", "-b:a", f"{NORMALIZAR_AAC_KBPS}k"]
+    else:
+        audio = [["-map", "0:a:0?"], ["-map", "0:a:0?"], ["-map", "0:a:0"]]
+        codec_audio = ["-c:a", "copy"]
+
+    with _SEM_RENDER:
+        # threads repartidas entre os renders simultâneos; o preview é leve, fica com um quarto
+        threads = max(1, (os.cpu_count() or 4) // _SEM_RENDER.limite)
+        cmd = ["ffmpeg", "-y", "-hide_banner", "-i", clip_path,
+               "-filter_complex_threads", str(threads), "-filter_complex", grafo,
+               "-map", "[vert]", *audio[0], "-c:v", "libx264", "-preset", RENDER_X264_PRESET,
+               "-crf", str(RENDER_VERTICAL_CRF), "-pix_fmt", "yuv420p", "-threads", str(threads),
+               *codec_audio, "-movflags", "+faststart", _tmp_render(saidas["vertical"]),
+               "-map", "[prev]", *audio[1], "-c:v", "libx264", "-preset", "ultrafast",
+               "-b:v", f"{RENDER_PREVIEW_KBPS}k", "-maxrate", f"{RENDER_PREVIEW_KBPS * 2}k",
+               "-bufsize", f"{RENDER_PREVIEW_KBPS * 2}k", "-pix_fmt", "yuv420p", "-threads", str(max(1, threads // 4)),
+               *codec_audio, "-movflags", "+faststart", _tmp_render(saidas["preview"]),
+               "-map", "[capa]", "-frames:v", "1", "-q:v", "3", "-update", "1", _tmp_render(saidas["poster"])]
+        if "audio" in saidas:
+            cmd += [*audio[2], "-vn", *codec_audio, "-movflags", "+faststart", _tmp_render(saidas["audio"])]
+
+        t0 = time.time()
+        rc, out = run_cmd_live(cmd, check=False, midia_s=dur_s)
+
+    if rc != 0:
+        for pth in saidas.values():
+            try:
+                os.remove(_tmp_render(pth))
+            except OSError:
+                pass
+        raise RuntimeError(out)
+    for pth in saidas.values():
+        os.replace(_tmp_render(pth), pth)
+    log_step(f"Render: {len(saidas)} saída(s) de {os.path.basename(clip_path)} em {fmt_td(time.time() - t0)} "
+             f"({threads} thread(s))")
+    return saidas
+
+
+# =========================
+# Planejador de download
+# =========================
+def mesclar_janelas(janelas: list, gap: float = PLANO_GAP_MESCLA_S) -> list:
+    """janelas: [(idx, ini_s, fim_s)] -> faixas [{"ini", "fim", "idxs"}] (sobrepostas/adjacentes unidas)."""
+    faixas = []
+    for idx, ini, fim in sorted(janelas, key=lambda j: (j[1], j[2])):
+        if faixas and ini <= faixas[-1]["fim"] + gap:
+            faixas[-1]["fim"] = max(faixas[-1]["fim"], fim)
+            faixas[-1]["idxs"].append(idx)
+        else:
+            faixas.append({"ini": ini, "fim": fim, "idxs": [idx]})
+    return faixas
+
+
+def _bytes_por_segundo(video_info: dict) -> float:
+    fmts = video_info.get("requested_formats") or [video_info]
+    tbr = sum(float(f.get("tbr") or 0) for f in fmts)
+    if tbr > 0:
+        return tbr * 1000 / 8
+    dur = float(video_info.get("duration") or 0)
+    tamanho = video_info.get("filesize") or video_info.get("filesize_approx")
+    if dur > 0 and tamanho:
+        return float(tamanho) / dur
+    return PLANO_BITRATE_PADRAO_BPS
+
+
+@rastreado("planejar_download", lambda r: {"estrategia": r["estrategia"], "faixas": len(r["faixas"])})
+def planejar_download(url_youtube: str, itens: list, video_info: dict, throughput_bps: float = PLANO_THROUGHPUT_PADRAO_BPS,
+                      falha_secoes: float = 0.0) -> dict:
+    """
+    Olha a lista inteira de cortes antes de baixar qualquer coisa e escolhe a
+    estratégia mais barata (tempo estimado):
+      "faixas": uma seção yt-dlp por faixa (em paralelo, até MAX_PROCESSOS_REDE)
+      "multi":  uma única chamada yt-dlp com várias --download-sections
+      "inteiro": vídeo inteiro no cache + cortes locais
+    Estratégias que não têm como ganhar nem são estimadas.
+    itens: [(idx, corte)]. falha_secoes: fração das seções que acabaram no vídeo
+    inteiro (histórico); entra como custo esperado nas estratégias por seção.
+    """
+    janelas = [(idx, _ini_em_segundos(c), _fim_em_segundos(c)) for idx, c in itens]
+    faixas = mesclar_janelas(janelas)
+    bps = _bytes_por_segundo(video_info)
+    duracao = float(video_info.get("duration") or 0) or max(f["fim"] for f in faixas)
+    seg_faixas = sum(f["fim"] - f["ini"] for f in faixas)
+    bytes_faixas = seg_faixas * bps
+    bytes_inteiro = float(video_info.get("filesize") or video_info.get("filesize_approx") or duracao * bps)
+    par = max(1, min(len(faixas), MAX_PROCESSOS_REDE))
+
+    custos = {}
+    em_cache = _cache_videos.obter(cache_key_for_url(url_youtube)) is not None
+    if em_cache:
+        custos["inteiro"] = 0.0
+    else:
+        custos["inteiro"] = PLANO_OVERHEAD_EXTRACAO_S + bytes_inteiro / throughput_bps
+        if seg_faixas <= duracao * PLANO_COBERTURA_MAX:
+            reencode = seg_faixas * PLANO_REENCODE_S_POR_S
+            risco = falha_secoes * custos["inteiro"]
+            custos["multi"] = PLANO_OVERHEAD_EXTRACAO_S + bytes_faixas / throughput_bps + reencode + risco
+            # extração e reencode paralelizam; a banda não
+            if len(faixas) > 1 and par > 1:
+                custos["faixas"] = (len(faixas) * PLANO_OVERHEAD_EXTRACAO_S + reencode) / par + bytes_faixas / throughput_bps + risco
+
+    estrategia = min(custos, key=custos.get)
+    return {
+        "estrategia": estrategia,
+        "faixas": faixas,
+        "custos": custos,
+        "bytes": {"faixas": int(bytes_faixas), "inteiro": int(bytes_inteiro)},
+    }
+
+
+def _secao(ini_s: int, fim_s: int) -> str:
+    return f"*{seconds_to_hhmmss(ini_s)}-{seconds_to_hhmmss(fim_s)}"
+
+
+@rastreado("download_faixas", lambda r: {"faixas_ok": len(r[0])})
+def baixar_faixas(url_youtube: str, faixas: list, destino_dir: str) -> tuple:
+    """Uma chamada yt-dlp para todas as faixas. Retorna ({ini_faixa: path}, saída)."""
+    os.makedirs(destino_dir, exist_ok=True)
+    args = ["-f", YTDLP_FORMAT_FULL]
+    for f in faixas:
+        args += ["--download-sections", _secao(f["ini"], f["fim"])]
+    args += ["--force-keyframes-at-cuts", "--merge-output-format", "mp4",
+             "-o", os.path.join(destino_dir, "faixa_%(section_start)d.%(ext)s")]
+    with _SEM_REDE:
+        rc, out = run_ytdlp(args, url_youtube, f"yt-dlp ({len(faixas)} faixa(s))", sum(f["fim"] - f["ini"] for f in faixas))
+    paths = {}
+    for f in faixas:
+        fp = os.path.join(destino_dir, f"faixa_{int(f['ini'])}.mp4")
+        if rc == 0 and os.path.exists(fp) and os.path.getsize(fp) > 0:
+            paths[f["ini"]] = fp
+    return paths, out
+
+
+@rastreado("executar_plano")
+def executar_plano(url_youtube: str, plano: dict, destino_dir: str) -> dict:
+    """Baixa o que o plano pede e devolve a fonte de cada corte: {idx: fonte}."""
+    fontes = {}
+    faixas = plano["faixas"]
+    if plano["estrategia"] == "inteiro":
+        return {idx: {"tipo": "inteiro"} for f in faixas for idx in f["idxs"]}
+
+    if plano["estrategia"] == "multi":
+        paths, _ = baixar_faixas(url_youtube, faixas, destino_dir)
+    else:
+        # faixa com um único corte vai direto para o arquivo final (B_TRECHO), dentro do worker do corte
+        multiplas = [f for f in faixas if len(f["idxs"]) > 1]
+        paths = {}
+        if multiplas:
+            with ThreadPoolExecutor(max_workers=max(1, MAX_PROCESSOS_REDE), thread_name_prefix="faixa") as pool:
+                futs = [pool.submit(contextvars.copy_context().run, baixar_faixas, url_youtube, [f], destino_dir)
+                         for f in multiplas]
+                for fut in futs:
+                    paths.update(fut.result()[0])
+        for f in faixas:
+            if len(f["idxs"]) == 1:
+                fontes[f["idxs"][0]] = {"tipo": "trecho"}
+
+    for f in faixas:
+        for idx in f["idxs"]:
+            if idx in fontes:
+                continue
+            if f["ini"] in paths:
+                fontes[idx] = {"tipo": "faixa", "path": paths[f["ini"]], "offset": f["ini"], "section": _secao(f["ini"], f["fim"])}
+            else:
+                # faixa falhou: não insiste em seção, vai pro vídeo inteiro
+                fontes[idx] = {"tipo": "inteiro"}
+    return fontes
+
+
+# =========================
+# Upload (rclone copy / copyto)
+# =========================
+def listar_mp4(pasta_local_final: str):
+    return sorted(glob.glob(os.path.join(pasta_local_final, "*.mp4")))
+
+
+@rastreado("cmd:rclone", lambda r: {"rc": r[0]})
+def _rclone_copyto_with_progress(src_path: str, dst_path: str):
+    # stats numa linha a cada 10s: --progress redesenhava a tela e enchia o buffer
+    with _banda.ativo("upload"):
+        cmd = [*RCLONE_CMD, "copyto", src_path, dst_path, "--stats", "10s", "--stats-one-line", *_banda.args_rclone()]
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace")
+        vigia = Vigia([p], "rclone copyto")
+        linhas = []
+        for linha in p.stdout:
+            vigia.linha(parse_progresso(linha))
+            linhas.append(linha)
+        rc = p.wait()
+    return rc, "".join(linhas) + vigia.parar()
+
+
+def _drenar(stream, cauda: deque):
+    for linha in iter(stream.readline, b""):
+        cauda.append(linha.decode("utf-8", "replace"))
+
+
+@rastreado("corte_stream", lambda r: {"bytes": r["size"]})
+def cortar_em_stream(video_path: str, corte: dict, saida_path: str, dst_path: str, copia_local: bool = STREAMING_COPIA_LOCAL) -> dict:
+    """
+    Corte -c copy em MP4 fragmentado no stdout do ffmpeg; cada bloco vai para o stdin
+    do `rclone rcat` (e para saida_path, com copia_local) e entra no md5. No fim
+    confere tamanho/md5 no Drive. Retorna {"size", "md5", "local"}.
+    """
+    fname = os.path.basename(saida_path)
+    ini, fim = seconds_to_hhmmss(_ini_em_segundos(corte)), seconds_to_hhmmss(_fim_em_segundos(corte))
+    cmd_ff = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error", "-ss", ini, "-to", fim, "-i", video_path,
+              "-c", "copy", "-movflags", "+frag_keyframe+empty_moov+default_base_moof", "-f", "mp4", "pipe:1"]
+    part = saida_path + ".part" if copia_local else None
+    if part:
+        os.makedirs(os.path.dirname(saida_path), exist_ok=True)
+    h = hashlib.md5()
+    total = 0
+    erros = deque(maxlen=50)
+    t0 = time.time()
+    with _SEM_LOCAL, _banda.ativo("upload"):
+        cmd_rc = [*RCLONE_CMD, "rcat", dst_path, *_banda.args_rclone()]
+        log_step("CMD: " + " ".join(cmd_ff) + " | " + " ".join(cmd_rc))
+        ff = subprocess.Popen(cmd_ff, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        rc_p = subprocess.Popen(cmd_rc, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        vigia = Vigia([ff, rc_p], "ffmpeg | rclone rcat", _fim_em_segundos(corte) - _ini_em_segundos(corte))
+        drenos = [threading.Thread(target=_drenar, args=(ff.stderr, erros), daemon=True),
+                  threading.Thread(target=_drenar, args=(rc_p.stdout, erros), daemon=True)]
+        for t in drenos:
+            t.start()
+        local = open(part, "wb") if part else None
+        try:
+            for buf in iter(lambda: ff.stdout.read(STREAMING_LEITURA_BYTES), b""):
+                h.update(buf)
+                total += len(buf)
+                rc_p.stdin.write(buf)
+                vigia.linha()
+                if local:
+                    local.write(buf)
+        except OSError:
+            ff.kill()   # rclone caiu (pipe quebrado): não adianta continuar o corte
+        finally:
+            if local:
+                local.close()
+            try:
+                rc_p.stdin.close()
+            except OSError:
+                pass
+            rc_ff, rc_rc = ff.wait(), rc_p.wait()
+            for t in drenos:
+                t.join()
+            motivo = vigia.parar()
+            if motivo:
+                erros.append(motivo)
+    gasto = time.time() - t0
+    _historico.registrar_transferencia("rclone", total, gasto, rc_ff == 0 and rc_rc == 0)
+    met = _metricas_atual.get()
+    if met and total:
+        met.adicionar({"ferramenta": "rclone", "bytes": total, "segundos": gasto})
+
+    envio = {"size": total, "md5": h.hexdigest(), "local": None}
+    try:
+        if rc_ff != 0 or rc_rc != 0 or not total:
+            raise RuntimeError(f"ffmpeg rc={rc_ff} rclone rc={rc_rc} bytes={total}\n" + "".join(erros))
+        pasta_remota, _, nome_remoto = dst_path.rpartition("/")
+        if not _confere_remoto(envio, _rclone_listar_remoto(pasta_remota).get(nome_remoto)):
+            raise RuntimeError(f"{fname}: tamanho/md5 no Drive não conferem com o que foi enviado")
+    except Exception:
+        if part and os.path.exists(part):
+            os.remove(part)
+        raise
+    if part:
+        os.replace(part, saida_path)
+        envio["local"] = saida_path
+    log_step(f"Streaming: {fname} {total / 1024**2:.1f} MB cortado e enviado em {fmt_td(gasto)}"
+             f"{'' if part else ' (sem cópia local)'}")
+    return envio
+
+
+def _md5_arquivo(path: str) -> str:
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _carregar_manifest(pasta_local_final: str) -> dict:
+    path = os.path.join(pasta_local_final, UPLOAD_MANIFEST_NOME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _salvar_manifest(pasta_local_final: str, manifest: dict):
+    path = os.path.join(pasta_local_final, UPLOAD_MANIFEST_NOME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _info_local(fpath: str, manifest: dict) -> dict:
+    # md5 só é recalculado quando tamanho/mtime mudaram desde o último manifest
+    st = os.stat(fpath)
+    ent = manifest.get(os.path.basename(fpath)) or {}
+    if ent.get("size") == st.st_size and ent.get("mtime") == int(st.st_mtime) and ent.get("md5"):
+        return {"size": st.st_size, "mtime": int(st.st_mtime), "md5": ent["md5"]}
+    return {"size": st.st_size, "mtime": int(st.st_mtime), "md5": _md5_arquivo(fpath)}
+
+
+@rastreado("rclone_lsjson", lambda r: {"arquivos": len(r)})
+def _rclone_listar_remoto(pasta_drive_final: str) -> dict:
+    cmd = [*RCLONE_CMD, "lsjson", pasta_drive_final, "--files-only", "--hash", "--hash-type", "md5"]
+    try:
+        p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="replace",
+                           timeout=WATCHDOG_SEM_PROGRESSO_S if WATCHDOG_ATIVO else None)
+    except subprocess.TimeoutExpired:
+        log_step(f"rclone lsjson sem resposta em {WATCHDOG_SEM_PROGRESSO_S}s: {pasta_drive_final} tratado como vazio.")
+        return {}
+    if p.returncode != 0:
+        # pasta ainda não existe no Drive (primeira execução) ou erro de listagem: trata como vazio
+        return {}
+    try:
+        itens = json.loads(p.stdout or "[]")
+    except ValueError:
+        return {}
+    return {it["Name"]: {"size": it.get("Size"), "md5": (it.get("Hashes") or {}).get("md5", "")} for it in itens}
+
+
+def _confere_remoto(local: dict, remoto: dict | None) -> bool:
+    if not remoto or remoto.get("size") != local["size"]:
+        return False
+    return not remoto.get("md5") or remoto["md5"].lower() == local["md5"]
+
+
+@rastreado("upload_lote", lambda r: {st: sum(1 for v in r.values() if v == st) for st in set(r.values())})
+def upload_drive_em_lote(pasta_local_final: str, pasta_drive_final: str) -> dict:
+    """
+    Sobe a pasta inteira numa sessão rclone (UPLOAD_TRANSFERS em paralelo).
+    Pula o que já está no Drive com mesmo tamanho/md5 e registra tudo em
+    UPLOAD_MANIFEST_NOME. Falhas são re-tentadas arquivo a arquivo.
+    Retorna {nome_arquivo: status}.
+    """
+    files = listar_mp4(pasta_local_final)
+    total = len(files)
+
+    log_step(f"Upload (lote): iniciando. Total={total}")
+    if total == 0:
+        log_step("Upload: nenhum .mp4 encontrado para enviar.")
+        return {}
+
+    manifest = _carregar_manifest(pasta_local_final)
+    locais = {os.path.basename(f): _info_local(f, manifest) for f in files}
+    remoto = _rclone_listar_remoto(pasta_drive_final)
+
+    status = {}
+    pendentes = []
+    for fname, info in locais.items():
+        dst = f"{pasta_drive_final}/{fname}"
+        if _confere_remoto(info, remoto.get(fname)):
+            status[fname] = "JA_ENVIADO"
+        elif acervo_copiar_no_drive(info, dst):
+            status[fname] = "OK"
+        else:
+            pendentes.append(fname)
+            continue
+        manifest[fname] = {**info, "remote": dst, "verified": True}
+    _salvar_manifest(pasta_local_final, manifest)
+    log_step(f"Upload (lote): {total - len(pendentes)} já no Drive, {len(pendentes)} pendente(s).")
+
+    if pendentes:
+        lista_path = os.path.join(pasta_local_final, ".upload_pendentes.txt")
+        with open(lista_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(pendentes) + "\n")
+        # --retries 1: quem falhar é re-tentado isolado abaixo, sem reiniciar o lote
+        with _banda.ativo("upload"):
+            cmd = [*RCLONE_CMD, "copy", pasta_local_final, pasta_drive_final,
+                   "--files-from", lista_path,
+                   "--transfers", str(UPLOAD_TRANSFERS), "--checkers", str(UPLOAD_TRANSFERS),
+                   "--retries", "1", "--stats", "10s", "--stats-one-line", *_banda.args_rclone()]
+            run_cmd_live(cmd, check=False)
+        try:
+            os.remove(lista_path)
+        except OSError:
+            pass
+
+        remoto = _rclone_listar_remoto(pasta_drive_final)
+        for fname in pendentes:
+            info = locais[fname]
+            dst = f"{pasta_drive_final}/{fname}"
+            ok = _confere_remoto(info, remoto.get(fname))
+            if not ok:
+                ok = _upload_um_arquivo(os.path.join(pasta_local_final, fname), dst)
+            status[fname] = "OK" if ok else "FALHOU"
+            if ok:
+                manifest[fname] = {**info, "remote": dst, "verified": True}
+        _salvar_manifest(pasta_local_final, manifest)
+
+    for fname, st in status.items():
+        if st != "FALHOU":
+            acervo_registrar_remoto(locais[fname]["md5"], f"{pasta_drive_final}/{fname}")
+    return status
+
+
+@rastreado("upload_arquivo", lambda r: {"ok": r})
+def _upload_um_arquivo(fpath: str, dst: str) -> bool:
+    fname = os.path.basename(fpath)
+    anotar(arquivo=fname, bytes=_tamanho(fpath))
+
+    def tentar():
+        t0 = time.time()
+        rc, out = _rclone_copyto_with_progress(fpath, dst)
+        _historico.registrar_transferencia("rclone", _tamanho(fpath) or 0, time.time() - t0, rc == 0)
+        return rc == 0, out
+
+    ok, out, classe = com_retentativas("rclone", tentar, f"Upload {fname}")
+    if not ok:
+        log_step(f"Upload falhou ({classe}): {fname}")
+        if out:
+            print(out[-3000:], flush=True)
+    return ok
+
+
+class UploaderEmFundo:
+    """
+    Consumidor da fila de cortes prontos: sobe cada arquivo assim que o corte
+    termina, enquanto os próximos cortes ainda estão sendo produzidos.
+    A fila é limitada (UPLOAD_FILA_MAX): se o Drive ficar para trás, quem
+    enfileira espera.
+    """
+
+    def __init__(self, pasta_local_final: str, pasta_drive_final: str, workers: int = UPLOAD_TRANSFERS, ao_terminar=None):
+        self.pasta_local_final = pasta_local_final
+        self.ao_terminar = ao_terminar
+        self.pasta_drive_final = pasta_drive_final
+        self.fila = queue.Queue(maxsize=max(1, UPLOAD_FILA_MAX))
+        self.status = {}
+        self._lock = threading.Lock()
+        self._manifest = _carregar_manifest(pasta_local_final)
+        self._remoto = _rclone_listar_remoto(pasta_drive_final)
+        self._threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(self._worker,), name=f"upload-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def enfileirar(self, fpath: str):
+        self.fila.put(fpath)
+
+    def _worker(self):
+        while True:
+            fpath = self.fila.get()
+            try:
+                if fpath is None:
+                    return
+                self._subir(fpath)
+            except Exception as e:
+                log_step(f"Upload (fundo) erro em {os.path.basename(fpath)}: {e}")
+                with self._lock:
+                    self.status[os.path.basename(fpath)] = "FALHOU"
+            finally:
+                self.fila.task_done()
+
+    def _subir(self, fpath: str):
+        fname = os.path.basename(fpath)
+        dst = f"{self.pasta_drive_final}/{fname}"
+        # o md5 de um corte leva segundos: calculado fora do lock, os workers conferem em paralelo
+        with self._lock:
+            ent = self._manifest.get(fname)
+        info = _info_local(fpath, {fname: ent} if ent else {})
+        if _confere_remoto(info, self._remoto.get(fname)):
+            st = "JA_ENVIADO"
+        elif acervo_copiar_no_drive(info, dst):
+            st = "OK"
+        else:
+            log_step(f"Upload (fundo): {fname}")
+            st = "OK" if _upload_um_arquivo(fpath, dst) else "FALHOU"
+        with self._lock:
+            self.status[fname] = st
+            if st != "FALHOU":
+                self._manifest[fname] = {**info, "remote": dst, "verified": True}
+                _salvar_manifest(self.pasta_local_final, self._manifest)
+        if st != "FALHOU":
+            acervo_registrar_remoto(info["md5"], dst)
+        if self.ao_terminar:
+            self.ao_terminar(fname, st)
+
+    def registrar_enviado(self, fname: str, envio: dict):
+        """Corte que já subiu por fora da fila (streaming): status OK e, com cópia local, entrada no manifest."""
+        with self._lock:
+            self.status[fname] = "OK"
+            if envio.get("local"):
+                mtime = int(os.stat(envio["local"]).st_mtime)
+                self._manifest[fname] = {"size": envio["size"], "mtime": mtime, "md5": envio["md5"],
+                                         "remote": f"{self.pasta_drive_final}/{fname}", "verified": True}
+                _salvar_manifest(self.pasta_local_final, self._manifest)
+        acervo_registrar_remoto(envio["md5"], f"{self.pasta_drive_final}/{fname}")
+        if self.ao_terminar:
+            self.ao_terminar(fname, "OK")
+
+    def finalizar(self) -> dict:
+        for _ in self._threads:
+            self.fila.put(None)
+        for t in self._threads:
+            t.join()
+        return dict(self.status)
+
+
+@rastreado("upload_arquivo_a_arquivo")
+def upload_drive_arquivo_a_arquivo(pasta_local_final: str, pasta_drive_final: str):
+    files = listar_mp4(pasta_local_final)
+    total = len(files)
+
+    log_step(f"Upload: iniciando. Total={total}")
+    if total == 0:
+        log_step("Upload: nenhum .mp4 encontrado para enviar.")
+        return
+
+    failed = []
+    for i, fpath in enumerate(files, 1):
+        fname = os.path.basename(fpath)
+        dst = f"{pasta_drive_final}/{fname}"
+        log_step(f"Upload {i}/{total}: {fname}")
+
+        def tentar():
+            rc, out = _rclone_copyto_with_progress(fpath, dst)
+            if out:
+                print(out, flush=True)
+            return rc == 0, out
+
+        ok, out, _ = com_retentativas("rclone", tentar, f"Upload {fname}")
+        if not ok:
+            failed.append((fname, out[-3000:] if out else ""))
+
+    if failed:
+        for name, tail in failed:
+            log_step(f"Falhou upload: {name}")
+            if tail:
+                print(tail, flush=True)
+        raise RuntimeError(f"Upload falhou para {len(failed)}/{total} arquivo(s).")
+
+
+# =========================
+# Acervo de cortes
+# =========================
+_acervo = IndiceCache(ACERVO_DIR, ACERVO_MAX_BYTES)
+
+
+def chave_acervo(url_youtube: str, corte: dict) -> str:
+    """
+    Endereço do corte no acervo: vídeo + janela do relatório (antes do ajuste de bordas)
+    + o que muda os bytes do arquivo. Título, Foco e posição no relatório ficam de fora.
+    """
+    base = getattr(corte, "origem", None) or corte
+    params = {
+        "janela": [_ini_em_segundos(base), _fim_em_segundos(base)],
+        "kind": base.get("kind"),
+        "alvo": base.get("alvo"),
+        "smart": [SMART_X264_PRESET, SMART_X264_CRF] if _usa_smart_cut(base) else None,
+        "ajuste": [AJUSTE_RAIO_S, AJUSTE_ALVO_TOLERANCIA_S, AJUSTE_PESO_DESLOCAMENTO] if AJUSTE_BORDAS else None,
+        "formato": YTDLP_FORMAT_FULL,
+    }
+    return f"{cache_key_for_url(url_youtube)}_{sha1_12(json.dumps(params, sort_keys=True))}"
+
+
+def _ligar_ou_copiar(src: str, dst: str):
+    # hardlink quando dá (mesmo disco): o corte existe uma vez só no disco
+    tmp = dst + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def acervo_obter(chave: str) -> dict | None:
+    """Entrada do acervo; None se o arquivo sumiu ou foi regravado no lugar (mtime mudou)."""
+    if not ACERVO_ATIVO:
+        return None
+    ent = _acervo.obter(chave)
+    if ent and int(os.path.getmtime(ent["path"])) != ent.get("mtime"):
+        _acervo.remover(chave)
+        return None
+    if ent:
+        _acervo.tocar(chave)
+    return ent
+
+
+def acervo_guardar(chave: str, saida_path: str, corte: dict):
+    """Guarda o corte recém-feito com a janela efetiva (bordas ajustadas). Falha aqui não derruba o corte."""
+    if not ACERVO_ATIVO:
+        return
+    arquivo = f"{chave}.mp4"
+    destino = os.path.join(_acervo.diretorio, arquivo)
+    try:
+        os.makedirs(_acervo.diretorio, exist_ok=True)
+        _ligar_ou_copiar(saida_path, destino)
+        _acervo.registrar(chave, arquivo, md5=_md5_arquivo(destino), mtime=int(os.path.getmtime(destino)),
+                          ini_s=_ini_em_segundos(corte), fim_s=_fim_em_segundos(corte), remotos=[])
+    except OSError as e:
+        log_step(f"Acervo: não consegui guardar {os.path.basename(saida_path)} ({e}).")
+
+
+def acervo_materializar(ent: dict, saida_path: str) -> bool:
+    """Corte do acervo na pasta de saída (hardlink ou cópia)."""
+    try:
+        os.makedirs(os.path.dirname(saida_path), exist_ok=True)
+        _ligar_ou_copiar(ent["path"], saida_path)
+        return True
+    except OSError as e:
+        log_step(f"Acervo: não consegui trazer {ent['arquivo']} ({e}); o corte será refeito.")
+        return False
+
+
+def acervo_remoto(info: dict, dst: str) -> str | None:
+    """Onde um corte de mesmo conteúdo (tamanho/md5) já está no Drive, para copiar lá mesmo."""
+    if not ACERVO_ATIVO:
+        return None
+    for ent in _acervo.entradas().values():
+        if ent.get("md5") == info["md5"] and ent.get("bytes") == info["size"]:
+            for remoto in reversed(ent.get("remotos") or []):
+                if remoto != dst:
+                    return remoto
+    return None
+
+
+def acervo_registrar_remoto(md5: str, dst: str):
+    if not ACERVO_ATIVO:
+        return
+    for key, ent in _acervo.entradas().items():
+        if ent.get("md5") == md5 and dst not in (ent.get("remotos") or []):
+            _acervo.atualizar(key, remotos=[*(ent.get("remotos") or [])[-2:], dst])
+
+
+def acervo_copiar_no_drive(info: dict, dst: str) -> bool:
+    """
+    Mesmo conteúdo já no Drive: rclone copyto Drive -> Drive (cópia no servidor, sem
+    subir os bytes) e confere tamanho/md5 no destino. False: segue o upload normal.
+    """
+    origem = acervo_remoto(info, dst)
+    return bool(origem) and _copiar_no_drive(origem, dst, info)
+
+
+@rastreado("copia_drive", lambda r: {"ok": r})
+def _copiar_no_drive(origem: str, dst: str, info: dict) -> bool:
+    rc, _ = run_cmd_live([*RCLONE_CMD, "copyto", origem, dst], check=False, eco=False)
+    pasta, _, nome = dst.rpartition("/")
+    ok = rc == 0 and _confere_remoto(info, _rclone_listar_remoto(pasta).get(nome))
+    log_step(f"Acervo: {nome} {'copiado no Drive de' if ok else 'falhou a cópia no Drive de'} {origem}"
+             f"{'' if ok else '; segue upload normal'}.")
+    return ok
+
+
+# =========================
+# Diário do job (retomada)
+# =========================
+ESTADOS_CORTE = ("planned", "cut", "verified", "uploaded")
+
+# só o necessário do info do vídeo para retomar sem nova extração (o info completo pode ter vencido)
+VIDEO_INFO_CAMPOS = ("title", "upload_date", "duration", "filesize", "filesize_approx", "tbr")
+
+
+def _resumo_video_info(video_info: dict) -> dict:
+    resumo = {k: video_info.get(k) for k in VIDEO_INFO_CAMPOS if video_info.get(k) is not None}
+    if video_info.get("requested_formats"):
+        resumo["requested_formats"] = [{"tbr": f.get("tbr")} for f in video_info["requested_formats"]]
+    return resumo
+
+
+class DiarioJob:
+    """
+    Estado persistido de um job (relatório + vídeo) em JOBS_DIR/<chave>.json:
+    info do vídeo, nome do historico_*.md e, por corte, planned/cut/verified/uploaded
+    com arquivo, tamanho e md5. Uma nova execução do mesmo evento retoma dali.
+    """
+
+    def __init__(self, url_youtube: str, relatorio: str):
+        self.chave = f"{sha1_12(relatorio)}_{cache_key_for_url(url_youtube)}"
+        self.path = os.path.join(JOBS_DIR, f"{self.chave}.json")
+        self._lock = threading.Lock()
+        self.dados = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.dados = json.load(f)
+        except (OSError, ValueError):
+            pass
+        self.retomado = self.dados is not None
+        if not self.dados:
+            self.dados = {"url": url_youtube, "rel_sha1_12": sha1_12(relatorio), "cortes": {}}
+
+    def _gravar(self):
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.dados, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def definir(self, **campos):
+        with self._lock:
+            self.dados.update(campos)
+            self._gravar()
+
+    def marcar(self, idx: int, estado: str, **campos):
+        with self._lock:
+            ent = self.dados["cortes"].setdefault(str(idx), {})
+            ent.update(campos)
+            ent["estado"] = estado
+            ent["ts"] = datetime.now().isoformat(timespec="seconds")
+            self._gravar()
+
+    def estado(self, idx: int) -> str:
+        return (self.dados["cortes"].get(str(idx)) or {}).get("estado", "")
+
+    def corte_pronto(self, idx: int, saida_path: str) -> bool:
+        """verified/uploaded e o arquivo local ainda está lá com o mesmo tamanho."""
+        ent = self.dados["cortes"].get(str(idx)) or {}
+        if ent.get("estado") not in ("verified", "uploaded"):
+            return False
+        if ent.get("sem_local"):
+            return ent["estado"] == "uploaded"   # streaming sem cópia local: só existe no Drive
+        return os.path.exists(saida_path) and os.path.getsize(saida_path) == ent.get("bytes")
+
+    def idx_por_arquivo(self, fname: str) -> int | None:
+        for k, ent in self.dados["cortes"].items():
+            if ent.get("arquivo") == fname:
+                return int(k)
+        return None
+
+
+def _registrar_upload_no_diario(diario: "DiarioJob", fname: str, status: str):
+    if diario and status in ("OK", "JA_ENVIADO"):
+        idx = diario.idx_por_arquivo(fname)
+        if idx is not None and diario.estado(idx) != "uploaded":
+            diario.marcar(idx, "uploaded")
+
+
+# =========================
+# Histórico (SQLite)
+# =========================
+_STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY, runner TEXT, inicio REAL, fim REAL, url TEXT, tipocorte TEXT,
+    cortes INTEGER, status TEXT, erro TEXT, log_name TEXT);
+CREATE TABLE IF NOT EXISTS cortes (
+    job_id INTEGER, idx INTEGER, kind TEXT, fonte TEXT, modo TEXT, status TEXT, segundos REAL,
+    download_mb_s REAL, ffmpeg_speed REAL, erro TEXT, quando REAL);
+CREATE TABLE IF NOT EXISTS transferencias (
+    job_id INTEGER, runner TEXT, ferramenta TEXT, sentido TEXT, bytes INTEGER, segundos REAL,
+    paralelos INTEGER, ok INTEGER, quando REAL);
+CREATE INDEX IF NOT EXISTS ix_transferencias ON transferencias (runner, sentido, quando);
+CREATE INDEX IF NOT EXISTS ix_cortes ON cortes (job_id);
+"""
+
+# job em andamento nesta thread/contexto ({"id": ...}); as threads copiam o contexto
+_job_atual = contextvars.ContextVar("job_atual", default=None)
+
+
+def _percentil(valores: list, p: float) -> float | None:
+    if not valores:
+        return None
+    v = sorted(valores)
+    k = (len(v) - 1) * p / 100
+    i = int(k)
+    return v[i] + (v[min(i + 1, len(v) - 1)] - v[i]) * (k - i)
+
+
+class HistoricoStats:
+    """
+    Histórico de execuções em STATS_DB_PATH (SQLite, WAL): um registro por job,
+    por corte e por transferência (yt-dlp / HTTP direto / rclone) com tempos e
+    bytes. Falha aqui só vira log: o histórico nunca derruba um job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._criados = set()
+
+    def _conectar(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(STATS_DB_PATH) or ".", exist_ok=True)
+        con = sqlite3.connect(STATS_DB_PATH, timeout=30)
+        if STATS_DB_PATH not in self._criados:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_STATS_SCHEMA)
+            self._criados.add(STATS_DB_PATH)
+        return con
+
+    def _gravar(self, sql: str, params: tuple) -> int | None:
+        if not STATS_ATIVO:
+            return None
+        try:
+            with self._lock:
+                con = self._conectar()
+                try:
+                    with con:
+                        return con.execute(sql, params).lastrowid
+                finally:
+                    con.close()
+        except sqlite3.Error as e:
+            log_step(f"Histórico: falha ao gravar ({e})")
+            return None
+
+    def consultar(self, sql: str, params: tuple = ()) -> list:
+        if not os.path.exists(STATS_DB_PATH):
+            return []
+        with self._lock:
+            con = self._conectar()
+            try:
+                return con.execute(sql, params).fetchall()
+            finally:
+                con.close()
+
+    def iniciar_job(self, url_youtube: str, tipocorte: str, cortes: int, log_name: str) -> int | None:
+        return self._gravar("INSERT INTO jobs (runner, inicio, url, tipocorte, cortes, log_name) VALUES (?, ?, ?, ?, ?, ?)",
+                            (RUNNER_NOME, time.time(), url_youtube, tipocorte, cortes, log_name))
+
+    def finalizar_job(self, job_id: int, status: str, erro: str | None):
+        self._gravar("UPDATE jobs SET fim = ?, status = ?, erro = ? WHERE id = ?", (time.time(), status, erro, job_id))
+
+    def registrar_corte(self, r: dict):
+        job = _job_atual.get() or {}
+        met = r.get("metricas") or {}
+        self._gravar("INSERT INTO cortes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (job.get("id"), r["idx"], r.get("kind"), r.get("fonte"), r["modo"], r["status"], r["elapsed"],
+                      met.get("download_mb_s"), met.get("ffmpeg_speed"),
+                      r["debug_tail"][-500:] if r["status"] != "OK" else None, time.time()))
+
+    def registrar_transferencia(self, ferramenta: str, nbytes: float, segundos: float, ok: bool):
+        job = _job_atual.get() or {}
+        sentido = "upload" if ferramenta == "rclone" else "download"
+        # downloads simultâneos neste processo (inclui este): a vazão agregada depende disso
+        paralelos = max(1, _SEM_REDE.em_uso) if sentido == "download" else 1
+        self._gravar("INSERT INTO transferencias VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (job.get("id"), RUNNER_NOME, ferramenta, sentido, int(nbytes), segundos, paralelos, int(ok), time.time()))
+
+    def estimativas(self) -> dict:
+        """
+        Medições recentes deste runner: download_bps / upload_bps (mediana),
+        rede_paralelos (menor concorrência com ~a melhor vazão agregada) e
+        falha_secoes (fração dos cortes por seção que acabaram no vídeo inteiro).
+        Só entra o que tem STATS_MIN_AMOSTRAS.
+        """
+        if not STATS_ATIVO:
+            return {}
+        desde = time.time() - STATS_JANELA_DIAS * 86400
+        try:
+            transf = self.consultar("SELECT sentido, bytes, segundos, paralelos FROM transferencias "
+                                    "WHERE runner = ? AND quando >= ? AND ok = 1 AND bytes > 0 AND segundos > 0",
+                                    (RUNNER_NOME, desde))
+            secoes = self.consultar("SELECT c.modo FROM cortes c JOIN jobs j ON j.id = c.job_id "
+                                    "WHERE j.runner = ? AND c.quando >= ? AND c.status = 'OK' AND c.fonte IN ('trecho', 'faixa')",
+                                    (RUNNER_NOME, desde))
+        except sqlite3.Error as e:
+            log_step(f"Histórico: falha ao consultar ({e})")
+            return {}
+
+        est = {}
+        por_sentido = {}
+        for sentido, nbytes, segundos, paralelos in transf:
+            por_sentido.setdefault(sentido, []).append((nbytes / segundos, paralelos or 1))
+        for sentido, amostras in por_sentido.items():
+            if len(amostras) >= STATS_MIN_AMOSTRAS:
+                est[f"{sentido}_bps"] = _percentil([v for v, _ in amostras], 50)
+
+        niveis = {}
+        for vel, paralelos in por_sentido.get("download", []):
+            niveis.setdefault(paralelos, []).append(vel * paralelos)
+        agregada = {n: _percentil(v, 50) for n, v in niveis.items() if len(v) >= STATS_MIN_AMOSTRAS}
+        if len(agregada) > 1:
+            melhor = max(agregada.values())
+            est["rede_paralelos"] = min(n for n, v in agregada.items() if v >= melhor * 0.9)
+
+        if len(secoes) >= STATS_MIN_AMOSTRAS:
+            est["falha_secoes"] = sum(1 for (modo,) in secoes if modo == "A_LOCAL") / len(secoes)
+        return est
+
+
+_historico = HistoricoStats()
+
+
+def _aplicar_estimativas(est: dict):
+    # rede saturada: mais yt-dlp simultâneos não aumentam a vazão total, só dividem
+    teto = min(MAX_PROCESSOS_REDE, est.get("rede_paralelos") or MAX_PROCESSOS_REDE)
+    if teto != _SEM_REDE.maximo:
+        _SEM_REDE.maximo = teto
+        _SEM_REDE.ajustar(_SEM_REDE.limite)
+        log_step(f"Histórico: downloads simultâneos até {teto} (vazão agregada medida não cresce além disso).")
+
+
+def _fmt_mb_s(bps) -> str:
+    return f"{bps / 1024**2:.1f}" if bps is not None else "-"
+
+
+def imprimir_stats(dias: int = STATS_JANELA_DIAS, runner: str | None = None):
+    """Resumo do histórico: jobs, cortes por modo, vazão por ferramenta e por dia, upload x tamanho."""
+    if not os.path.exists(STATS_DB_PATH):
+        print(f"Sem histórico em {STATS_DB_PATH}")
+        return
+    desde = time.time() - dias * 86400
+    filtro, params = ("AND runner = ?", (desde, runner)) if runner else ("", (desde,))
+    print(f"Histórico: {STATS_DB_PATH} (últimos {dias} dias{f', runner {runner}' if runner else ''})\n")
+
+    jobs = _historico.consultar(f"SELECT status, fim - inicio FROM jobs WHERE inicio >= ? {filtro}", params)
+    dur = [d for st, d in jobs if d is not None]
+    ok = sum(1 for st, _ in jobs if st == "OK")
+    print(f"Jobs: {len(jobs)} ({ok} OK, {len(jobs) - ok} com erro/interrompidos)"
+          + (f"; duração p50 {fmt_td(_percentil(dur, 50))} p90 {fmt_td(_percentil(dur, 90))}" if dur else ""))
+
+    cortes = _historico.consultar(f"SELECT c.fonte, c.modo, c.status, c.segundos FROM cortes c JOIN jobs j ON j.id = c.job_id "
+                                  f"WHERE c.quando >= ? {filtro.replace('runner', 'j.runner')}", params)
+    print("\nCortes por modo          n    OK%    p50 s    p90 s")
+    por_modo = {}
+    for _fonte, modo, status, seg in cortes:
+        por_modo.setdefault(modo, []).append((status, seg))
+    for modo, linhas in sorted(por_modo.items(), key=lambda kv: -len(kv[1])):
+        segs = [sg for _, sg in linhas]
+        pct_ok = 100 * sum(1 for st, _ in linhas if st == "OK") / len(linhas)
+        print(f"  {modo:<20} {len(linhas):>4} {pct_ok:>6.0f} {_percentil(segs, 50):>8.1f} {_percentil(segs, 90):>8.1f}")
+    secoes = [(modo, st) for fonte, modo, st, _ in cortes if fonte in ("trecho", "faixa")]
+    if secoes:
+        diretas = sum(1 for modo, st in secoes if st == "OK" and modo in ("B_TRECHO", "B_FAIXA"))
+        print(f"  seções (trecho/faixa): {diretas}/{len(secoes)} sem cair no vídeo inteiro")
+
+    transf = _historico.consultar(f"SELECT ferramenta, sentido, bytes, segundos, quando FROM transferencias "
+                                  f"WHERE quando >= ? AND ok = 1 AND bytes > 0 AND segundos > 0 {filtro}", params)
+    print("\nVazão (MB/s)             n      p10      p50      p90")
+    por_ferramenta = {}
+    for ferramenta, _sentido, nbytes, segundos, _q in transf:
+        por_ferramenta.setdefault(ferramenta, []).append(nbytes / segundos)
+    for ferramenta, v in sorted(por_ferramenta.items()):
+        print(f"  {ferramenta:<20} {len(v):>4} {_fmt_mb_s(_percentil(v, 10)):>8} {_fmt_mb_s(_percentil(v, 50)):>8} {_fmt_mb_s(_percentil(v, 90)):>8}")
+
+    print("\nTendência (mediana MB/s por dia)   download   upload")
+    por_dia = {}
+    for _f, sentido, nbytes, segundos, quando in transf:
+        dia = datetime.fromtimestamp(quando).strftime("%Y-%m-%d")
+        por_dia.setdefault(dia, {}).setdefault(sentido, []).append(nbytes / segundos)
+    for dia in sorted(por_dia):
+        d = por_dia[dia]
+        print(f"  {dia:<32} {_fmt_mb_s(_percentil(d.get('download', []), 50)):>8} {_fmt_mb_s(_percentil(d.get('upload', []), 50)):>8}")
+
+    print("\nUpload x tamanho          n    p50 s    p90 s   p50 MB/s")
+    faixas = ((0, 50), (50, 200), (200, 1000), (1000, None))
+    for a, z in faixas:
+        linhas = [(nb, sg) for f, sentido, nb, sg, _ in transf
+                  if sentido == "upload" and nb >= a * 1024**2 and (z is None or nb < z * 1024**2)]
+        if not linhas:
+            continue
+        nome = f"{a}-{z} MB" if z else f">{a} MB"
+        segs = [sg for _, sg in linhas]
+        print(f"  {nome:<20} {len(linhas):>4} {_percentil(segs, 50):>8.1f} {_percentil(segs, 90):>8.1f} "
+              f"{_fmt_mb_s(_percentil([nb / sg for nb, sg in linhas], 50)):>10}")
+
+    if not runner or runner == RUNNER_NOME:
+        est = _historico.estimativas()
+        print(f"\nEstimativas para o próximo job ({RUNNER_NOME}): "
+              + (", ".join(f"{k}={_fmt_mb_s(v) + ' MB/s' if k.endswith('_bps') else round(v, 2)}" for k, v in est.items())
+                 or "amostras insuficientes (valem os padrões)"))
+
+
+# =========================
+# Pipeline
+# =========================
+def _build_output_name(tipocorte: str, corte: dict, idx: int) -> str:
+    desc = corte.get("desc") or f"corte_{idx}"
+    # nome estável entre execuções: sempre o ini do relatório, mesmo com borda ajustada
+    ini = (getattr(corte, "origem", None) or corte)["ini"].replace(":", "-")
+
+    if tipocorte == "LOUVOR":
+        if corte["kind"] == "INTEGRAL":
+            base = f"LOUVOR_{idx:03d}_INTEGRAL__{desc}"
+        elif corte["kind"] == "OURO":
+            alvo = corte.get("alvo")
+            base = f"LOUVOR_{idx:03d}_OURO_{alvo:02d}__{desc}"
+        else:
+            base = f"LOUVOR_{idx:03d}__{desc}"
+    else:
+        base = f"{tipocorte}_{idx:03d}__{desc}"
+
+    base = re.sub(r"[^\w\s-]", "", base).replace(" ", "_")
+    base = re.sub(r"_+", "_", base).strip("_")[:120]
+    return f"{base}__{ini}"
+
+
+@rastreado("corte")
+def _executar_corte(idx: int, corte: dict, ctx: dict) -> dict:
+    total = ctx["total"]
+    tipocorte = ctx["tipocorte"]
+
+    nome_final = _build_output_name(tipocorte, corte, idx)
+    cut_start = datetime.now()
+    diario = ctx.get("diario")
+    anotar(idx=idx, kind=corte.get("kind"))
+
+    ent = ctx.get("do_acervo", {}).get(idx)
+    if ent:
+        titulo = corte.get("desc") or f"corte_{idx}"
+        saida_path = os.path.join(ctx["pasta_local_final"], f"{nome_final}.mp4")
+        _verificar_corte(diario, idx, saida_path, "A_ACERVO")
+        if ctx.get("uploader"):
+            ctx["uploader"].enfileirar(saida_path)
+        # render com a janela efetiva do corte guardado (bordas já ajustadas)
+        efetivo = Corte(ent["ini_s"], ent["fim_s"], ent["fim_s"] - ent["ini_s"], corte.get("desc"),
+                        corte.get("kind"), corte.get("alvo"), getattr(corte, "linha", 0), origem=corte)
+        render = _renderizar_corte(idx, efetivo, saida_path, ctx)
+        log_step(f"Corte {idx}/{total} FIM: OK modo=A_ACERVO ({ent['arquivo']})")
+        anotar(modo="A_ACERVO", status="OK")
+        return {"idx": idx, "titulo": titulo, "modo": "A_ACERVO", "status": "OK",
+                "elapsed": (datetime.now() - cut_start).total_seconds(), "debug_tail": "",
+                "metricas": {}, "metricas_txt": "-", "render": render, "kind": corte.get("kind"), "fonte": "acervo"}
+
+    pre = ctx.get("pre_cortados", {})
+    if idx in pre:
+        titulo = corte.get("desc") or f"corte_{idx}"
+        log_step(f"Corte {idx}/{total} FIM: OK modo=A_LOTE (corte em lote)")
+        saida_path = os.path.join(ctx["pasta_local_final"], f"{nome_final}.mp4")
+        _verificar_corte(diario, idx, saida_path, "A_LOTE")
+        acervo_guardar(chave_acervo(ctx["url_youtube"], corte), saida_path, corte)
+        if ctx.get("uploader"):
+            ctx["uploader"].enfileirar(saida_path)
+        render = _renderizar_corte(idx, corte, saida_path, ctx)
+        # o ffmpeg do lote é um só: todos os cortes do lote mostram as métricas dele
+        met = ctx.get("metricas_lote")
+        anotar(modo="A_LOTE", status="OK")
+        return {"idx": idx, "titulo": titulo, "modo": "A_LOTE", "status": "OK", "elapsed": pre[idx], "debug_tail": "",
+                "metricas": met.resumo() if met else {}, "metricas_txt": met.texto() if met else "-", "render": render,
+                "kind": corte.get("kind"), "fonte": "lote"}
+
+    titulo = corte.get("desc") or f"corte_{idx}"
+    ini = corte["ini"]
+    fim = corte.get("fim")
+    dur = corte["dur_mmss"]
+    janela = f"{ini} -> {fim}" if fim else f"{ini}+{dur}"
+
+    log_step(f"Corte {idx}/{total} INICIO: {titulo} [{janela}]")
+
+    modo = "-"
+    status = "ERRO"
+    debug_tail = ""
+
+    saida_path = os.path.join(ctx["pasta_local_final"], f"{nome_final}.mp4")
+    with coletar_metricas() as met:
+        try:
+            envio = _corte_em_stream(idx, corte, saida_path, ctx) if _pode_streamar(idx, corte, ctx) else None
+            if envio:
+                modo = "A_STREAM"
+                _verificar_stream(diario, idx, saida_path, envio)
+                if envio["local"]:
+                    acervo_guardar(chave_acervo(ctx["url_youtube"], corte), saida_path, corte)
+                ctx["uploader"].registrar_enviado(os.path.basename(saida_path), envio)
+            else:
+                modo, out_trecho, saida_path, _section = realizar_corte(
+                    url_youtube=ctx["url_youtube"],
+                    corte=corte,
+                    nome_saida=nome_final,
+                    destino_local=ctx["pasta_local_final"],
+                    tipocorte=tipocorte,
+                    duracao_video=ctx.get("duracao_video"),
+                    fonte=ctx.get("fontes", {}).get(idx),
+                )
+                _verificar_corte(diario, idx, saida_path, modo)
+                acervo_guardar(chave_acervo(ctx["url_youtube"], corte), saida_path, corte)
+                debug_tail = (out_trecho or "")[-1500:]
+                if ctx.get("uploader"):
+                    ctx["uploader"].enfileirar(saida_path)
+            status = "OK"
+        except Exception as e:
+            debug_tail = str(e)[-1500:]
+            log_step(f"Corte {idx}/{total} FALHOU: {e}")
+
+    elapsed = (datetime.now() - cut_start).total_seconds()
+    log_step(f"Corte {idx}/{total} FIM: {status} modo={modo} tempo={fmt_td(elapsed)} [{met.texto()}]")
+    anotar(modo=modo, status=status, **met.resumo())
+    render = _renderizar_corte(idx, corte, saida_path, ctx) if status == "OK" and os.path.exists(saida_path) else "-"
+
+    return {"idx": idx, "titulo": titulo, "modo": modo, "status": status, "elapsed": elapsed, "debug_tail": debug_tail,
+            "metricas": met.resumo(), "metricas_txt": met.texto(), "render": render,
+            "kind": corte.get("kind"), "fonte": (ctx.get("fontes", {}).get(idx) or {}).get("tipo")}
+
+
+def _corte_progressivo(idx: int, corte: dict, progressiva: FonteProgressiva, ctx: dict) -> dict | None:
+    """Um corte das partes em download (tarefa do pool). None: o download terminou antes de começar."""
+    with progressiva.reservar() as reserva:
+        if reserva is None:
+            return None
+        partes, audio = reserva
+        ajustado = ajustar_bordas(audio, ctx["url_youtube"], [(idx, corte)])[0][1] if audio else corte
+        return _executar_corte(idx, ajustado, {**ctx, "fontes": {idx: {"tipo": "progressivo", "partes": partes}}})
+
+
+def _cortar_durante_download(url_youtube: str, duracao_video, pendentes: list, ctx: dict, pool) -> tuple:
+    """
+    LOUVOR: baixa o vídeo inteiro numa thread e manda cada pendente (em ordem de fim)
+    para o pool de cortes assim que o download cobre o seu fim. Retorna
+    (video_local, feitos {idx: resultado}, restantes): smart cut, cortes que falharam
+    e os que o download não alcançou a tempo seguem o fluxo normal.
+    """
+    progressiva = FonteProgressiva()
+    resultado = {}
+
+    def baixar():
+        try:
+            resultado["video"] = garantir_download_inteiro(url_youtube, duracao_video, progressiva)
+        except BaseException as e:
+            resultado["erro"] = e
+        finally:
+            progressiva.terminar()
+
+    t = threading.Thread(target=contextvars.copy_context().run, args=(baixar,), name="download-progressivo", daemon=True)
+    t.start()
+
+    restantes = []
+    futuros = {}
+    for idx, corte in sorted(pendentes, key=lambda p: _fim_em_segundos(p[1])):
+        if _usa_smart_cut(corte):
+            restantes.append((idx, corte))   # smart cut precisa do índice de keyframes do arquivo inteiro
+            continue
+        ini0, fim0 = _ini_em_segundos(corte), _fim_em_segundos(corte)
+        alcance = max(fim0, _centro_fim(ini0, fim0, corte.get("alvo"))) + CORTE_PROGRESSIVO_MARGEM_S
+        if AJUSTE_BORDAS:
+            alcance += AJUSTE_RAIO_S
+        if not progressiva.esperar(alcance):
+            restantes.append((idx, corte))
+            continue
+        futuros[idx] = (corte, pool.submit(contextvars.copy_context().run, _corte_progressivo, idx, corte, progressiva, ctx))
+
+    t.join()
+    feitos = {}
+    for idx, (corte, fut) in futuros.items():
+        r = fut.result()
+        if r and r["status"] == "OK":
+            feitos[idx] = r
+        else:
+            restantes.append((idx, corte))
+    if "erro" in resultado:
+        raise resultado["erro"]
+    log_step(f"Corte progressivo: {len(feitos)}/{len(pendentes)} corte(s) durante o download; "
+             f"{len(restantes)} seguem o corte normal.")
+    ordem = {idx: n for n, (idx, _) in enumerate(pendentes)}
+    return resultado["video"], feitos, sorted(restantes, key=lambda p: ordem[p[0]])
+
+
+def _renderizar_corte(idx: int, corte: dict, saida_path: str, ctx: dict) -> str:
+    """Render Reels opcional; falha aqui não derruba o corte (já cortado e na fila de upload)."""
+    if not RENDER_REELS:
+        return "-"
+    try:
+        loudnorm = _loudnorm_do_corte(idx, corte, saida_path, ctx) if NORMALIZAR_AUDIO else None
+        renderizar_reels(saida_path, ctx["tipocorte"], _fim_em_segundos(corte) - _ini_em_segundos(corte), loudnorm)
+        return "OK"
+    except Exception as e:
+        log_step(f"Corte {idx}/{ctx['total']} render falhou: {str(e)[-500:]}")
+        return "ERRO"
+
+
+def _loudnorm_do_corte(idx: int, corte: dict, saida_path: str, ctx: dict) -> str | None:
+    """
+    Filtro loudnorm já medido para o corte: janela da série da fonte inteira quando há
+    vídeo local; senão (faixas, corte progressivo) a análise é do próprio corte.
+    None: áudio copiado como está.
+    """
+    if np is None:
+        return None
+    try:
+        if ctx.get("video_local"):
+            serie = serie_loudness(ctx["video_local"], ctx["url_youtube"])
+            ini, fim = _ini_em_segundos(corte), _fim_em_segundos(corte)
+        else:
+            serie = analisar_loudness(saida_path)
+            ini, fim = 0.0, float("inf")
+        medida = serie.medir(ini, fim)
+    except Exception as e:
+        log_step(f"Corte {idx}/{ctx['total']}: análise de loudness falhou ({str(e)[-300:]}); áudio sem normalizar.")
+        return None
+    if not medida:
+        return None
+    log_step(f"Loudness: corte {idx} I={medida['I']:.1f} LUFS LRA={medida['LRA']:.1f} LU TP={medida['TP']:.1f} dBTP "
+             f"-> {NORMALIZAR_ALVO_LUFS:.0f} LUFS")
+    return filtro_loudnorm(medida)
+
+
+def _pode_streamar(idx: int, corte: dict, ctx: dict) -> bool:
+    if not (UPLOAD_STREAMING and ctx.get("uploader") and ctx.get("video_local")) or _usa_smart_cut(corte):
+        return False
+    return ctx["tipocorte"] == "LOUVOR" or (ctx.get("fontes", {}).get(idx) or {}).get("tipo") == "inteiro"
+
+
+def _corte_em_stream(idx: int, corte: dict, saida_path: str, ctx: dict) -> dict | None:
+    """Corte + upload num fluxo só; None (com log) quando é preciso cair para corte local + upload."""
+    try:
+        return cortar_em_stream(ctx["video_local"], corte, saida_path,
+                                f"{ctx['pasta_drive_final']}/{os.path.basename(saida_path)}", STREAMING_COPIA_LOCAL)
+    except Exception as e:
+        log_step(f"Corte {idx}/{ctx['total']}: streaming falhou ({str(e)[-300:]}); seguindo com corte local + upload.")
+        return None
+
+
+def _verificar_stream(diario, idx: int, saida_path: str, envio: dict):
+    # tamanho/md5 já conferidos no Drive por cortar_em_stream
+    if diario:
+        diario.marcar(idx, "cut", arquivo=os.path.basename(saida_path), modo="A_STREAM")
+        diario.marcar(idx, "verified", bytes=envio["size"], md5=envio["md5"], sem_local=not envio["local"])
+
+
+def _verificar_corte(diario, idx: int, saida_path: str, modo: str):
+    if not (os.path.exists(saida_path) and os.path.getsize(saida_path) > 0):
+        raise RuntimeError(f"Corte terminou sem arquivo de saída: {saida_path}")
+    if diario:
+        fname = os.path.basename(saida_path)
+        diario.marcar(idx, "cut", arquivo=fname, modo=modo)
+        diario.marcar(idx, "verified", bytes=os.path.getsize(saida_path), md5=_md5_arquivo(saida_path))
+
+
+LOG_TABELA_CABECALHO = "| # | Corte | Modo | Status | Tempo | Métricas |\n|---|---|---|---|---|---|\n"
+
+
+def _metricas_path(log_path: str) -> str:
+    return os.path.splitext(log_path)[0] + ".metricas.jsonl"
+
+
+def _escrever_metricas(log_path: str, registro: dict):
+    # sidecar legível por máquina: uma linha JSON por corte/etapa
+    with open(_metricas_path(log_path), "a", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+@rastreado("log_md")
+def _escrever_linha_log(log_path: str, r: dict):
+    idx = r["idx"]
+    with open(log_path, "a", encoding="utf-8") as log:
+        log.write(f"| {idx} | {r['titulo']} | {r['modo']} | {r['status']} | {fmt_td(r['elapsed'])} | {r.get('metricas_txt', '-')} |\n")
+        if r["debug_tail"]:
+            log.write(f"\n<details><summary>Debug corte #{idx}</summary>\n\n```\n{r['debug_tail']}\n```\n</details>\n\n")
+    _escrever_metricas(log_path, {"idx": idx, "modo": r["modo"], "status": r["status"],
+                                  "elapsed_s": round(r["elapsed"], 2), **r.get("metricas", {})})
+    _historico.registrar_corte(r)
+
+
+def _escrever_linhas_em_ordem(log_path: str, ordem: list, resultados: dict, proximo: int) -> int:
+    """
+    Escreve as linhas de ordem[proximo:] enquanto já houver resultado: cada linha sai
+    assim que ela e as anteriores do relatório terminam. Retorna o novo cursor.
+    """
+    while proximo < len(ordem) and ordem[proximo] in resultados:
+        _escrever_linha_log(log_path, resultados[ordem[proximo]])
+        proximo += 1
+    return proximo
+
+
+@rastreado("log_md")
+def _escrever_secao_upload(log_path: str, status: dict):
+    with open(log_path, "a", encoding="utf-8") as log:
+        log.write("\n## Upload\n\n| Arquivo | Status |\n|---|---|\n")
+        for fname in sorted(status):
+            log.write(f"| {fname} | {status[fname]} |\n")
+
+
+def _reservar_log_name(pipeline_start: datetime) -> str:
+    # no modo fila dois jobs podem começar no mesmo segundo: o nome é reservado com O_EXCL
+    base = f"historico_{pipeline_start.strftime('%d_%m_%Y_%H_%M_%S')}"
+    for n in range(1, 1000):
+        log_name = f"{base}.md" if n == 1 else f"{base}_{n}.md"
+        try:
+            os.close(os.open(os.path.join(LOG_DIR, log_name), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return log_name
+        except FileExistsError:
+            continue
+    raise RuntimeError(f"Não consegui reservar nome de log para {base}")
+
+
+def iniciar_processamento(event_path: str):
+    rastro = Rastro() if TRACE_ATIVO else None
+    token = _rastro_atual.set(rastro)
+    job = {}
+    token_job = _job_atual.set(job)
+    status, erro = "OK", None
+    try:
+        with span("job", evento=os.path.basename(event_path)):
+            _processar_evento(event_path)
+    except BaseException as e:
+        status, erro = "ERRO", str(e)[-1000:]
+        raise
+    finally:
+        _job_atual.reset(token_job)
+        _soltar_do_cache(job)
+        if job.get("id"):
+            _historico.finalizar_job(job["id"], status, erro)
+        _rastro_atual.reset(token)
+        if rastro and rastro.destino:
+            try:
+                rastro.exportar()
+                log_step(f"Trace: {rastro.destino}.trace.json ({len(rastro.spans)} spans)")
+            except OSError as e:
+                log_step(f"Trace: falha ao exportar ({e})")
+
+
+def _processar_evento(event_path: str):
+    pipeline_start = datetime.now()
+    os.makedirs(LOG_DIR, exist_ok=True)
+    _telemetria.iniciar()   # idempotente: no modo fila os jobs dividem a mesma thread
+
+    url_youtube, relatorio = ler_event_payload(event_path)
+    if not url_youtube:
+        raise ValueError("client_payload.url vazio")
+    if not (relatorio or "").strip():
+        raise ValueError("client_payload.relatorio vazio")
+
+    # não logar relatório; só fingerprint
+    log_step(f"Evento OK. url={url_youtube} rel_len={len(relatorio)} rel_sha1_12={sha1_12(relatorio)}")
+
+    tipocorte, cortes = extrair_cortes(relatorio)
+    total = len(cortes)
+    log_step(f"Pipeline INICIO. tipocorte={tipocorte} cortes={total}")
+    anotar(tipocorte=tipocorte, cortes=total, rel_sha1_12=sha1_12(relatorio))
+
+    diario = DiarioJob(url_youtube, relatorio)
+
+    # info do vídeo (numa retomada vem do diário)
+    video_info = diario.dados.get("video_info")
+    if video_info:
+        log_step(f"Retomando job {diario.chave}: info do vídeo do diário (sem nova extração).")
+    else:
+        video_info = obter_info_video(url_youtube)
+        diario.definir(video_info=_resumo_video_info(video_info))
+
+    data_upload = datetime.strptime(video_info["upload_date"], "%Y%m%d")
+    titulo_video = video_info["title"]
+
+    rel_path = criar_caminho_hierarquico(data_upload, titulo_video, relatorio)
+    pasta_local_final = os.path.join(BASE_PATH, rel_path)
+    pasta_drive_final = f"{DRIVE_NAME}:/Cortes_Midia_Igreja/{rel_path}"
+
+    # cortes já verificados numa execução anterior não são refeitos
+    pendentes = []
+    prontos = []
+    for idx, corte in enumerate(cortes, 1):
+        saida = os.path.join(pasta_local_final, f"{_build_output_name(tipocorte, corte, idx)}.mp4")
+        if diario.corte_pronto(idx, saida):
+            prontos.append((idx, saida))
+        else:
+            pendentes.append((idx, corte))
+            diario.marcar(idx, "planned")
+            # saída ainda ligada ao acervo (hardlink): o ffmpeg regravaria o arquivo guardado no lugar
+            if os.path.exists(saida) and os.stat(saida).st_nlink > 1:
+                os.remove(saida)
+
+    # cortes iguais a um já produzido (mesmo vídeo, janela e parâmetros) saem do acervo, sem download
+    do_acervo = {}
+    for idx, corte in pendentes:
+        ent = acervo_obter(chave_acervo(url_youtube, corte))
+        saida = os.path.join(pasta_local_final, f"{_build_output_name(tipocorte, corte, idx)}.mp4")
+        if ent and acervo_materializar(ent, saida):
+            do_acervo[idx] = ent
+    reaproveitados = [(idx, corte) for idx, corte in pendentes if idx in do_acervo]
+    pendentes = [(idx, corte) for idx, corte in pendentes if idx not in do_acervo]
+    if reaproveitados:
+        log_step(f"Acervo: {len(reaproveitados)} corte(s) reaproveitado(s) de jobs anteriores; {len(pendentes)} a cortar.")
+
+    est = _historico.estimativas()
+    if est:
+        _aplicar_estimativas(est)
+
+    plano = None
+    if tipocorte != "LOUVOR" and pendentes:
+        plano = planejar_download(url_youtube, pendentes, video_info,
+                                  throughput_bps=est.get("download_bps") or PLANO_THROUGHPUT_PADRAO_BPS,
+                                  falha_secoes=est.get("falha_secoes", 0.0))
+        custos = " ".join(f"{k}={v:.0f}s" for k, v in sorted(plano["custos"].items()))
+        log_step(f"Plano de download: {plano['estrategia']} faixas={len(plano['faixas'])} custos≈[{custos}]")
+
+    log_name = diario.dados.get("log_name") or _reservar_log_name(pipeline_start)
+    log_path = os.path.join(LOG_DIR, log_name)
+    diario.definir(log_name=log_name)
+    job = _job_atual.get()
+    if job is not None:
+        job["id"] = _historico.iniciar_job(url_youtube, tipocorte, total, log_name)
+    rastro = _rastro_atual.get()
+    if rastro:
+        rastro.destino = os.path.splitext(log_path)[0]
+
+    with span("log_md", parte="cabecalho"):
+        if diario.retomado and os.path.exists(log_path) and os.path.getsize(log_path) > 0:
+            with open(log_path, "a", encoding="utf-8") as log:
+                log.write(f"\n## Retomada {pipeline_start.strftime('%d/%m/%Y %H:%M:%S')}\n")
+                log.write(f"- Cortes já prontos: {len(prontos)}/{total}\n")
+                if plano:
+                    log.write(f"- Plano de download: {plano['estrategia']} ({len(plano['faixas'])} faixa(s); {custos})\n")
+                if pendentes:
+                    log.write("\n" + LOG_TABELA_CABECALHO)
+        else:
+            with open(log_path, "w", encoding="utf-8") as log:
+                log.write(f"# Relatório: {titulo_video}\n")
+                log.write(f"- Tipocorte: {tipocorte}\n")
+                log.write(f"- URL: {url_youtube}\n")
+                log.write(f"- Total de cortes: {total}\n")
+                log.write(f"- Saída local: {pasta_local_final}\n")
+                log.write(f"- Destino Drive: {pasta_drive_final}\n")
+                if plano:
+                    log.write(f"- Plano de download: {plano['estrategia']} ({len(plano['faixas'])} faixa(s); {custos})\n")
+                log.write(f"- Relatorio sha1_12: {sha1_12(relatorio)}\n")
+                log.write(f"- Job: {diario.chave}\n\n")
+                log.write(LOG_TABELA_CABECALHO)
+
+    log_step(f"Vídeo: {titulo_video}")
+    log_step(f"Saída local: {pasta_local_final}")
+    log_step(f"Destino Drive: {pasta_drive_final}")
+    log_step(f"Log: {log_path}")
+
+    if prontos:
+        log_step(f"Retomada: {len(prontos)}/{total} corte(s) já prontos; {len(pendentes)} pendente(s).")
+
+    ctx = {
+        "diario": diario,
+        "url_youtube": url_youtube,
+        "tipocorte": tipocorte,
+        "pasta_local_final": pasta_local_final,
+        "pasta_drive_final": pasta_drive_final,
+        "total": total,
+        "pre_cortados": {},
+        "do_acervo": do_acervo,
+        "duracao_video": video_info.get("duration"),
+    }
+
+    uploader = None
+    if UPLOAD_DURANTE_CORTES and UPLOAD_EM_LOTE:
+        uploader = UploaderEmFundo(pasta_local_final, pasta_drive_final,
+                                   ao_terminar=lambda fname, st: _registrar_upload_no_diario(diario, fname, st))
+        ctx["uploader"] = uploader
+        for idx, saida in prontos:
+            if diario.estado(idx) != "uploaded":
+                uploader.enfileirar(saida)
+
+    # linhas do log na ordem do relatório, cada uma gravada assim que ela e as anteriores terminam
+    ordem = sorted(idx for idx, _ in reaproveitados + pendentes)
+    proximo = 0
+
+    # antes do download: a cópia no Drive destes anda enquanto o resto é baixado
+    resultados = {idx: _executar_corte(idx, corte, ctx) for idx, corte in reaproveitados}
+    proximo = _escrever_linhas_em_ordem(log_path, ordem, resultados, proximo)
+
+    # um pool para todos os cortes (progressivos durante o download e os demais depois);
+    # cada tarefa leva uma cópia do contexto: os spans dos cortes ficam sob o job
+    with ThreadPoolExecutor(max_workers=MAX_CORTES_PARALELOS, thread_name_prefix="corte") as pool:
+        video_local = None
+        with coletar_metricas() as met_download:
+            if not pendentes:
+                pass
+            elif tipocorte == "LOUVOR" and CORTE_PROGRESSIVO and DOWNLOAD_HTTP_DIRETO:
+                log_step("LOUVOR: download do vídeo inteiro com corte progressivo...")
+                video_local, feitos, pendentes = _cortar_durante_download(url_youtube, video_info.get("duration"), pendentes, ctx, pool)
+                resultados.update(feitos)
+                proximo = _escrever_linhas_em_ordem(log_path, ordem, resultados, proximo)
+                log_step("LOUVOR: download OK.")
+            elif tipocorte == "LOUVOR":
+                log_step("LOUVOR: pré-download do vídeo inteiro (cache)...")
+                video_local = garantir_download_inteiro(url_youtube, video_info.get("duration"))
+                log_step("LOUVOR: pré-download OK.")
+            else:
+                if plano["estrategia"] == "inteiro":
+                    video_local = garantir_download_inteiro(url_youtube, video_info.get("duration"))
+                ctx["faixas_dir"] = os.path.join(FAIXAS_DIR, sha1_12(url_youtube + relatorio))
+                ctx["fontes"] = executar_plano(url_youtube, plano, ctx["faixas_dir"])
+        if met_download.resumo():
+            log_step(f"Download: {met_download.texto()}")
+            _escrever_metricas(log_path, {"etapa": "download", **met_download.resumo()})
+
+        if video_local:
+            ctx["video_local"] = video_local
+            pendentes = ajustar_bordas(video_local, url_youtube, pendentes)
+            # streaming é por corte (um stdout por ffmpeg): com ele ligado o lote fica de fora
+            if CORTE_EM_LOTE and not (UPLOAD_STREAMING and uploader) and sum(1 for _, c in pendentes if not _usa_smart_cut(c)) > 1:
+                # smart cut é por corte (precisa reencodar as bordas); o lote fica com os de -c copy
+                jobs = [
+                    (idx, corte, os.path.join(pasta_local_final, f"{_build_output_name(tipocorte, corte, idx)}.mp4"))
+                    for idx, corte in pendentes if not _usa_smart_cut(corte)
+                ]
+                with coletar_metricas() as met_lote:
+                    ctx["pre_cortados"] = cortar_local_em_lote(video_local, jobs)
+                ctx["metricas_lote"] = met_lote
+                log_step(f"Corte em lote: {len(ctx['pre_cortados'])}/{total} OK; restantes seguem corte individual. [{met_lote.texto()}]")
+                _escrever_metricas(log_path, {"etapa": "corte_em_lote", "cortes": len(ctx["pre_cortados"]), **met_lote.resumo()})
+
+        if MAX_CORTES_PARALELOS > 1 and len(pendentes) > 1:
+            tel = obter_telemetria()
+            log_step(f"Cortes em paralelo: workers={MAX_CORTES_PARALELOS} rede={_SEM_REDE.limite}/{MAX_PROCESSOS_REDE} "
+                     f"local={_SEM_LOCAL.limite}/{MAX_PROCESSOS_LOCAIS} cpu={tel['cpu']:.0f}%")
+        futuros = {idx: pool.submit(contextvars.copy_context().run, _executar_corte, idx, corte, ctx) for idx, corte in pendentes}
+        for idx, fut in futuros.items():
+            resultados[idx] = fut.result()
+            proximo = _escrever_linhas_em_ordem(log_path, ordem, resultados, proximo)
+
+    if ctx.get("faixas_dir"):
+        shutil.rmtree(ctx["faixas_dir"], ignore_errors=True)
+
+    if UPLOAD_EM_LOTE:
+        status_upload = uploader.finalizar() if uploader else {}
+        # passada final: pega o que não entrou na fila (ex.: sobras de execução anterior) e re-confere no Drive
+        for fname, st in upload_drive_em_lote(pasta_local_final, pasta_drive_final).items():
+            if st != "JA_ENVIADO" or status_upload.get(fname, "FALHOU") == "FALHOU":
+                status_upload[fname] = st
+        _escrever_secao_upload(log_path, status_upload)
+        for fname, st in status_upload.items():
+            _registrar_upload_no_diario(diario, fname, st)
+        failed = [n for n, st in status_upload.items() if st == "FALHOU"]
+        for name in failed:
+            log_step(f"Falhou upload: {name}")
+        if failed:
+            raise RuntimeError(f"Upload falhou para {len(failed)}/{len(status_upload)} arquivo(s).")
+    else:
+        upload_drive_arquivo_a_arquivo(pasta_local_final, pasta_drive_final)
+        for idx in range(1, total + 1):
+            if diario.estado(idx) == "verified":
+                diario.marcar(idx, "uploaded")
+    diario.definir(finalizado=datetime.now().isoformat(timespec="seconds"))
+
+    total_s = (datetime.now() - pipeline_start).total_seconds()
+    log_step(f"Pipeline FIM. Tempo total: {fmt_td(total_s)}. Log: {log_name}")
+
+
+# =========================
+# Modo fila (spool de eventos)
+# =========================
+def _destino_livre(path: str, pasta: str) -> str:
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, os.path.basename(path))
+    if os.path.exists(destino):
+        base, ext = os.path.splitext(os.path.basename(path))
+        destino = os.path.join(pasta, f"{base}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{ext}")
+    return destino
+
+
+def _mover(path: str, pasta: str) -> str:
+    destino = _destino_livre(path, pasta)
+    os.replace(path, destino)
+    return destino
+
+
+def _travar_evento(path: str) -> LockArquivo | None:
+    lk = LockArquivo(path + ".lock")
+    if not lk.adquirir(bloquear=False):
+        return None
+    if not lk.vigente():
+        lk.liberar()   # lock apagado por quem acabou de soltar: o da vez é o arquivo novo
+        return None
+    return lk
+
+
+def _soltar_evento(lk: LockArquivo):
+    # apaga o lock ainda travado: quem abriu o arquivo velho nesse meio-tempo vê vigente() falso
+    try:
+        os.remove(lk.path)
+        apagado = True
+    except OSError:
+        apagado = False   # Windows não apaga arquivo aberto: sai depois de soltar
+    lk.liberar()
+    if not apagado:
+        try:
+            os.remove(lk.path)
+        except OSError:
+            pass
+
+
+def _eventos_na_fila(spool_dir: str) -> list:
+    """Eventos do spool, mais antigos primeiro. Os que somem entre o glob e o stat (outro runner) ficam de fora."""
+    eventos = []
+    for path in glob.glob(os.path.join(spool_dir, "*.json")):
+        try:
+            eventos.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    return [path for _, path in sorted(eventos)]
+
+
+def _reivindicar(path: str, proc_dir: str) -> tuple | None:
+    """
+    Trava processando/<evento>.lock e só então move o evento para lá: quando ele
+    aparece em processando/, o lock já está de pé (_recuperar_orfaos não o devolve).
+    Retorna (caminho, lock) ou None se outro runner pegou primeiro.
+    """
+    destino = _destino_livre(path, proc_dir)
+    lk = _travar_evento(destino)
+    if lk is None:
+        return None
+    try:
+        os.replace(path, destino)
+    except OSError:
+        _soltar_evento(lk)
+        return None
+    return destino, lk
+
+
+def _recuperar_orfaos(spool_dir: str):
+    # evento em processando/ sem lock ativo = runner que caiu no meio; volta para a fila
+    proc_dir = os.path.join(spool_dir, "processando")
+    for path in glob.glob(os.path.join(proc_dir, "*.json")):
+        lk = _travar_evento(path)
+        if lk is None:
+            continue
+        try:
+            if os.path.exists(path):
+                log_step(f"Fila: recuperando evento órfão {os.path.basename(path)}")
+                _mover(path, spool_dir)
+        except OSError as e:
+            log_step(f"Fila: evento órfão {os.path.basename(path)} não voltou para a fila: {e}")
+        finally:
+            _soltar_evento(lk)
+
+
+def _rodar_evento_da_fila(spool_dir: str, path: str, lk: LockArquivo):
+    """Roda um evento já reivindicado; o lock vem travado de _reivindicar e é solto aqui."""
+    nome = os.path.basename(path)
+    try:
+        log_step(f"Fila: job INICIO {nome}")
+        try:
+            iniciar_processamento(path)
+        except Exception as e:
+            log_step(f"Fila: job FALHOU {nome}: {e}")
+            destino = _mover(path, os.path.join(spool_dir, "falhos"))
+            with open(destino + ".erro.txt", "w", encoding="utf-8") as f:
+                f.write(str(e)[-5000:])
+            return
+        _mover(path, os.path.join(spool_dir, "feitos"))
+        log_step(f"Fila: job OK {nome}")
+    finally:
+        _soltar_evento(lk)
+
+
+def executar_fila(spool_dir: str, max_jobs: int = FILA_MAX_JOBS, uma_vez: bool = False):
+    """
+    Observa spool_dir/*.json (mesmo formato do GITHUB_EVENT_PATH) e roda os jobs
+    num pool compartilhado. O evento é reivindicado (lock + os.replace para
+    processando/), então vários runners podem dividir o mesmo spool.
+    Jobs do mesmo vídeo compartilham o download via lock do cache.
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    _recuperar_orfaos(spool_dir)
+    log_step(f"Fila: observando {spool_dir} (jobs={max_jobs})")
+    proc_dir = os.path.join(spool_dir, "processando")
+    os.makedirs(proc_dir, exist_ok=True)
+
+    em_andamento = set()
+    with ThreadPoolExecutor(max_workers=max(1, max_jobs), thread_name_prefix="job") as pool:
+        try:
+            while True:
+                em_andamento = {f for f in em_andamento if not f.done()}
+                livres = max_jobs - len(em_andamento)
+                for path in _eventos_na_fila(spool_dir):
+                    if livres <= 0:
+                        break
+                    reivindicado = _reivindicar(path, proc_dir)
+                    if reivindicado is None:
+                        continue  # outro runner pegou primeiro
+                    em_andamento.add(pool.submit(_rodar_evento_da_fila, spool_dir, *reivindicado))
+                    livres -= 1
+                if uma_vez and not em_andamento and not glob.glob(os.path.join(spool_dir, "*.json")):
+                    break
+                time.sleep(FILA_POLL_S if not uma_vez else 0.5)
+        except KeyboardInterrupt:
+            log_step("Fila: interrompido; aguardando jobs em andamento...")
+    log_step("Fila: FIM")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--event-path", required=True)
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--event-path")
+    grupo.add_argument("--spool-dir", help="modo fila: processa os eventos .json que aparecerem nesta pasta")
+    grupo.add_argument("--stats", action="store_true", help="resumo do histórico SQLite (percentis, vazão, tendência)")
+    parser.add_argument("--jobs", type=int, default=FILA_MAX_JOBS, help="jobs simultâneos no modo fila")
+    parser.add_argument("--uma-vez", action="store_true", help="modo fila: esvazia a pasta e sai")
+    parser.add_argument("--dias", type=int, default=STATS_JANELA_DIAS, help="--stats: janela em dias")
+    parser.add_argument("--runner", help="--stats: só este runner")
     args = parser.parse_args()
-    iniciar_processamento(args.event_path)
+    if args.stats:
+        imprimir_stats(args.dias, args.runner)
+    elif args.spool_dir:
+        executar_fila(args.spool_dir, max_jobs=args.jobs, uma_vez=args.uma_vez)
+    else:
+        iniciar_processamento(args.event_path)
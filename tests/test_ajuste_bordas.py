@@ -0,0 +1,77 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import processar_cortes as pc  # noqa: E402
+
+Q = pc.AJUSTE_QUADRO_S
+
+
+@pytest.fixture(autouse=True)
+def energia_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pc, "ENERGIA_CACHE_DIR", str(tmp_path / "energia"))
+
+
+def _mapa(ini_s: float, fim_s: float, silencios=(), chave="teste") -> pc.MapaEnergia:
+    """Fala (RMS ~1000 com ruído) de ini_s a fim_s, com os trechos de `silencios` zerados."""
+    rng = np.random.default_rng(7)
+    n = int(round((fim_s - ini_s) / Q))
+    t = ini_s + (np.arange(n) + 0.5) * Q
+    e = rng.uniform(800, 1200, n).astype(np.float32)
+    for a, b in silencios:
+        e[(t >= a) & (t < b)] = 0.0
+    mapa = pc.MapaEnergia(chave)
+    mapa.adicionar(ini_s, e)
+    return mapa
+
+
+def _corte(ini_s, fim_s, alvo=None):
+    return pc.Corte(ini_s, fim_s, fim_s - ini_s, "teste", "OURO" if alvo else "CORTE", alvo)
+
+
+def test_bordas_vao_para_o_silencio_vizinho():
+    mapa = _mapa(95, 135, silencios=[(100.7, 100.9), (129.3, 129.5)])
+    ini, fim, nota = pc._ajustar_um(mapa, _corte(100, 130))
+    assert 100.7 <= ini <= 100.9
+    assert 129.3 <= fim <= 129.5
+    assert nota == ""
+
+
+def test_silencio_fora_do_raio_e_ignorado():
+    mapa = _mapa(95, 135, silencios=[(100 + pc.AJUSTE_RAIO_S + 0.5, 100 + pc.AJUSTE_RAIO_S + 0.7)])
+    ini, _fim, _ = pc._ajustar_um(mapa, _corte(100, 130))
+    assert abs(ini - 100) <= pc.AJUSTE_RAIO_S
+
+
+def test_sem_silencio_fica_perto_do_relatorio():
+    mapa = pc.MapaEnergia("plano")
+    mapa.adicionar(95, np.full(int(40 / Q), 1000.0, dtype=np.float32))
+    ini, fim, _ = pc._ajustar_um(mapa, _corte(100, 130))
+    assert abs(ini - 100) <= Q and abs(fim - 130) <= Q
+
+
+def test_ouro_procura_o_fim_em_volta_do_alvo():
+    # relatório marcou 30 s para um OURO 20: o fim é procurado perto de ini + 20,
+    # e o silêncio a 21,3 s do início fica fora da tolerância
+    mapa = _mapa(195, 235, silencios=[(200.4, 200.6), (220.8, 221.0), (221.7, 221.9)])
+    ini, fim, nota = pc._ajustar_um(mapa, _corte(200, 230, alvo=20))
+    assert 200.4 <= ini <= 200.6
+    assert 220.8 <= fim <= 221.0
+    assert abs((fim - ini) - 20) <= pc.AJUSTE_ALVO_TOLERANCIA_S
+    assert nota == "alvo 20s"
+
+
+def test_sem_audio_mantem_as_bordas():
+    assert pc._ajustar_um(pc.MapaEnergia("vazio"), _corte(100, 130)) == (100, 130, "sem áudio")
+
+
+def test_mapa_persiste_e_cobre_as_janelas():
+    mapa = _mapa(95, 105, chave="persistido")
+    mapa.salvar()
+    lido = pc.MapaEnergia("persistido")
+    assert lido.cobre(96, 104) and not lido.cobre(96, 106)
+    t, e = lido.trecho(98, 102)
+    assert len(e) == round(4 / Q)
+    assert t[0] == pytest.approx(98 + Q / 2)
+    np.testing.assert_array_equal(e, mapa.trecho(98, 102)[1])
+
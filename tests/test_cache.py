@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+
+MB = 1024 ** 2
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return pc.IndiceCache(str(tmp_path), 3 * MB)
+
+
+def _video(cache, nome, tamanho=MB):
+    with open(os.path.join(cache.diretorio, nome), "wb") as f:
+        f.truncate(tamanho)
+    return nome
+
+
+def _envelhecer(cache, **acessos):
+    idx = cache.entradas()
+    for key, t in acessos.items():
+        idx[key]["ultimo_acesso"] = t
+    with open(cache.path, "w", encoding="utf-8") as f:
+        json.dump(idx, f)
+
+
+def test_mesma_chave_para_as_urls_do_mesmo_video():
+    chaves = {pc.cache_key_for_url(u) for u in ("https://youtu.be/abcdefghijk",
+                                                "https://www.youtube.com/watch?v=abcdefghijk&t=90s",
+                                                "https://www.youtube.com/live/abcdefghijk?si=x")}
+    assert chaves == {"yt_abcdefghijk"}
+
+
+def test_lru_remove_o_menos_usado_e_os_auxiliares(cache):
+    for key in "abc":
+        cache.registrar(key, _video(cache, f"{key}.mp4"))
+    _video(cache, "a.mp4.keyframes.json", 10)
+    _envelhecer(cache, a=100, b=300, c=200)
+
+    cache.registrar("d", _video(cache, "d.mp4"))
+    assert set(cache.entradas()) == {"b", "c", "d"}
+    assert not os.path.exists(os.path.join(cache.diretorio, "a.mp4"))
+    assert not os.path.exists(os.path.join(cache.diretorio, "a.mp4.keyframes.json"))
+
+
+def test_tocar_renova_o_acesso(cache):
+    for key in "abc":
+        cache.registrar(key, _video(cache, f"{key}.mp4"))
+    _envelhecer(cache, a=100, b=200, c=300)
+    cache.tocar("a")
+    cache.registrar("d", _video(cache, "d.mp4"))
+    assert set(cache.entradas()) == {"a", "c", "d"}
+
+
+def test_protegidos_nao_saem_mesmo_acima_do_limite(cache):
+    for key in "abc":
+        cache.registrar(key, _video(cache, f"{key}.mp4"))
+    _envelhecer(cache, a=100, b=200, c=300)
+    # a e b em uso por este processo: sai c, o único livre, e o total fica acima do limite
+    cache.registrar("d", _video(cache, "d.mp4", 2 * MB), protegidos={"a", "b"})
+    idx = cache.entradas()
+    assert set(idx) == {"a", "b", "d"}
+    assert sum(e["bytes"] for e in idx.values()) > cache.max_bytes
+    assert os.path.exists(os.path.join(cache.diretorio, "a.mp4"))
+
+
+def test_orfao_sem_indice_entra_na_lru(cache):
+    orfao = _video(cache, "0123456789abcdef.mp4", 2 * MB)
+    os.utime(os.path.join(cache.diretorio, orfao), (1, 1))
+    _video(cache, "x.mp4.part", 2 * MB)   # download em andamento: não é adotado
+    cache.registrar("a", _video(cache, "a.mp4", 2 * MB))
+    assert set(cache.entradas()) == {"a"}
+    assert not os.path.exists(os.path.join(cache.diretorio, orfao))
+    assert os.path.exists(os.path.join(cache.diretorio, "x.mp4.part"))
+
+
+def test_obter_descarta_entrada_com_tamanho_diferente(cache):
+    cache.registrar("a", _video(cache, "a.mp4"))
+    assert cache.obter("a")["path"] == os.path.join(cache.diretorio, "a.mp4")
+    with open(os.path.join(cache.diretorio, "a.mp4"), "ab") as f:
+        f.write(b"x")   # arquivo trocado por fora
+    assert cache.obter("a") is None
+    assert cache.entradas() == {}
@@ -0,0 +1,95 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+
+if not shutil.which("ffmpeg"):
+    pytest.skip("ffmpeg fora do PATH", allow_module_level=True)
+
+
+@pytest.fixture(scope="module")
+def fonte(tmp_path_factory):
+    # GOP de 2 s: os cortes abaixo começam no meio de um GOP
+    path = str(tmp_path_factory.mktemp("lote") / "fonte.mp4")
+    subprocess.run(["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", "testsrc=size=160x120:rate=25",
+                    "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000", "-t", "20",
+                    "-c:v", "libx264", "-g", "50", "-keyint_min", "50", "-sc_threshold", "0",
+                    "-c:a", "aac", "-shortest", path], check=True)
+    return path
+
+
+def pacotes(path: str) -> list:
+    """(stream, dts, pts, duração, bytes) de cada pacote: início e duração de cada stream saem daqui."""
+    p = subprocess.run(["ffmpeg", "-v", "error", "-i", path, "-map", "0", "-c", "copy", "-f", "framemd5", "-"],
+                       stdout=subprocess.PIPE, text=True, check=True)
+    return [tuple(c.strip() for c in linha.split(",")[:5]) for linha in p.stdout.splitlines()
+            if linha and not linha.startswith("#")]
+
+
+def inicio_e_duracao(lista: list, stream: str) -> tuple:
+    pts = [int(p[2]) for p in lista if p[0] == stream]
+    return min(pts), max(pts) - min(pts), len(pts)
+
+
+CORTES = [
+    {"ini": "00:00:03", "fim": "00:00:07"},
+    {"ini": "00:00:05", "dur_mmss": "00:04"},
+    {"ini": "00:00:11", "fim": "00:00:16"},
+]
+
+
+def test_lote_igual_ao_corte_individual(fonte, tmp_path):
+    jobs = [(n, corte, str(tmp_path / "lote" / f"{n}.mp4")) for n, corte in enumerate(CORTES)]
+    ok = pc.cortar_local_em_lote(fonte, jobs)
+    assert sorted(ok) == [0, 1, 2]
+
+    for n, corte, saida_lote in jobs:
+        saida_um = str(tmp_path / "um" / f"{n}.mp4")
+        pc.cortar_local(fonte, corte, saida_um)
+        lote, um = pacotes(saida_lote), pacotes(saida_um)
+        for stream in ("0", "1"):
+            assert inicio_e_duracao(lote, stream) == inicio_e_duracao(um, stream), (n, stream)
+        assert lote == um
+
+
+def test_lote_comeca_video_e_audio_juntos(fonte, tmp_path):
+    saida = str(tmp_path / "a.mp4")
+    pc.cortar_local_em_lote(fonte, [(0, CORTES[0], saida), (1, CORTES[2], str(tmp_path / "b.mp4"))])
+    lista = pacotes(saida)
+    # timebases do framemd5: vídeo 1/12800, áudio 1/48000
+    ini_v = inicio_e_duracao(lista, "0")[0] / 12800
+    ini_a = inicio_e_duracao(lista, "1")[0] / 48000
+    assert abs(ini_v - ini_a) < 0.1
+
+
+def test_lote_le_a_fonte_uma_vez_so(fonte, tmp_path, monkeypatch):
+    cmds = []
+    original = pc.run_cmd_live
+
+    def espiar(cmd, *a, **kw):
+        cmds.append(cmd)
+        return original(cmd, *a, **kw)
+
+    monkeypatch.setattr(pc, "run_cmd_live", espiar)
+    cortes = CORTES + [{"ini": "00:00:04", "fim": "00:00:06"}, {"ini": "00:00:06", "fim": "00:00:19"}]
+    jobs = [(n, corte, str(tmp_path / f"{n}.mp4")) for n, corte in enumerate(cortes)]
+    assert sorted(pc.cortar_local_em_lote(fonte, jobs)) == list(range(len(cortes)))
+    (cmd,) = cmds
+    assert cmd.count("-i") == 1
+    # começa no keyframe do primeiro corte (dts logo abaixo de 2 s), não no início do arquivo
+    assert 1.8 < float(cmd[cmd.index("-i") - 1]) <= 2.0
+    for n, corte, saida in jobs:
+        um = str(tmp_path / f"um_{n}.mp4")
+        pc.cortar_local(fonte, corte, um)
+        assert pacotes(saida) == pacotes(um), n
+
+
+def test_lote_sem_indice_vai_todo_para_o_individual(tmp_path, monkeypatch):
+    def falha(_path):
+        raise RuntimeError("ffprobe não conseguiu listar keyframes")
+
+    monkeypatch.setattr(pc, "indice_keyframes", falha)
+    assert pc.cortar_local_em_lote(str(tmp_path / "x.mp4"), [(0, CORTES[0], str(tmp_path / "a.mp4"))]) == {}
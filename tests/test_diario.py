@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+from conftest import RAIZ  # noqa: E402
+
+URL = "https://youtu.be/abcdefghijk"
+RELATORIO = "Foco da Solicitação: Pregação\nCortes para Automação\n[[00:00:10]] [[00:00:40]]\nAssunto: teste\n"
+
+# runner que cai no meio do job: corte 1 verificado e enviado, corte 2 cortado mas não verificado,
+# e a gravação do diário seguinte interrompida antes do os.replace
+JOB_QUE_CAI = """
+import os, sys
+sys.path.insert(0, sys.argv[1])
+import processar_cortes as pc
+pc.JOBS_DIR = sys.argv[2]
+saidas = sys.argv[3:]
+for s in saidas:
+    with open(s, "wb") as f:
+        f.write(b"x" * 1000)
+d = pc.DiarioJob(%(url)r, %(rel)r)
+d.definir(video_info={"title": "Culto", "upload_date": "20260101"})
+for idx, s in enumerate(saidas, 1):
+    d.marcar(idx, "planned")
+d.marcar(1, "cut", arquivo=os.path.basename(saidas[0]), modo="A")
+d.marcar(1, "verified", bytes=1000, md5="m")
+d.marcar(1, "uploaded")
+d.marcar(2, "cut", arquivo=os.path.basename(saidas[1]), modo="A")
+with open(d.path + ".tmp", "w") as f:
+    f.write('{"url": ')
+os._exit(137)
+"""
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch):
+    d = str(tmp_path / "_jobs")
+    monkeypatch.setattr(pc, "JOBS_DIR", d)
+    return d
+
+
+@pytest.fixture
+def saidas(tmp_path):
+    return [str(tmp_path / f"corte_{n}.mp4") for n in (1, 2, 3)]
+
+
+def _cair(jobs_dir, saidas):
+    script = JOB_QUE_CAI % {"url": URL, "rel": RELATORIO}
+    rc = subprocess.run([sys.executable, "-c", script, RAIZ, jobs_dir, *saidas]).returncode
+    assert rc == 137
+
+
+def test_retoma_depois_de_queda(jobs_dir, saidas):
+    _cair(jobs_dir, saidas)
+    d = pc.DiarioJob(URL, RELATORIO)
+    assert d.retomado
+    assert d.dados["video_info"]["title"] == "Culto"   # sem nova extração
+    assert [d.estado(i) for i in (1, 2, 3)] == ["uploaded", "cut", "planned"]
+    assert [d.corte_pronto(i, s) for i, s in enumerate(saidas, 1)] == [True, False, False]
+
+
+def test_arquivo_alterado_depois_da_queda_e_refeito(jobs_dir, saidas):
+    _cair(jobs_dir, saidas)
+    with open(saidas[0], "ab") as f:
+        f.write(b"lixo")
+    assert not pc.DiarioJob(URL, RELATORIO).corte_pronto(1, saidas[0])
+    os.remove(saidas[0])
+    assert not pc.DiarioJob(URL, RELATORIO).corte_pronto(1, saidas[0])
+
+
+def test_outro_relatorio_nao_herda_o_diario(jobs_dir, saidas):
+    _cair(jobs_dir, saidas)
+    d = pc.DiarioJob(URL, RELATORIO + "Assunto: outro\n")
+    assert not d.retomado and d.dados["cortes"] == {}
+    # youtu.be e watch?v= são o mesmo vídeo: mesmo diário
+    assert pc.DiarioJob(f"https://www.youtube.com/watch?v={URL[-11:]}", RELATORIO).retomado
+
+
+def test_diario_corrompido_comeca_do_zero(jobs_dir):
+    d = pc.DiarioJob(URL, RELATORIO)
+    os.makedirs(jobs_dir)
+    with open(d.path, "w", encoding="utf-8") as f:
+        f.write('{"cortes": {"1": ')
+    d = pc.DiarioJob(URL, RELATORIO)
+    assert not d.retomado and d.dados["url"] == URL
+
+
+def test_stream_sem_copia_local_so_conta_depois_do_upload(jobs_dir, tmp_path):
+    d = pc.DiarioJob(URL, RELATORIO)
+    saida = str(tmp_path / "stream.mp4")
+    pc._verificar_stream(d, 1, saida, {"size": 10, "md5": "m", "local": False})
+    assert not d.corte_pronto(1, saida)
+    pc._registrar_upload_no_diario(d, "stream.mp4", "JA_ENVIADO")
+    assert pc.DiarioJob(URL, RELATORIO).corte_pronto(1, saida)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import struct
+
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+import servidor_http  # noqa: E402
+from conftest import FIXTURES  # noqa: E402
+
+BLOCO = 64 * 1024
+TAMANHO = 16 * BLOCO + 1000   # último bloco menor que os outros
+
+
+@pytest.fixture
+def fonte(tmp_path):
+    path = str(tmp_path / "fonte.mp4")
+    with open(path, "wb") as f:
+        f.write(os.urandom(TAMANHO))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def blocos_pequenos(monkeypatch):
+    monkeypatch.setattr(pc, "DOWNLOAD_BLOCO_BYTES", BLOCO)
+    monkeypatch.setattr(pc, "DOWNLOAD_LEITURA_BYTES", 16 * 1024)
+    monkeypatch.setattr(pc, "DOWNLOAD_TIMEOUT_S", 5)
+    monkeypatch.setattr(pc, "STATS_ATIVO", False)
+    monkeypatch.setattr(pc, "espera_backoff", lambda _classe, _tentativa: 0)
+
+
+@pytest.fixture
+def servidor():
+    servidores = []
+
+    def subir(arquivo, cair_apos_bytes=0):
+        url, srv = servidor_http.iniciar(arquivo, cair_apos_bytes=cair_apos_bytes)
+        servidores.append(srv)
+        return url, srv.RequestHandlerClass.estado
+
+    yield subir
+    for srv in servidores:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _md5(path):
+    with open(path, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def test_tamanho_pelo_content_range(fonte, servidor):
+    url, _ = servidor(fonte)
+    assert pc._tamanho_http(url, {}) == TAMANHO
+
+
+def test_baixa_em_blocos_e_remove_o_mapa(fonte, servidor, tmp_path):
+    url, estado = servidor(fonte)
+    destino = str(tmp_path / "video.mp4")
+    dl = pc.DownloadHttp(url, destino, TAMANHO)
+    assert dl.executar() == destino
+    assert _md5(destino) == _md5(fonte)
+    assert dl.concluido and dl.prefixo == TAMANHO and dl.feito_sessao == TAMANHO
+    assert estado.requisicoes == dl.n_blocos == 17
+    assert not os.path.exists(dl.part) and not os.path.exists(dl.mapa_path)
+
+
+def test_queda_no_meio_do_bloco_repete_so_o_bloco(fonte, servidor, tmp_path):
+    url, estado = servidor(fonte, cair_apos_bytes=5 * BLOCO + 100)
+    destino = str(tmp_path / "video.mp4")
+    dl = pc.DownloadHttp(url, destino, TAMANHO)
+    dl.executar()
+    assert _md5(destino) == _md5(fonte)
+    assert estado.requisicoes == dl.n_blocos + 1
+    assert dl.feito_sessao == TAMANHO   # bytes do bloco perdido não contam duas vezes
+
+
+def test_retoma_do_part_depois_de_desistir(fonte, servidor, tmp_path, monkeypatch):
+    monkeypatch.setattr(pc, "DOWNLOAD_CONEXOES", 1)
+    monkeypatch.setattr(pc, "DOWNLOAD_TENTATIVAS_BLOCO", 1)
+    destino = str(tmp_path / "video.mp4")
+    url, _ = servidor(fonte, cair_apos_bytes=4 * BLOCO + 100)
+    with pytest.raises((OSError, RuntimeError, pc.http.client.HTTPException)):
+        pc.DownloadHttp(url, destino, TAMANHO).executar()
+    with open(destino + ".part.json", encoding="utf-8") as f:
+        assert json.load(f)["prontos"] == [0, 1, 2, 3]
+    assert os.path.getsize(destino + ".part") == TAMANHO
+
+    # nova execução (outra URL do mesmo formato): só os blocos que faltam
+    url, estado = servidor(fonte)
+    dl = pc.DownloadHttp(url, destino, TAMANHO)
+    dl.executar()
+    assert _md5(destino) == _md5(fonte)
+    assert estado.requisicoes == 13
+    assert dl.feito_sessao == TAMANHO - 4 * BLOCO
+
+
+def test_mapa_de_outro_tamanho_recomeca_do_zero(fonte, servidor, tmp_path):
+    destino = str(tmp_path / "video.mp4")
+    with open(destino + ".part", "wb") as f:
+        f.truncate(TAMANHO + 1)
+    with open(destino + ".part.json", "w", encoding="utf-8") as f:
+        json.dump({"tamanho": TAMANHO + 1, "bloco": BLOCO, "prontos": [0, 1, 2]}, f)
+    url, estado = servidor(fonte)
+    dl = pc.DownloadHttp(url, destino, TAMANHO)
+    dl.executar()
+    assert _md5(destino) == _md5(fonte)
+    assert estado.requisicoes == dl.n_blocos
+
+
+# -------- sidx --------
+FRAGMENTADO = os.path.join(FIXTURES, "fragmentado_sidx.mp4")   # ffmpeg -movflags +frag_keyframe+empty_moov+default_base_moof+global_sidx
+
+
+def test_sidx_do_fragmentado():
+    tamanho = os.path.getsize(FRAGMENTADO)
+    (inicio, timescale, refs), = pc._ler_sidx(FRAGMENTADO, tamanho)
+    with open(FRAGMENTADO, "rb") as f:
+        f.seek(inicio)
+        assert f.read(8)[4:] == b"moof"   # offset aponta para o primeiro fragmento
+    assert len(refs) == 4   # 4 s, um keyframe por segundo
+    assert sum(d for _, d in refs) == 4 * timescale
+    fim = inicio + sum(t for t, _ in refs)
+    with open(FRAGMENTADO, "rb") as f:
+        f.seek(fim)
+        assert f.read(8)[4:] == b"mfra"   # os fragmentos cobrem todos os bytes até o índice final
+    assert pc._segundos_no_prefixo((inicio, timescale, refs), inicio + refs[0][0] + refs[1][0] + 10) == 2.0
+    assert pc._segundos_no_prefixo((inicio, timescale, refs), inicio + refs[0][0] - 1) == 0.0
+
+
+def test_sidx_ainda_nao_chegou():
+    with open(FRAGMENTADO, "rb") as f:
+        cab = f.read(1000)
+    ftyp = struct.unpack(">I", cab[:4])[0]
+    moov = struct.unpack(">I", cab[ftyp:ftyp + 4])[0]
+    assert pc._ler_sidx(FRAGMENTADO, ftyp + moov) is None          # só ftyp+moov
+    assert pc._ler_sidx(FRAGMENTADO, ftyp + moov + 40) is None     # sidx pela metade
+    assert pc._ler_sidx(FRAGMENTADO, 8) is None
+
+
+def _caixa(tipo: bytes, corpo: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(corpo), tipo) + corpo
+
+
+def _sidx(versao: int, refs: list, primeiro: int = 0, timescale: int = 1000) -> bytes:
+    corpo = struct.pack(">B3xII", versao, 1, timescale)
+    corpo += struct.pack(">II", 0, primeiro) if versao == 0 else struct.pack(">QQ", 0, primeiro)
+    corpo += struct.pack(">HH", 0, len(refs))
+    for hier, tam, dur in refs:
+        corpo += struct.pack(">III", (hier << 31) | tam, dur, 0x90000000)
+    return _caixa(b"sidx", corpo)
+
+
+def test_sidx_versao_1_e_varios_indices(tmp_path):
+    path = str(tmp_path / "v1.mp4")
+    cab = _caixa(b"ftyp", b"isom" * 2) + _caixa(b"moov", b"\0" * 20)
+    s1 = _sidx(1, [(0, 500, 2000)], primeiro=16)
+    s2 = _sidx(0, [(0, 300, 1000), (0, 200, 1000)], timescale=90000)
+    dados = cab + s1 + s2 + _caixa(b"moof", b"\0" * 8)
+    with open(path, "wb") as f:
+        f.write(dados)
+    ind = pc._ler_sidx(path, len(dados))
+    # offset do fragmento contado a partir do fim de cada sidx (+ first_offset)
+    assert ind == [(len(cab + s1) + 16, 1000, [(500, 2000)]),
+                   (len(cab + s1 + s2), 90000, [(300, 1000), (200, 1000)])]
+
+
+def test_sem_sidx_ou_hierarquico_vira_lista_vazia(tmp_path):
+    path = str(tmp_path / "progressivo.mp4")
+    dados = _caixa(b"ftyp", b"isom" * 2) + _caixa(b"moov", b"\0" * 20) + _caixa(b"mdat", b"\0" * 100)
+    with open(path, "wb") as f:
+        f.write(dados)
+    assert pc._ler_sidx(path, len(dados)) == []
+    with open(path, "wb") as f:
+        f.write(_caixa(b"ftyp", b"isom" * 2) + _sidx(0, [(1, 500, 2000)]) + _caixa(b"moof", b""))
+    assert pc._ler_sidx(path, os.path.getsize(path)) == []
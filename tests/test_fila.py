@@ -0,0 +1,127 @@
+import os
+import threading
+
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+
+
+def _evento(spool, nome):
+    path = os.path.join(spool, nome)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{}")
+    return path
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return str(tmp_path / "spool")
+
+
+def test_reivindicado_ja_sai_travado_e_nao_volta_como_orfao(spool):
+    os.makedirs(spool)
+    path = _evento(spool, "a.json")
+    proc_dir = os.path.join(spool, "processando")
+    destino, lk = pc._reivindicar(path, proc_dir)
+    try:
+        assert os.path.exists(destino) and not os.path.exists(path)
+        pc._recuperar_orfaos(spool)   # outro runner subindo agora
+        assert os.path.exists(destino)
+        assert pc._travar_evento(destino) is None
+    finally:
+        pc._soltar_evento(lk)
+    assert not os.path.exists(destino + ".lock")
+
+
+def test_orfao_sem_lock_volta_para_a_fila(spool):
+    proc_dir = os.path.join(spool, "processando")
+    os.makedirs(proc_dir)
+    _evento(proc_dir, "b.json")
+    open(os.path.join(proc_dir, "b.json.lock"), "w").close()   # runner caiu: arquivo de lock sem dono
+    pc._recuperar_orfaos(spool)
+    assert os.path.exists(os.path.join(spool, "b.json"))
+    assert not os.path.exists(os.path.join(proc_dir, "b.json.lock"))
+
+
+def test_lock_apagado_por_quem_soltou_nao_vale(tmp_path):
+    path = str(tmp_path / "c.json")
+    velho = pc.LockArquivo(path + ".lock")
+    assert velho.adquirir(bloquear=False) and velho.vigente()
+    os.remove(velho.path)
+    assert not velho.vigente()
+    velho.liberar()
+
+
+def test_evento_que_some_entre_glob_e_stat_nao_derruba_a_fila(spool, monkeypatch):
+    os.makedirs(spool)
+    fica = _evento(spool, "d.json")
+    monkeypatch.setattr(pc.glob, "glob", lambda _padrao: [os.path.join(spool, "sumiu.json"), fica])
+    assert pc._eventos_na_fila(spool) == [fica]
+
+
+def test_fila_uma_vez_separa_feitos_e_falhos(spool, monkeypatch):
+    os.makedirs(spool)
+    _evento(spool, "ok.json")
+    _evento(spool, "ruim.json")
+    vistos = []
+    trava = threading.Lock()
+
+    def processar(path):
+        with trava:
+            vistos.append(os.path.basename(path))
+        # durante o job o evento está em processando/ com o lock de pé
+        assert os.path.dirname(path).endswith("processando")
+        assert pc._travar_evento(path) is None
+        if "ruim" in path:
+            raise RuntimeError("relatório inválido")
+
+    monkeypatch.setattr(pc, "iniciar_processamento", processar)
+    pc.executar_fila(spool, max_jobs=2, uma_vez=True)
+
+    assert sorted(vistos) == ["ok.json", "ruim.json"]
+    assert os.listdir(os.path.join(spool, "feitos")) == ["ok.json"]
+    assert sorted(os.listdir(os.path.join(spool, "falhos"))) == ["ruim.json", "ruim.json.erro.txt"]
+    assert os.listdir(os.path.join(spool, "processando")) == []
+
+
+def test_video_de_job_terminado_pode_sair_do_cache(spool, tmp_path, monkeypatch):
+    os.makedirs(spool)
+    for n, nome in enumerate(("yt_a.json", "yt_b.json", "yt_c.json")):
+        os.utime(_evento(spool, nome), (n, n))   # fila em ordem a, b, c
+    cache = pc.IndiceCache(str(tmp_path / "cache"), 3 * 1024 ** 2)
+    os.makedirs(cache.diretorio)
+    monkeypatch.setattr(pc, "_cache_videos", cache)
+    monkeypatch.setattr(pc, "TRACE_ATIVO", False)
+    protegidos_no_job = {}
+
+    def processar(path):
+        # o que garantir_download_inteiro faz com o vídeo do job
+        key = os.path.splitext(os.path.basename(path))[0]
+        pc._fixar_no_cache(key)
+        with open(os.path.join(cache.diretorio, f"{key}.mp4"), "wb") as f:
+            f.truncate(2 * 1024 ** 2)
+        cache.registrar(key, f"{key}.mp4", protegidos=pc._cache_protegidos())
+        protegidos_no_job[key] = pc._cache_protegidos()
+
+    monkeypatch.setattr(pc, "_processar_evento", processar)
+    pc.executar_fila(spool, max_jobs=1, uma_vez=True)
+
+    assert protegidos_no_job == {"yt_a": {"yt_a"}, "yt_b": {"yt_b"}, "yt_c": {"yt_c"}}
+    # cada job novo tirou o anterior (2 MB + 2 MB > 3 MB): nada ficou preso depois de terminar
+    assert set(cache.entradas()) == {"yt_c"}
+    assert pc._cache_em_uso == {}
+
+
+def test_chave_fica_protegida_enquanto_algum_job_usa(monkeypatch):
+    monkeypatch.setattr(pc, "_cache_em_uso", {})
+    jobs = [{}, {}]
+    for job in jobs:
+        token = pc._job_atual.set(job)
+        pc._fixar_no_cache("yt_x")
+        pc._fixar_no_cache("yt_x")   # o mesmo job chamando de novo não conta duas vezes
+        pc._job_atual.reset(token)
+    assert pc._cache_em_uso == {"yt_x": 2}
+    pc._soltar_do_cache(jobs[0])
+    assert pc._cache_protegidos() == {"yt_x"}
+    pc._soltar_do_cache(jobs[1])
+    assert pc._cache_protegidos() == set()
@@ -0,0 +1,36 @@
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(pc, "STATS_ATIVO", False)
+    return str(tmp_path / "historico.md")
+
+
+def _resultado(idx):
+    return {"idx": idx, "titulo": f"corte {idx}", "modo": "A_LOCAL", "status": "OK", "elapsed": 1.0, "debug_tail": ""}
+
+
+def _linhas(log_path):
+    with open(log_path, encoding="utf-8") as f:
+        return [int(ln.split("|")[1]) for ln in f if ln.startswith("|")]
+
+
+def test_linha_sai_quando_ela_e_as_anteriores_terminam(log_path):
+    ordem = [1, 2, 4, 5]   # 3 já estava pronto numa execução anterior
+    resultados = {2: _resultado(2)}
+    proximo = pc._escrever_linhas_em_ordem(log_path, ordem, resultados, 0)
+    assert proximo == 0   # 1 ainda rodando: 2 espera
+
+    resultados[1] = _resultado(1)
+    resultados[5] = _resultado(5)
+    proximo = pc._escrever_linhas_em_ordem(log_path, ordem, resultados, proximo)
+    assert _linhas(log_path) == [1, 2]
+
+    resultados[4] = _resultado(4)
+    proximo = pc._escrever_linhas_em_ordem(log_path, ordem, resultados, proximo)
+    assert _linhas(log_path) == [1, 2, 4, 5]
+    assert pc._escrever_linhas_em_ordem(log_path, ordem, resultados, proximo) == len(ordem)
+    assert _linhas(log_path) == [1, 2, 4, 5]   # nada repetido
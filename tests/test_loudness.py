@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import processar_cortes as pc  # noqa: E402
+from conftest import FIXTURES  # noqa: E402
+
+
+def _serie_do_log(nome: str) -> pc.SerieLoudness:
+    with open(os.path.join(FIXTURES, nome), encoding="utf-8") as f:
+        amostras = [a for a in map(pc._amostra_ebur128, f) if a]
+    return pc.SerieLoudness.de_amostras(amostras)
+
+
+def test_quadros_em_silencio_entram_na_serie():
+    # tom 1 s + silêncio 1,5 s + tom 1 s: o ebur128 imprime FTPK -inf no silêncio
+    serie = _serie_do_log("ebur128_silencio.log")
+    assert len(serie.t) == 35   # 3,5 s em quadros de 100 ms; a linha "Duration" não conta
+    assert np.all(np.diff(serie.t) > 0)
+    assert serie.t[-1] == pytest.approx(3.5, abs=1e-3)
+    silencio = pc.SerieLoudness._janela(serie, 1.3, 2.3, 0.0)
+    assert np.all(serie.p[silencio] == -120.0)
+
+
+def test_janela_pelo_instante_e_nao_pela_posicao():
+    serie = _serie_do_log("ebur128_silencio.log")
+    # segundo tom: depois do silêncio, a janela tem que cair nele (pico -17.9), não em amostras deslocadas
+    medida = serie.medir(2.6, 3.5)
+    assert medida["TP"] == pytest.approx(-17.9, abs=0.05)
+    assert medida["I"] == pytest.approx(-21.8, abs=0.5)
+    assert serie.medir(1.6, 2.4) is None   # só silêncio
+
+
+def test_ftpk_por_canal():
+    linha = ("[Parsed_ebur128_0] t: 0.499979   TARGET:-23 LUFS    M: -20.0 S: -21.0     I: -20.5 LUFS"
+             "       LRA:   0.0 LU  FTPK: -inf -12.5 dBFS  TPK: -12.5 -12.5 dBFS")
+    assert pc._amostra_ebur128(linha) == pytest.approx((0.499979, -20.0, -21.0, -12.5))
+
+
+def test_cache_guarda_os_instantes(tmp_path, monkeypatch):
+    monkeypatch.setattr(pc, "LOUDNESS_CACHE_DIR", str(tmp_path))
+    serie = _serie_do_log("ebur128_silencio.log")
+    serie.salvar("x")
+    lida = pc.SerieLoudness.carregar("x")
+    assert np.allclose(lida.t, serie.t)
+    assert lida.medir(2.6, 3.5)["TP"] == pytest.approx(-17.9, abs=0.05)
@@ -0,0 +1,111 @@
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+
+NOVO_LOUVOR = """\
+Relatório do culto
+Foco da Solicitação: Louvor
+Tipo de Conteúdo: Culto
+
+Cortes para Automação
+[[00:10:00]] [[00:14:30]]
+Título: Grande é o Senhor — INTEGRAL
+[[00:11:05]] [[00:11:25]]
+Hook: "Refrão que levanta a igreja" OURO 20
+"""
+
+NOVO_PREGACAO = """\
+Foco da Solicitação: Pregação
+Tipo de Conteúdo: Culto
+
+Cortes para Automação
+[[01:02:03]] [[01:05:00]]
+Assunto: A fé que <move> montanhas
+"""
+
+LOUVOR_ANTIGO = """\
+Foco da Solicitação: louvor e adoração
+
+Louvor 1 — Grande é o Senhor
+Integral: [[00:10:00]] até [[00:14:30]] (Duração: 04:30)
+Ouro A: [[00:11:05]] até [[00:11:25]] (20s) — Refrão
+Louvor 2 - Porque Ele vive
+Integral: [[00:15:00]] até [[00:19:00]] (Duração: 04:00)
+"""
+
+SIMPLES = """\
+Foco da Solicitação: mensagem do pastor
+[00:20:00] até (Duração: 01:30) Título: O bom pastor
+[00:30:15] até (Duração: 00:45)
+"""
+
+
+def test_formato_novo_louvor_tipa_integral_e_ouro():
+    tipocorte, cortes = pc.extrair_cortes(NOVO_LOUVOR)
+    assert tipocorte == "LOUVOR"
+    assert pc.parse_relatorio(NOVO_LOUVOR).formato == "novo"
+    integral, ouro = cortes
+    assert (integral.ini_s, integral.fim_s, integral.dur_s, integral.kind, integral.alvo) == (600, 870, 270, "INTEGRAL", None)
+    assert (ouro.ini_s, ouro.fim_s, ouro.kind, ouro.alvo, ouro.linha) == (665, 685, "OURO", 20, 8)
+    assert ouro.desc == "Refrão que levanta a igreja OURO 20"   # rótulo e aspas saem do título
+
+
+def test_corte_continua_lendo_como_dict():
+    _, (corte,) = pc.extrair_cortes(NOVO_PREGACAO)
+    assert corte["ini"] == "01:02:03" and corte.get("fim") == "01:05:00"
+    assert corte["dur_mmss"] == "02:57"
+    assert dict(corte) == {"ini": "01:02:03", "fim": "01:05:00", "dur_mmss": "02:57",
+                           "desc": "A fé que move montanhas", "kind": "CORTE", "alvo": None}
+    with pytest.raises(KeyError):
+        corte["ini_s"]
+
+
+def test_formato_louvor_antigo():
+    tipocorte, cortes = pc.extrair_cortes(LOUVOR_ANTIGO)
+    assert tipocorte == "LOUVOR"
+    assert pc.parse_relatorio(LOUVOR_ANTIGO).formato == "louvor_antigo"
+    assert [(c.ini_s, c.fim_s, c.kind) for c in cortes] == [(600, 870, "INTEGRAL"), (665, 685, "OURO"), (900, 1140, "INTEGRAL")]
+    assert cortes[0].desc == "LOUVOR_01_INTEGRAL__Grande é o Senhor"
+    assert cortes[1].desc == "LOUVOR_01_OURO_A__Grande é o Senhor__Refrão"
+    assert cortes[2].desc.startswith("LOUVOR_02_INTEGRAL__")
+
+
+def test_formato_simples_por_duracao():
+    tipocorte, cortes = pc.extrair_cortes(SIMPLES)
+    assert tipocorte == "PREGACAO"
+    assert [(c.ini_s, c.fim_s, c.dur_s) for c in cortes] == [(1200, None, 90), (1815, None, 45)]
+    assert cortes[0].desc == "O bom pastor" and cortes[1].desc == "corte_2"
+    assert cortes[0]["fim"] is None
+
+
+def test_secao_nova_tem_precedencia_sobre_os_antigos():
+    rel = pc.parse_relatorio(SIMPLES + NOVO_PREGACAO)
+    assert rel.formato == "novo"
+    assert [c.ini_s for c in rel.cortes] == [3723]
+
+
+def test_todos_os_erros_de_uma_vez():
+    ruim = NOVO_LOUVOR.replace("[[00:11:05]] [[00:11:25]]", "[[00:11:25]] [[00:11:05]]") + \
+        "[[00:20:00]] [[00:21:00]]\nComentário: sem tag\nveja http://exemplo\n[[00:22:00]] [[00:23:00]]\n"
+    with pytest.raises(ValueError) as exc:
+        pc.extrair_cortes(ruim)
+    msg = str(exc.value)
+    assert "fim <= início" in msg
+    assert "linha 2 deve começar" in msg
+    assert "'http'" in msg
+    assert "faltou a linha 2" in msg
+
+
+def test_louvor_novo_sem_integral_nem_ouro_e_invalido():
+    with pytest.raises(ValueError, match="INTEGRAL ou OURO"):
+        pc.extrair_cortes(NOVO_LOUVOR.replace(" OURO 20", ""))
+
+
+def test_sem_cortes():
+    with pytest.raises(ValueError, match="Não encontrei cortes"):
+        pc.extrair_cortes("Foco da Solicitação: Louvor\n")
+
+
+def test_relatorio_repetido_vem_do_cache():
+    assert pc.parse_relatorio(NOVO_PREGACAO) is pc.parse_relatorio(NOVO_PREGACAO)
+    assert pc.parse_relatorio(NOVO_PREGACAO) is not pc.parse_relatorio(NOVO_PREGACAO + "\n.")
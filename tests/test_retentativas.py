@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+
+
+@pytest.mark.parametrize("saida,classe", [
+    ("ERROR: unable to download video data: HTTP Error 403: Forbidden", "expirado"),
+    ("ERROR: [youtube] abc: Sign in to confirm you're not a bot. Use --cookies", "auth"),
+    ("ERROR: Failed to copy: googleapi: Error 403: Insufficient Permission, insufficientPermissions", "auth"),
+    ("ERROR: Failed to copy: googleapi: Error 403: User Rate Limit Exceeded, userRateLimitExceeded", "limite"),
+    ("ERROR: HTTP Error 429: Too Many Requests", "limite"),
+    ("ERROR: [youtube] abc: Video unavailable", "permanente"),
+    ("ERROR: unable to write data: [Errno 28] No space left on device", "permanente"),
+    ("ERROR: algo que ninguém previu", "permanente"),
+    ("", "permanente"),
+    ("ERROR: vigia: yt-dlp sem progresso há 121s; processo encerrado (timed out)", "rede"),
+    ("ERROR: Connection reset by peer", "rede"),
+])
+def test_classificar_falha(saida, classe):
+    assert pc.classificar_falha(saida) == classe
+
+
+@pytest.fixture
+def disjuntor(monkeypatch):
+    d = pc.Disjuntor()
+    monkeypatch.setattr(pc, "_disjuntor", d)
+    monkeypatch.setattr(pc.time, "sleep", lambda _s: None)
+    return d
+
+
+def _abrir(d, ferramenta="yt-dlp", classe="rede"):
+    for _ in range(pc.DISJUNTOR_FALHAS):
+        d.falha(ferramenta, classe)
+    assert d.admitir(ferramenta) == (classe, False)
+    classe_, _ate = d._abertos[ferramenta]
+    d._abertos[ferramenta] = (classe_, time.time() - 1)   # período aberto já passou
+
+
+def test_meio_aberto_admite_uma_prova_por_vez(disjuntor):
+    _abrir(disjuntor)
+    assert disjuntor.admitir("yt-dlp") == (None, True)
+    # com a prova em andamento, as demais continuam recusadas
+    assert disjuntor.admitir("yt-dlp") == ("rede", False)
+    disjuntor.sucesso("yt-dlp")
+    assert disjuntor.admitir("yt-dlp") == (None, False)
+
+
+def test_prova_que_falha_reabre_na_hora(disjuntor):
+    _abrir(disjuntor)
+    assert disjuntor.admitir("yt-dlp") == (None, True)
+    disjuntor.falha("yt-dlp", "rede")
+    assert disjuntor.admitir("yt-dlp") == ("rede", False)
+
+
+def test_prova_com_falha_permanente_libera_outra_prova(disjuntor):
+    _abrir(disjuntor)
+    assert disjuntor.admitir("yt-dlp") == (None, True)
+    disjuntor.falha("yt-dlp", "permanente")   # vídeo removido: não diz nada da ferramenta
+    assert disjuntor.admitir("yt-dlp") == (None, True)
+
+
+def test_prova_tenta_uma_vez_so(disjuntor):
+    _abrir(disjuntor)
+    chamadas = []
+
+    def tentar():
+        chamadas.append(1)
+        return False, "ERROR: Connection reset by peer"
+
+    ok, _saida, classe = pc.com_retentativas("yt-dlp", tentar, "teste")
+    assert (ok, classe, len(chamadas)) == (False, "rede", 1)
+    ok, saida, _ = pc.com_retentativas("yt-dlp", tentar, "teste")
+    assert not ok and "disjuntor aberto" in saida and len(chamadas) == 1
+
+
+def test_prova_concorrente_so_uma_chamada_passa(disjuntor):
+    _abrir(disjuntor)
+    dentro = threading.Event()
+    solta = threading.Event()
+    chamadas = []
+
+    def tentar():
+        chamadas.append(1)
+        dentro.set()
+        solta.wait(5)
+        return True, ""
+
+    t = threading.Thread(target=pc.com_retentativas, args=("yt-dlp", tentar, "prova"))
+    t.start()
+    assert dentro.wait(5)
+    ok, saida, _ = pc.com_retentativas("yt-dlp", tentar, "outra")
+    solta.set()
+    t.join()
+    assert not ok and "disjuntor aberto" in saida
+    assert len(chamadas) == 1
+    assert disjuntor.admitir("yt-dlp") == (None, False)   # prova OK fechou
+
+
+def test_expirado_repete(disjuntor):
+    saidas = iter([(False, "ERROR: HTTP Error 403: Forbidden"), (True, "ok")])
+    ok, _saida, classe = pc.com_retentativas("yt-dlp", lambda: next(saidas), "teste")
+    assert ok and classe is None
+
+
+def test_desconhecido_nao_repete(disjuntor):
+    chamadas = []
+
+    def tentar():
+        chamadas.append(1)
+        return False, "ERROR: [Errno 28] No space left on device"
+
+    ok, _saida, classe = pc.com_retentativas("rclone", tentar, "teste")
+    assert (ok, classe, len(chamadas)) == (False, "permanente", 1)
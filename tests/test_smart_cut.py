@@ -0,0 +1,83 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+
+
+def _roda(cmd) -> bool:
+    try:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    except OSError:
+        return False
+
+
+if not shutil.which("ffmpeg") or not _roda(["ffprobe", "-version"]):
+    pytest.skip("ffmpeg/ffprobe fora do PATH", allow_module_level=True)
+
+FPS = 25
+
+
+@pytest.fixture(scope="module")
+def fonte(tmp_path_factory):
+    # B-frames (pts > dts) e GOP fixo de 2 s: keyframes em 0, 2, 4, ...
+    path = str(tmp_path_factory.mktemp("smart") / "fonte.mp4")
+    subprocess.run(["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", f"testsrc=size=160x120:rate={FPS}",
+                    "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000", "-t", "20",
+                    "-c:v", "libx264", "-pix_fmt", "yuv420p", "-bf", "2", "-g", str(2 * FPS),
+                    "-keyint_min", str(2 * FPS), "-sc_threshold", "0", "-c:a", "aac", "-shortest", path], check=True)
+    return path
+
+
+def quadros(path: str) -> list:
+    p = subprocess.run(["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts_time,flags",
+                        "-of", "csv=p=0", path], stdout=subprocess.PIPE, text=True, check=True)
+    return sorted((float(pts), "K" in flags) for pts, _, flags in (ln.partition(",") for ln in p.stdout.split()))
+
+
+def test_indice_guarda_dts_dos_keyframes(fonte):
+    idx = pc.indice_keyframes(fonte)
+    assert idx["keyframes"][:3] == pytest.approx([0.0, 2.0, 4.0])
+    assert all(d < k for k, d in zip(idx["keyframes"], idx["dts"]))   # B-frames: dts atrás do pts
+    assert idx["level"]
+
+
+@pytest.mark.parametrize("i1,i2", [(2, 5), (1, 2), (3, 9)])
+def test_miolo_copia_gops_inteiros(fonte, tmp_path, i1, i2):
+    idx = pc.indice_keyframes(fonte)
+    saida = str(tmp_path / "miolo.mp4")
+    subprocess.run(pc._cmd_copia_gops(fonte, idx, i1, i2, saida), check=True, stderr=subprocess.DEVNULL)
+    q = quadros(saida)
+    k1, k2 = idx["keyframes"][i1], idx["keyframes"][i2]
+    assert len(q) == round((k2 - k1) * FPS)   # nem o GOP anterior nem o keyframe k2
+    assert q[0][1] and sum(k for _, k in q) == i2 - i1   # começa num keyframe e leva GOPs inteiros
+    assert q[-1][0] - q[0][0] == pytest.approx(k2 - k1 - 1 / FPS)
+
+
+def test_miolo_com_keyframe_arredondado_para_baixo(fonte, tmp_path):
+    idx = dict(pc.indice_keyframes(fonte))
+    idx["keyframes"] = [k - 0.000001 for k in idx["keyframes"]]   # ffprobe arredonda a 6 casas: pode ficar abaixo do pts real
+    saida = str(tmp_path / "miolo.mp4")
+    subprocess.run(pc._cmd_copia_gops(fonte, idx, 2, 3, saida), check=True, stderr=subprocess.DEVNULL)
+    assert len(quadros(saida)) == 2 * FPS   # um GOP: o seek não voltou para o keyframe de 2 s
+
+
+def test_smart_cut_juntado_tem_os_quadros_da_janela(fonte, tmp_path):
+    ts = str(tmp_path / "teste.ts")
+    if not (_roda(["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", "testsrc=d=0.2", ts])
+            and _roda(["ffmpeg", "-v", "error", "-i", ts, "-f", "null", "-"])):
+        pytest.skip("ffmpeg deste ambiente não lê MPEG-TS")
+    ini, fim = 3.3, 11.7
+    saida = str(tmp_path / "smart.mp4")
+    pc.cortar_local_smart(fonte, ini, fim, saida)
+    q = quadros(saida)
+    pts = [t for t, _ in q]
+    assert len(q) == round((fim - ini) * FPS)
+    assert len(set(round(t * FPS) for t in pts)) == len(pts)   # sem quadro repetido na emenda
+    assert all(abs(b - a - 1 / FPS) < 1e-3 for a, b in zip(pts, pts[1:]))   # nem buraco
+    assert pts[0] == pytest.approx(0.0, abs=1 / FPS)
+    # o miolo copiado começa com o keyframe de 4 s da fonte, ~0,7 s depois do início
+    assert any(k and abs(t - (4.0 - ini)) < 1 / FPS for t, k in q)
+    assert not os.path.exists(saida + ".smart")
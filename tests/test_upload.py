@@ -0,0 +1,46 @@
+import os
+import threading
+
+import pytest
+
+import processar_cortes as pc  # noqa: E402
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    monkeypatch.setattr(pc, "_rclone_listar_remoto", lambda _pasta: {})
+    monkeypatch.setattr(pc, "acervo_copiar_no_drive", lambda _info, _dst: False)
+    monkeypatch.setattr(pc, "acervo_registrar_remoto", lambda _md5, _dst: None)
+    monkeypatch.setattr(pc, "_upload_um_arquivo", lambda _fpath, _dst: True)
+    for nome in ("a.mp4", "b.mp4"):
+        with open(tmp_path / nome, "wb") as f:
+            f.write(nome.encode() * 100)
+    return str(tmp_path)
+
+
+def test_md5_dos_workers_em_paralelo(pasta, monkeypatch):
+    # os dois workers só passam se estiverem calculando o md5 ao mesmo tempo
+    juntos = threading.Barrier(2, timeout=5)
+
+    def md5(fpath):
+        juntos.wait()
+        return os.path.basename(fpath)
+
+    monkeypatch.setattr(pc, "_md5_arquivo", md5)
+    up = pc.UploaderEmFundo(pasta, "drive:/x", workers=2)
+    for nome in ("a.mp4", "b.mp4"):
+        up.enfileirar(os.path.join(pasta, nome))
+    assert up.finalizar() == {"a.mp4": "OK", "b.mp4": "OK"}
+    manifest = pc._carregar_manifest(pasta)
+    assert {k: v["md5"] for k, v in manifest.items()} == {"a.mp4": "a.mp4", "b.mp4": "b.mp4"}
+
+
+def test_md5_do_manifest_nao_e_recalculado(pasta, monkeypatch):
+    up = pc.UploaderEmFundo(pasta, "drive:/x", workers=1)
+    up.enfileirar(os.path.join(pasta, "a.mp4"))
+    up.finalizar()
+
+    monkeypatch.setattr(pc, "_md5_arquivo", lambda _fpath: pytest.fail("md5 recalculado"))
+    up = pc.UploaderEmFundo(pasta, "drive:/x", workers=1)
+    up.enfileirar(os.path.join(pasta, "a.mp4"))
+    assert up.finalizar() == {"a.mp4": "OK"}
@@ -0,0 +1,55 @@
+import sys
+
+import pytest
+
+pytest.importorskip("psutil")
+
+import processar_cortes as pc  # noqa: E402
+
+# imita o stderr do ffmpeg: uma linha de progresso a cada 0,2 s, tempo de mídia avançando `passo` por linha
+FFMPEG_FALSO = """
+import sys, time
+passo = float(sys.argv[1])
+for n in range(int(sys.argv[2])):
+    t = n * passo
+    print(f"frame={n} fps=25 size=1kB time=00:00:{t:05.2f} bitrate=1kbits/s speed=1x", flush=True)
+    time.sleep(0.2)
+"""
+
+
+@pytest.fixture
+def prazo_curto(monkeypatch):
+    monkeypatch.setattr(pc, "WATCHDOG_ATIVO", True)
+    monkeypatch.setattr(pc, "WATCHDOG_PRAZO_MIN_S", 1)
+    monkeypatch.setattr(pc, "WATCHDOG_SEM_PROGRESSO_S", 30)
+    monkeypatch.setattr(pc, "WATCHDOG_FFMPEG_SPEED_MIN", 1.0)
+
+
+def test_prazo_inicial_pela_duracao_da_midia(monkeypatch):
+    monkeypatch.setattr(pc, "WATCHDOG_ATIVO", False)
+    v = pc.Vigia([], "ffmpeg", 3600)
+    assert v.prazo - v.t0 == pytest.approx(3600 / pc.WATCHDOG_FFMPEG_SPEED_MIN, abs=1)
+    v = pc.Vigia([], "ffmpeg")
+    assert v.prazo - v.t0 == pytest.approx(pc.WATCHDOG_PRAZO_MIN_S, abs=1)
+
+
+def test_out_time_avancando_estende_o_prazo(monkeypatch):
+    monkeypatch.setattr(pc, "WATCHDOG_ATIVO", False)
+    v = pc.Vigia([], "ffmpeg")
+    v._fase_t0 = v.t0 - 1000   # 1000 s rodando, 400 s de mídia: acima de WATCHDOG_FFMPEG_SPEED_MIN
+    v.linha({"ferramenta": "ffmpeg", "out_time_s": 400.0})
+    assert v.prazo > v.t0 + pc.WATCHDOG_PRAZO_MIN_S
+
+
+def test_ffmpeg_sem_duracao_no_comando_nao_morre_enquanto_avanca(prazo_curto):
+    # 2 s de execução com prazo mínimo de 1 s: só termina porque o out_time avança a 1x
+    rc, out = pc.run_cmd_live([sys.executable, "-c", FFMPEG_FALSO, "0.2", "10"], check=False, eco=False)
+    assert rc == 0
+    assert "vigia" not in out
+
+
+def test_ffmpeg_parado_no_tempo_de_midia_morre_no_prazo(prazo_curto):
+    rc, out = pc.run_cmd_live([sys.executable, "-c", FFMPEG_FALSO, "0.0", "50"], check=False, eco=False)
+    assert rc != 0
+    assert "fora do prazo" in out
+    assert pc.classificar_falha(out) == "rede"